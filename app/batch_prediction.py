@@ -0,0 +1,253 @@
+"""
+Потоковое предсказание для файлов с поездками (CSV или Parquet):
+файл читается чанками ограниченного размера, каждый чанк валидируется,
+проходит через FeatureEngineering и модель и дописывается в файл результата
+"""
+
+import csv
+import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from app.model import predict
+from app.utils.metrics import VALIDATION, track_stage
+from app.validation import TRIP_COLUMNS, validate_trips
+
+# pandas импортируется при первом файле, как и в app.model
+if TYPE_CHECKING:
+    import pandas as pd
+
+PREDICTION_COLUMN = "fare_prediction"
+ERROR_COLUMN = "error"
+
+SUPPORTED_SUFFIXES = (".csv", ".parquet")
+
+
+class BatchFileError(ValueError):
+    """Файл нельзя обработать: неизвестный формат или нет нужных колонок"""
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+
+        return pyarrow
+    except ImportError:
+        raise BatchFileError("Для Parquet файлов нужен установленный pyarrow")
+
+
+def iter_chunks(path: Path, chunk_size: int) -> Iterator["pd.DataFrame"]:
+    """Чтение файла чанками не больше chunk_size строк
+
+    Args:
+        path (Path): Путь к CSV или Parquet файлу
+        chunk_size (int): Максимальный размер чанка
+
+    Raises:
+        BatchFileError: если формат файла не поддерживается, нет нужных колонок
+            или файл не читается: пустой, битый CSV или Parquet, не UTF-8
+
+    Yields:
+        Iterator[pd.DataFrame]: Чанки файла
+    """
+    try:
+        yield from _read_chunks(path, chunk_size)
+    except BatchFileError:
+        raise
+    # Ошибки разбора pandas и pyarrow - наследники ValueError или OSError
+    except (ValueError, OSError) as err:
+        raise BatchFileError(f"Не удалось прочитать файл: {err}") from err
+
+
+def _read_chunks(path: Path, chunk_size: int) -> Iterator["pd.DataFrame"]:
+    import pandas as pd
+
+    suffix = path.suffix.lower()
+
+    if suffix == ".csv":
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                check_columns(chunk.columns)
+                yield chunk
+
+    elif suffix == ".parquet":
+        pyarrow = _import_pyarrow()
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        check_columns(parquet_file.schema_arrow.names)
+
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+    else:
+        raise BatchFileError(
+            f"Поддерживаются только файлы {', '.join(SUPPORTED_SUFFIXES)}"
+        )
+
+
+def check_columns(columns) -> None:
+    """Проверка, что в данных есть все колонки поездки
+
+    Raises:
+        BatchFileError: если каких-то колонок нет
+    """
+    missing = [i for i in TRIP_COLUMNS if i not in set(columns)]
+    if missing:
+        raise BatchFileError(f"В файле нет колонок: {', '.join(missing)}")
+
+
+def _naive_timestamp(value) -> "pd.Timestamp":
+    import pandas as pd
+
+    timestamp = pd.to_datetime(value, errors="coerce", format="mixed")
+    if pd.isna(timestamp) or timestamp.tzinfo is None:
+        return timestamp
+
+    return timestamp.tz_localize(None)
+
+
+def parse_datetime(values: "pd.Series") -> "pd.Series":
+    """Разбор дат поездок. Если в чанке разные смещения UTC или даты с
+    часовым поясом и без, смещение отбрасывается: признаки всё равно считаются
+    по местному времени поездки, как в FeatureEngineering._prepare_datetime
+
+    Args:
+        values (pd.Series): Сырые даты поездок
+
+    Returns:
+        pd.Series: Даты типа datetime64, NaT для нераспознанных
+    """
+    import pandas as pd
+
+    try:
+        with warnings.catch_warnings():
+            # Разные смещения в одном столбце pandas возвращает объектами
+            # с предупреждением, а в следующих версиях - ошибкой
+            warnings.simplefilter("ignore", FutureWarning)
+            parsed = pd.to_datetime(values, errors="coerce", format="mixed")
+    except ValueError:
+        parsed = None
+
+    if parsed is not None and parsed.dtype != object:
+        return parsed
+
+    # Медленный путь только для чанков со смешанными смещениями
+    return pd.to_datetime(values.map(_naive_timestamp))
+
+
+def validate_chunk(chunk: "pd.DataFrame") -> "tuple[pd.DataFrame, pd.Series]":
+    """Приведение типов и валидация поездок чанка правилами TaxiTravel
+
+    Args:
+        chunk (pd.DataFrame): Сырые строки файла
+
+    Returns:
+        tuple[pd.DataFrame, pd.Series]: Колонки поездок с приведёнными типами
+            и ошибки валидации по строкам (None для корректных строк)
+    """
+    import pandas as pd
+
+    with track_stage(VALIDATION):
+        trips = chunk[TRIP_COLUMNS].copy()
+        trips["pickup_datetime"] = parse_datetime(trips["pickup_datetime"])
+        for col in TRIP_COLUMNS[1:]:
+            trips[col] = pd.to_numeric(trips[col], errors="coerce").astype(float)
+
+        return trips, validate_trips(trips).errors_full()
+
+
+def score_chunk(chunk: "pd.DataFrame", **predict_params) -> "pd.DataFrame":
+    """Предсказание для чанка: к исходным колонкам добавляются
+    колонки с предсказанием и ошибкой валидации
+
+    Args:
+        chunk (pd.DataFrame): Сырые строки файла
+        **predict_params: Параметры predict модели, например thread_count
+
+    Returns:
+        pd.DataFrame: Чанк с колонками PREDICTION_COLUMN и ERROR_COLUMN
+    """
+    trips, errors = validate_chunk(chunk)
+    valid = errors.isna().to_numpy()
+
+    result = chunk.copy()
+    result[PREDICTION_COLUMN] = float("nan")
+    if valid.any():
+        result.loc[valid, PREDICTION_COLUMN] = predict(trips[valid], **predict_params)
+
+    result[ERROR_COLUMN] = errors
+    return result
+
+
+class ChunkWriter:
+    """Дописывание чанков результата в CSV или Parquet файл"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, chunk: "pd.DataFrame") -> None:
+        if self.path.suffix.lower() == ".parquet":
+            pyarrow = _import_pyarrow()
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pyarrow.parquet.ParquetWriter(
+                    self.path, table.schema
+                )
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            chunk.to_csv(
+                self.path,
+                mode="a" if self.rows else "w",
+                header=not self.rows,
+                index=False,
+                quoting=csv.QUOTE_MINIMAL,
+            )
+
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+def score_next_chunk(chunks: Iterator["pd.DataFrame"], writer: ChunkWriter) -> bool:
+    """Чтение, предсказание и запись следующего чанка,
+    удобно выполнять в отдельном потоке по одному чанку
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): Итератор чанков из iter_chunks
+        writer (ChunkWriter): Файл результата
+
+    Returns:
+        bool: False, если чанки закончились
+    """
+    chunk = next(chunks, None)
+    if chunk is None:
+        return False
+
+    writer.write(score_chunk(chunk))
+    return True
+
+
+def score_file(input_path: Path, output_path: Path, chunk_size: int) -> int:
+    """Синхронное предсказание для всего файла, память ограничена размером чанка
+
+    Args:
+        input_path (Path): Входной CSV или Parquet файл
+        output_path (Path): Файл результата того же формата
+        chunk_size (int): Размер чанка
+
+    Returns:
+        int: Количество обработанных строк
+    """
+    writer = ChunkWriter(output_path)
+    try:
+        for chunk in iter_chunks(input_path, chunk_size):
+            writer.write(score_chunk(chunk))
+    finally:
+        writer.close()
+
+    return writer.rows
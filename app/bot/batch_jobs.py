@@ -0,0 +1,101 @@
+"""
+Фоновые задачи пакетного предсказания: обработчик апдейта только ставит
+файл в работу и возвращается. Скачивание и предсказание файла не занимают
+воркер очереди апдейтов и аренду состояния FSM, сколько бы ни длились
+"""
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Coroutine
+
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJobs:
+    """Фоновые задачи с ограничением одновременно выполняемых"""
+
+    def __init__(self, max_concurrent: int = 2):
+        """
+        Args:
+            max_concurrent (int, optional): Сколько задач выполняется
+                одновременно, остальные ждут очереди. Defaults to 2.
+        """
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: set[asyncio.Task] = set()
+        self.running = 0
+
+        self.started_total = 0
+        self.failed_total = 0
+
+    @property
+    def pending(self) -> int:
+        """Задачи, которые выполняются или ждут очереди"""
+        return len(self._tasks)
+
+    async def _run(self, job: Coroutine[Any, Any, None]):
+        try:
+            async with self._semaphore:
+                self.running += 1
+                try:
+                    await job
+                finally:
+                    self.running -= 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed_total += 1
+            logger.exception("Batch job failed")
+        finally:
+            # Корутина, отменённая до старта, иначе даёт RuntimeWarning
+            job.close()
+
+    def start(self, job: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Запуск задачи в фоне, на задачу держится ссылка до её завершения
+
+        Args:
+            job (Coroutine[Any, Any, None]): Корутина задачи
+
+        Returns:
+            asyncio.Task: Задача
+        """
+        task = asyncio.create_task(self._run(job), name="batch_job")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.started_total += 1
+        return task
+
+    async def close(self, timeout: float | None = None):
+        """Ожидание начатых задач при остановке, по таймауту они отменяются
+
+        Args:
+            timeout (float | None, optional): Сколько секунд ждать задачи.
+                Defaults to None.
+        """
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.warning("%s batch jobs cancelled on shutdown", len(pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "waiting": self.pending - self.running,
+            "started_total": self.started_total,
+            "failed_total": self.failed_total,
+        }
+
+
+@lru_cache
+def get_batch_jobs() -> BatchJobs:
+    return BatchJobs(max_concurrent=get_settings().BATCH_PREDICTION_MAX_CONCURRENT)
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiogram import Bot, F, Router, types
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+
+from app.batch_prediction import (
+    SUPPORTED_SUFFIXES,
+    BatchFileError,
+    ChunkWriter,
+    iter_chunks,
+    score_next_chunk,
+)
+from app.bot.batch_jobs import get_batch_jobs
+from app.bot.menu_buttons import MenuButtons, MenuButtonsData, get_menu_buttons_builder
+from app.model_registry import ModelNotReadyError
+from app.settings import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+settings: Settings = get_settings()
+
+PROGRESS_INTERVAL_SECONDS = 2
+
+
+class BatchPredictionStates(StatesGroup):
+    file_upload = State()
+
+
+router = Router()
+
+
+async def flow_enter(message: types.Message, state: FSMContext):
+    """Вход в флоу предсказания цены нескольких поездок
+
+    Args:
+        message (types.Message): Сообщение от пользователя
+        state (FSMContext): состояние конечного автомата
+    """
+    max_size_mb = settings.BATCH_PREDICTION_MAX_FILE_SIZE // (1024 * 1024)
+    answer_text = f"""
+Отправьте файл с поездками в формате CSV или Parquet размером до {max_size_mb} МБ
+
+В файле должны быть колонки:
+• <code>pickup_datetime</code> - дата и время в формате ГГГГ-ММ-ДД чч:мм:сс
+• <code>pickup_latitude</code>, <code>pickup_longitude</code> - координаты точки отправления
+• <code>dropoff_latitude</code>, <code>dropoff_longitude</code> - координаты точки назначения
+• <code>passenger_count</code> - количество пассажиров
+
+В ответ придёт тот же файл с колонками <code>fare_prediction</code> и <code>error</code>
+"""
+    await state.clear()
+
+    await message.answer(text=answer_text, parse_mode=ParseMode.HTML)
+    await state.set_state(BatchPredictionStates.file_upload)
+
+
+@router.message(Command("batch_prediction"))
+async def flow_enter_command(message: types.Message, state: FSMContext):
+    """Вход в флоу предсказания цены нескольких поездок через команду
+
+    Args:
+        message (types.Message): Сообщение от пользователя
+        state (FSMContext): состояние конечного автомата
+    """
+    await flow_enter(message, state)
+
+
+@router.callback_query(
+    F.data == MenuButtonsData(action=MenuButtons.BATCH_PREDICTION).pack(),
+)
+async def flow_enter_inline_button(
+    callback_query: types.CallbackQuery, state: FSMContext
+):
+    """Вход в флоу предсказания цены нескольких поездок через инлайн кнопку
+
+    Args:
+        callback_query (types.CallbackQuery): данные коллбэк кнопки
+        state (FSMContext): состояние конечного автомата
+    """
+    await flow_enter(callback_query.message, state)
+
+
+async def update_progress(progress: types.Message, text: str):
+    try:
+        await progress.edit_text(text)
+    except TelegramAPIError:
+        pass
+
+
+async def score_document(
+    bot: Bot, chat_id: int, document: types.Document, progress: types.Message
+):
+    """Скачивание файла во временную папку, предсказание чанками
+    в отдельном потоке и отправка файла результата в чат. Выполняется
+    фоновой задачей из BatchJobs. Чем бы ни кончилась обработка, сообщение
+    о прогрессе получает итоговый статус
+
+    Args:
+        bot (Bot): Бот для скачивания и отправки файла
+        chat_id (int): Чат пользователя
+        document (types.Document): Файл с поездками
+        progress (types.Message): Сообщение о прогрессе обработки
+    """
+    suffix = Path(document.file_name or "").suffix.lower()
+    status = "Не удалось обработать файл, попробуйте ещё раз ❌"
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = Path(tmp_dir) / f"input{suffix}"
+            output_path = (
+                Path(tmp_dir) / f"{Path(document.file_name).stem}_predictions{suffix}"
+            )
+
+            try:
+                await bot.download(document, destination=input_path)
+            except (TelegramAPIError, aiohttp.ClientError, TimeoutError, OSError):
+                logger.exception("Batch file download failed")
+                status = "Не удалось скачать файл, отправьте его ещё раз ❌"
+                return
+
+            chunks = iter_chunks(input_path, settings.BATCH_PREDICTION_CHUNK_SIZE)
+            writer = ChunkWriter(output_path)
+            last_progress = 0.0
+            try:
+                while await asyncio.to_thread(score_next_chunk, chunks, writer):
+                    if time.monotonic() - last_progress > PROGRESS_INTERVAL_SECONDS:
+                        await update_progress(
+                            progress, f"Обработано строк: {writer.rows} ⌛"
+                        )
+                        last_progress = time.monotonic()
+
+            except BatchFileError as e:
+                status = f"{e} ❌"
+                return
+
+            finally:
+                await asyncio.to_thread(writer.close)
+
+            await bot.send_document(
+                chat_id,
+                types.FSInputFile(output_path),
+                caption="Готово! Предсказания в колонке fare_prediction",
+                reply_markup=get_menu_buttons_builder().as_markup(),
+            )
+            status = f"Обработано строк: {writer.rows} ✅"
+
+    except ModelNotReadyError:
+        status = "Модель ещё загружается, отправьте файл через минуту ❌"
+
+    except Exception:
+        logger.exception("Batch prediction failed")
+
+    finally:
+        await update_progress(progress, status)
+
+
+@router.message(StateFilter(BatchPredictionStates.file_upload))
+async def get_batch_file(message: types.Message, state: FSMContext, bot: Bot):
+    """Обработчик файла с поездками: проверка файла и постановка
+    его обработки в фоновые задачи
+
+    Args:
+        message (types.Message): Сообщение с файлом
+        state (FSMContext): Текущее состояние конечного автомата
+        bot (Bot): Бот для скачивания файла
+    """
+    document = message.document
+    if not document:
+        await flow_enter(message, state)
+        return
+
+    suffix = Path(document.file_name or "").suffix.lower()
+    if suffix not in SUPPORTED_SUFFIXES:
+        await message.answer(
+            f"Поддерживаются только файлы {', '.join(SUPPORTED_SUFFIXES)}"
+        )
+        return
+
+    if (
+        document.file_size
+        and document.file_size > settings.BATCH_PREDICTION_MAX_FILE_SIZE
+    ):
+        await message.answer("Файл слишком большой, разбейте его на несколько частей")
+        return
+
+    progress = await message.answer("Файл в очереди на обработку ⌛")
+    await state.clear()
+    # Обработчик не ждёт файл: иначе долгий файл держит воркер очереди
+    # апдейтов и аренду состояния FSM, которая истекает раньше
+    get_batch_jobs().start(score_document(bot, message.chat.id, document, progress))
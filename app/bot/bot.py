@@ -2,22 +2,45 @@ from functools import lru_cache
 
 from aiogram import Bot, Dispatcher
 
+from app.bot.batch_prediction_router import router as batch_prediction_router
+from app.bot.fsm_storage import SQLiteEventIsolation, get_fsm_storage
 from app.bot.main_router import router
+from app.bot.request_metrics import RequestMetricsMiddleware
 from app.bot.single_predicion_router import router as single_prediction_router
+from app.bot.tracing import HandlerTracingMiddleware, UpdateTracingMiddleware
 from app.settings import Settings, get_settings
+from app.utils.tracing import get_trace_buffer
 
 settings: Settings = get_settings()
 
 
 @lru_cache
 def get_bot() -> Bot:
-    return Bot(token=settings.TG_BOT_TOKEN)
+    bot = Bot(token=settings.TG_BOT_TOKEN)
+    bot.session.middleware(RequestMetricsMiddleware())
+
+    return bot
 
 
 @lru_cache
 def get_dispatcher() -> Dispatcher:
-    dispatcher = Dispatcher()
+    if settings.FSM_STORAGE == "sqlite":
+        storage = get_fsm_storage()
+        dispatcher = Dispatcher(
+            storage=storage, events_isolation=SQLiteEventIsolation(storage)
+        )
+    else:
+        dispatcher = Dispatcher()
+
     dispatcher.include_router(router)
     dispatcher.include_router(single_prediction_router)
+    dispatcher.include_router(batch_prediction_router)
+
+    if settings.TRACING_ENABLED:
+        dispatcher.update.outer_middleware(UpdateTracingMiddleware(get_trace_buffer()))
+        # Внутренние мидлвари диспетчера применяются и к хендлерам вложенных роутеров
+        handler_middleware = HandlerTracingMiddleware()
+        dispatcher.message.middleware(handler_middleware)
+        dispatcher.callback_query.middleware(handler_middleware)
 
     return dispatcher
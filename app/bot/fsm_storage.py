@@ -0,0 +1,458 @@
+"""
+Хранилище состояний FSM в SQLite, общее для нескольких процессов.
+
+Обработка апдейта - единица работы: изоляция событий берёт аренду строки
+ключа в базе (одним запросом вместе с чтением состояния), хендлеры читают
+и пишут состояние в памяти процесса, а при выходе изменения и снятие аренды
+записываются одной транзакцией вместе с другими завершившимися апдейтами.
+Пока строка арендована, другой процесс ждёт, поэтому состояние одного чата
+не обрабатывается параллельно. Данные из кэша процесса используются,
+только если версия строки в базе не изменилась
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, AsyncGenerator
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseEventIsolation,
+    BaseStorage,
+    DefaultKeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import Engine, Float, Integer, String, Text, case, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.settings import get_settings
+from app.utils.database import Base, get_engine
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Версия, состояние и данные ключа
+CachedState = tuple[int, str | None, dict[str, Any]]
+
+
+class FSMStateRecord(Base):
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    state: Mapped[str | None] = mapped_column(String, nullable=True)
+    data: Mapped[str] = mapped_column(Text)
+    version: Mapped[int] = mapped_column(Integer)
+    lock_owner: Mapped[str | None] = mapped_column(String, nullable=True)
+    lock_expires_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    updated_at: Mapped[float] = mapped_column(Float)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+
+    raise TypeError(f"{type(value).__name__} can't be stored in FSM data")
+
+
+def _decode_value(value: dict[str, Any]) -> Any:
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+
+    return value
+
+
+def dump_data(data: dict[str, Any]) -> str:
+    """Данные FSM в JSON, datetime и date сохраняются с типом"""
+    return json.dumps(data, default=_encode_value)
+
+
+def load_data(text: str) -> dict[str, Any]:
+    return json.loads(text, object_hook=_decode_value)
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+class StorageUnit:
+    """Состояние ключа на время обработки апдейта"""
+
+    __slots__ = ("owner", "version", "state", "data", "dirty")
+
+    def __init__(self, owner: str, version: int, state: str | None, data: dict):
+        self.owner = owner
+        self.version = version
+        self.state = state
+        self.data = data
+        self.dirty = False
+
+
+class FSMLockTimeoutError(TimeoutError):
+    """Состояние ключа не освободилось за отведённое время"""
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM в SQLite с кэшем процесса и пакетной записью"""
+
+    def __init__(
+        self,
+        db_url: str,
+        lock_ttl: float = 60,
+        lock_wait: float = 30,
+        cache_size: int = 10_000,
+    ):
+        """
+        Args:
+            db_url (str): URL базы SQLite
+            lock_ttl (float, optional): Время аренды ключа в секундах, после
+                которого аренду упавшего процесса может забрать другой.
+                Defaults to 60.
+            lock_wait (float, optional): Сколько секунд ждать аренды ключа,
+                занятого другим процессом. Defaults to 30.
+            cache_size (int, optional): Сколько ключей держать в кэше процесса.
+                Defaults to 10_000.
+        """
+        self.db_url = db_url
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.key_builder = DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True
+        )
+
+        self._cache: TTLCache[str, CachedState] = TTLCache(maxsize=cache_size)
+        self._units: dict[str, StorageUnit] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._pending: list[tuple[str, StorageUnit, asyncio.Future]] = []
+        self._flusher: asyncio.Task | None = None
+        self._engine: Engine | None = None
+        self._engine_lock = threading.Lock()
+
+        self.units_total = 0
+        self.cache_hits = 0
+        self.lock_waits = 0
+        self.lock_timeouts = 0
+        self.lost_locks = 0
+        self.flushes_total = 0
+        self.flushed_units = 0
+
+    def _get_engine(self) -> Engine:
+        with self._engine_lock:
+            if self._engine is None:
+                engine = get_engine(self.db_url)
+                FSMStateRecord.__table__.create(engine, checkfirst=True)
+                self._engine = engine
+
+        return self._engine
+
+    def _db_acquire(
+        self, key: str, owner: str, cached_version: int | None
+    ) -> tuple[int, str | None, str | None] | None:
+        """Аренда строки ключа и чтение состояния одним запросом,
+        данные не читаются, если версия совпадает с кэшем
+
+        Returns:
+            tuple[int, str | None, str | None] | None: Версия, состояние и данные
+                (None, если они в кэше) или None, если ключ арендован другим
+        """
+        now = time.time()
+        statement = insert(FSMStateRecord).values(
+            key=key,
+            state=None,
+            data="{}",
+            version=0,
+            lock_owner=owner,
+            lock_expires_at=now + self.lock_ttl,
+            updated_at=now,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[FSMStateRecord.key],
+            set_={
+                "lock_owner": statement.excluded.lock_owner,
+                "lock_expires_at": statement.excluded.lock_expires_at,
+            },
+            where=or_(
+                FSMStateRecord.lock_owner.is_(None),
+                FSMStateRecord.lock_expires_at < now,
+            ),
+        ).returning(
+            FSMStateRecord.version,
+            FSMStateRecord.state,
+            case(
+                (FSMStateRecord.version == cached_version, None),
+                else_=FSMStateRecord.data,
+            ),
+        )
+
+        with Session(self._get_engine()) as session:
+            row = session.execute(statement).first()
+            session.commit()
+
+        return tuple(row) if row is not None else None
+
+    def _db_flush(
+        self, units: list[tuple[str, StorageUnit]]
+    ) -> list[tuple[int, str] | None]:
+        """Запись изменённых состояний и снятие аренды одной транзакцией
+
+        Returns:
+            list[tuple[int, str] | None]: Новая версия и данные для каждого ключа
+                или None, если аренду ключа уже забрал другой процесс
+        """
+        now = time.time()
+        results = []
+
+        with Session(self._get_engine()) as session:
+            for key, unit in units:
+                values: dict[str, Any] = {"lock_owner": None, "lock_expires_at": None}
+                if unit.dirty:
+                    values.update(
+                        state=unit.state,
+                        data=dump_data(unit.data),
+                        version=FSMStateRecord.version + 1,
+                        updated_at=now,
+                    )
+
+                statement = (
+                    update(FSMStateRecord)
+                    .where(
+                        FSMStateRecord.key == key,
+                        FSMStateRecord.lock_owner == unit.owner,
+                    )
+                    .values(**values)
+                    .returning(FSMStateRecord.version)
+                )
+                version = session.execute(statement).scalar()
+                results.append(
+                    (version, values.get("data")) if version is not None else None
+                )
+
+            session.commit()
+
+        return results
+
+    def _db_read(self, key: str) -> tuple[str | None, dict[str, Any]]:
+        with Session(self._get_engine()) as session:
+            row = session.execute(
+                select(FSMStateRecord.state, FSMStateRecord.data).where(
+                    FSMStateRecord.key == key
+                )
+            ).first()
+
+        if row is None:
+            return None, {}
+
+        return row.state, load_data(row.data)
+
+    def _db_write(self, key: str, **values: Any):
+        now = time.time()
+        if "data" in values:
+            values["data"] = dump_data(values["data"])
+
+        statement = insert(FSMStateRecord).values(
+            key=key,
+            **{"state": None, "data": "{}", **values},
+            version=1,
+            updated_at=now,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[FSMStateRecord.key],
+            set_={**values, "version": FSMStateRecord.version + 1, "updated_at": now},
+        )
+
+        with Session(self._get_engine()) as session:
+            session.execute(statement)
+            session.commit()
+
+        self._cache.pop(key)
+
+    async def _acquire(self, key: str) -> StorageUnit:
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        cached = self._cache.get(key, count=False)
+        cached_version = cached[0] if cached is not None else None
+
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.01
+        while True:
+            row = await asyncio.to_thread(self._db_acquire, key, owner, cached_version)
+            if row is not None:
+                break
+
+            if time.monotonic() + delay > deadline:
+                self.lock_timeouts += 1
+                raise FSMLockTimeoutError(f"FSM state {key} is locked")
+
+            self.lock_waits += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+        version, state, data = row
+        if data is None:
+            self.cache_hits += 1
+            data = dict(cached[2])
+        else:
+            data = load_data(data)
+
+        return StorageUnit(owner, version, state, data)
+
+    async def _release(self, key: str, unit: StorageUnit):
+        """Запись состояния и снятие аренды, завершившиеся одновременно
+        апдейты записываются одной транзакцией"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((key, unit, future))
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_pending())
+
+        await asyncio.shield(future)
+
+    async def _flush_pending(self):
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                results = await asyncio.to_thread(
+                    self._db_flush, [(key, unit) for key, unit, _ in batch]
+                )
+            except Exception as err:
+                for key, _, future in batch:
+                    self._cache.pop(key)
+                    future.set_exception(err)
+                continue
+
+            self.flushes_total += 1
+            self.flushed_units += len(batch)
+            for (key, unit, future), result in zip(batch, results):
+                if result is None:
+                    logger.warning("FSM lock for %s expired before write", key)
+                    self.lost_locks += 1
+                    self._cache.pop(key)
+                else:
+                    self._cache.set(key, (result[0], unit.state, unit.data))
+
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def unit(self, key: StorageKey) -> AsyncGenerator[StorageUnit, None]:
+        """Единица работы над состоянием ключа: аренда, чтение, запись при выходе
+
+        Args:
+            key (StorageKey): Ключ FSM
+
+        Raises:
+            FSMLockTimeoutError: если ключ не освободился за lock_wait секунд
+        """
+        storage_key = self.key_builder.build(key)
+        lock = self._locks.setdefault(storage_key, asyncio.Lock())
+
+        try:
+            async with lock:
+                unit = await self._acquire(storage_key)
+                self._units[storage_key] = unit
+                self.units_total += 1
+                try:
+                    yield unit
+                finally:
+                    del self._units[storage_key]
+                    await self._release(storage_key, unit)
+        finally:
+            if not lock.locked() and self._locks.get(storage_key) is lock:
+                del self._locks[storage_key]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        unit = self._units.get(storage_key)
+        if unit is None:
+            await asyncio.to_thread(
+                self._db_write, storage_key, state=_state_name(state)
+            )
+            return
+
+        unit.state = _state_name(state)
+        unit.dirty = True
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        storage_key = self.key_builder.build(key)
+        unit = self._units.get(storage_key)
+        if unit is None:
+            state, _ = await asyncio.to_thread(self._db_read, storage_key)
+            return state
+
+        return unit.state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        unit = self._units.get(storage_key)
+        if unit is None:
+            await asyncio.to_thread(self._db_write, storage_key, data=data)
+            return
+
+        unit.data = data.copy()
+        unit.dirty = True
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        storage_key = self.key_builder.build(key)
+        unit = self._units.get(storage_key)
+        if unit is None:
+            _, data = await asyncio.to_thread(self._db_read, storage_key)
+            return data
+
+        return unit.data.copy()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+    def stats(self) -> dict[str, int | float]:
+        flushes = self.flushes_total or 1
+
+        return {
+            "active_units": len(self._units),
+            "cached_keys": len(self._cache),
+            "units_total": self.units_total,
+            "cache_hits": self.cache_hits,
+            "lock_waits": self.lock_waits,
+            "lock_timeouts": self.lock_timeouts,
+            "lost_locks": self.lost_locks,
+            "flushes_total": self.flushes_total,
+            "mean_flush_batch": self.flushed_units / flushes,
+        }
+
+
+class SQLiteEventIsolation(BaseEventIsolation):
+    """Изоляция событий по ключу FSM между апдейтами и процессами,
+    на время обработки состояние ключа живёт в памяти SQLiteStorage"""
+
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        async with self.storage.unit(key):
+            yield
+
+    async def close(self) -> None:
+        pass
+
+
+@lru_cache
+def get_fsm_storage() -> SQLiteStorage:
+    settings = get_settings()
+
+    return SQLiteStorage(
+        db_url=settings.FSM_DB_URL,
+        lock_ttl=settings.FSM_LOCK_TTL_SECONDS,
+        lock_wait=settings.FSM_LOCK_WAIT_SECONDS,
+        cache_size=settings.FSM_CACHE_SIZE,
+    )
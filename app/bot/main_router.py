@@ -3,6 +3,15 @@ from aiogram.enums.parse_mode import ParseMode
 from aiogram.filters import Command, or_f
 
 from app.bot.menu_buttons import MenuButtons, MenuButtonsData, get_menu_buttons_builder
+from app.utils.metrics import (
+    GEOCODING,
+    MODEL_PREDICT,
+    UPDATE,
+    bot_updates,
+    metrics,
+    predicted_trips,
+    stage_histogram,
+)
 
 router = Router()
 
@@ -76,3 +85,63 @@ async def info_button(callback_query: types.CallbackQuery, **kwargs):
         link_preview_options=types.LinkPreviewOptions(is_disabled=True),
         reply_markup=builder.as_markup(),
     )
+
+
+def format_duration(seconds: float) -> str:
+    """Время работы в виде: 2 д 3 ч 15 мин"""
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+
+    parts = [f"{days} д"] if days else []
+    if days or hours:
+        parts.append(f"{hours} ч")
+    parts.append(f"{minutes} мин")
+
+    return " ".join(parts)
+
+
+def format_ms(seconds: float) -> str:
+    ms = seconds * 1000
+    return f"{ms:.1f} мс" if ms < 10 else f"{ms:.0f} мс"
+
+
+def format_latency(stage: str) -> str:
+    """Медиана и 95-й перцентиль длительности этапа в миллисекундах"""
+    histogram = stage_histogram(stage)
+    p50, p95 = histogram.quantile(0.5), histogram.quantile(0.95)
+    if p50 is None:
+        return "нет данных"
+
+    return f"{format_ms(p50)}, у 95% быстрее {format_ms(p95)}"
+
+
+def get_rating_text() -> str:
+    """Сводка метрик процесса для кнопки 'Статистика бота'"""
+    return f"""
+<b>Статистика бота</b>
+
+• Работает без перезапуска: {format_duration(metrics.uptime())}
+• Получено сообщений и нажатий: {bot_updates.total():.0f}
+• Предсказано поездок: {predicted_trips.total():.0f}
+
+Время ответа:
+• Обработка сообщения: {format_latency(UPDATE)}
+• Поиск адреса: {format_latency(GEOCODING)}
+• Работа модели: {format_latency(MODEL_PREDICT)}
+"""
+
+
+@router.callback_query(F.data == MenuButtonsData(action=MenuButtons.RATING).pack())
+async def rating_button(callback_query: types.CallbackQuery, **kwargs):
+    """Обработчик для инлайн кнопки 'Статистика бота'
+
+    Args:
+        callback_query (types.CallbackQuery): данные коллбэк кнопки Статистика бота
+    """
+    builder = get_menu_buttons_builder()
+    await callback_query.message.answer(
+        text=get_rating_text(),
+        parse_mode=ParseMode.HTML,
+        reply_markup=builder.as_markup(),
+    )
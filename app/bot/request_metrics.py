@@ -0,0 +1,25 @@
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from app.utils.metrics import TELEGRAM_SEND, telegram_requests, track_stage
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Замер запросов бота к Telegram Bot API: длительность
+    в этапе TELEGRAM_SEND и количество вызовов по методам API"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        telegram_requests.labels(method.__api_method__).inc()
+
+        with track_stage(TELEGRAM_SEND):
+            return await make_request(bot, method)
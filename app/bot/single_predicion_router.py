@@ -11,8 +11,13 @@ from pydantic import ValidationError
 
 from app.bot.menu_buttons import MenuButtons, MenuButtonsData
 from app.bot.validators import validate_coordinates, validate_datetime
-from app.model import TaxiTravel, predict
+from app.model import TaxiTravel
+from app.model_registry import ModelNotReadyError
+from app.prediction_service import get_prediction_service
+from app.utils.gazetteer import get_gazetteer
 from app.utils.geocode_client import geocode_client
+from app.utils.metrics import VALIDATION, geocode_resolutions, track_stage
+from app.utils.rate_limiter import RateLimitTimeoutError
 
 
 class SinglePredictionStates(StatesGroup):
@@ -78,7 +83,8 @@ async def flow_enter_inline_button(
 async def get_coords_from_text(text: str) -> tuple[str, str]:
     """Обработчик для получения координат из текста
     1. Если предоставлены координаты - парсим их и возвращаем
-    2. Если предоставлен адрес - обращаемся к геокодеру за координатами
+    2. Если адрес есть в локальном справочнике - берём координаты из него
+    3. Иначе обращаемся к геокодеру за координатами
 
     Args:
         text (str): Текст сообщения
@@ -87,22 +93,32 @@ async def get_coords_from_text(text: str) -> tuple[str, str]:
         tuple[str, str]: кортеж из координат
     """
     if re.match(r"-?\d{1,2} -?\d{1,3}", text):
+        geocode_resolutions.labels("coordinates").inc()
         return text.split(" ")
 
-    else:
-        try:
-            geocoding_results = await geocode_client.get_coordinates(text)
-            if not geocoding_results:
-                return
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        match = gazetteer.lookup(text)
+        if match is not None:
+            geocode_resolutions.labels("gazetteer").inc()
+            return str(match.lat), str(match.lon)
 
-            geocoding_results = sorted(
-                geocoding_results, key=lambda x: x.importance, reverse=True
-            )[0]
+    try:
+        geocoding_results = await geocode_client.get_coordinates(text)
+        if not geocoding_results:
+            geocode_resolutions.labels("not_found").inc()
+            return
 
-            return geocoding_results.lat, geocoding_results.lon
+        geocoding_results = sorted(
+            geocoding_results, key=lambda x: x.importance, reverse=True
+        )[0]
 
-        except aiohttp.ClientError:
-            return
+        geocode_resolutions.labels("geocoder").inc()
+        return geocoding_results.lat, geocoding_results.lon
+
+    except (aiohttp.ClientError, RateLimitTimeoutError):
+        geocode_resolutions.labels("error").inc()
+        return
 
 
 async def message_dropoff_point(message: types.message, state: FSMContext):
@@ -234,11 +250,16 @@ async def get_pickup_date(message: types.Message, state: FSMContext):
     data = await state.get_data()
     data["pickup_datetime"] = dt
     try:
-        data = TaxiTravel(**data).model_dump_df()
+        with track_stage(VALIDATION):
+            trip = TaxiTravel(**data)
+
         await message.answer(text="Готовим предсказание ⌛")
-        prediction = round(predict(data)[0], 2)
+        prediction = round(await get_prediction_service().predict(trip), 2)
         await message.answer(text=f"Цена поездки: {prediction}")
 
+    except ModelNotReadyError:
+        await message.answer("Модель ещё загружается, попробуйте через минуту")
+
     except ValidationError as e:
         error_message = "Обнаружены ошибки:\n\n"
         for err in e.errors():
@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.bot.update_dedup import update_type
+from app.utils.tracing import TraceBuffer, span
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateTracingMiddleware(BaseMiddleware):
+    """Трасса на всю обработку апдейта в dispatcher.feed_update,
+    этапы и хендлеры внутри пишутся в неё спанами"""
+
+    def __init__(self, trace_buffer: TraceBuffer):
+        self.trace_buffer = trace_buffer
+
+    async def __call__(
+        self, handler: Handler, event: Update, data: dict[str, Any]
+    ) -> Any:
+        with self.trace_buffer.trace(
+            "update", update_id=event.update_id, type=update_type(event)
+        ):
+            return await handler(event, data)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """Спан на вызов хендлера с его именем"""
+
+    async def __call__(
+        self, handler: Handler, event: TelegramObject, data: dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+
+        with span(f"handler:{name}"):
+            return await handler(event, data)
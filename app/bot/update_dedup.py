@@ -0,0 +1,249 @@
+"""
+Отбрасывание повторных доставок апдейтов телеграма и одинаковых
+сообщений, отправленных пользователем несколько раз подряд.
+
+update_id запоминаются в SQLite базе FSM, общей для всех воркеров:
+повторная доставка может прийти в другой процесс. Склейка одинаковых
+сообщений работает в пределах процесса
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from aiogram.types import Update
+from sqlalchemy import BigInteger, Engine, Float, delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.settings import get_settings
+from app.utils.database import Base, get_engine
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MessageKey = tuple[int, int | None, str]
+
+# Как часто процесс удаляет из базы update_id старше окна
+PRUNE_INTERVAL_SECONDS = 60
+
+
+class SeenUpdateRecord(Base):
+    __tablename__ = "seen_updates"
+
+    update_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    received_at: Mapped[float] = mapped_column(Float, index=True)
+
+
+def message_key(update: Update) -> MessageKey | None:
+    """Ключ текстового сообщения для склейки одинаковых сообщений одного чата.
+    Нажатия инлайн кнопок не склеиваются: повторное нажатие той же кнопки -
+    обычное действие пользователя, и на каждый callback нужно ответить
+
+    Args:
+        update (Update): Апдейт от телеграма
+
+    Returns:
+        MessageKey | None: Чат, пользователь и текст
+            или None, если апдейт не склеивается
+    """
+    message = update.message
+    if message is None or message.text is None:
+        return None
+
+    user_id = message.from_user.id if message.from_user else None
+    return (message.chat.id, user_id, message.text)
+
+
+def update_type(update: Update) -> str:
+    """Тип апдейта для метрик и трасс, неизвестный aiogram тип не ломает обработку"""
+    try:
+        return update.event_type
+    except LookupError:
+        return "unknown"
+
+
+class UpdateDeduplicator:
+    """Окно недавно полученных update_id и содержимого сообщений"""
+
+    def __init__(
+        self,
+        db_url: str | None = None,
+        window: float = 3600,
+        maxsize: int = 100_000,
+        message_window: float = 2.0,
+    ):
+        """
+        Args:
+            db_url (str | None, optional): URL базы, общей для воркеров,
+                None - update_id помнит только процесс. Defaults to None.
+            window (float, optional): Сколько секунд помнить update_id.
+                Defaults to 3600.
+            maxsize (int, optional): Максимальное количество запомненных
+                апдейтов. Defaults to 100_000.
+            message_window (float, optional): Окно в секундах, в котором
+                одинаковые сообщения чата склеиваются в одно, 0 - не склеивать.
+                Defaults to 2.0.
+        """
+        self.db_url = db_url
+        self.window = window
+        self.message_window = message_window
+        self._updates: TTLCache[int, bool] = TTLCache(maxsize=maxsize, ttl=window)
+        self._messages: TTLCache[MessageKey, int] = TTLCache(
+            maxsize=maxsize, ttl=message_window or None
+        )
+
+        self._engine: Engine | None = None
+        self._engine_lock = threading.Lock()
+        self._pruned_at = 0.0
+
+        self.duplicate_updates = 0
+        self.shared_duplicates = 0
+        self.db_errors = 0
+        self.coalesced_messages = 0
+
+    def _get_engine(self) -> Engine:
+        with self._engine_lock:
+            if self._engine is None:
+                engine = get_engine(self.db_url)
+                SeenUpdateRecord.__table__.create(engine, checkfirst=True)
+                self._engine = engine
+
+        return self._engine
+
+    def _db_claim(self, update_id: int) -> bool:
+        """Запись update_id в базу, если его там нет или он старше окна
+
+        Returns:
+            bool: False, если апдейт уже получил другой процесс
+        """
+        now = time.time()
+        expired_before = now - self.window
+
+        statement = insert(SeenUpdateRecord).values(
+            update_id=update_id, received_at=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[SeenUpdateRecord.update_id],
+            set_={"received_at": statement.excluded.received_at},
+            where=SeenUpdateRecord.received_at < expired_before,
+        ).returning(SeenUpdateRecord.update_id)
+
+        with Session(self._get_engine()) as session:
+            claimed = session.execute(statement).first() is not None
+
+            if now - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = now
+                session.execute(
+                    delete(SeenUpdateRecord).where(
+                        SeenUpdateRecord.received_at < expired_before
+                    )
+                )
+
+            session.commit()
+
+        return claimed
+
+    def _db_forget(self, update_id: int):
+        with Session(self._get_engine()) as session:
+            session.execute(
+                delete(SeenUpdateRecord).where(SeenUpdateRecord.update_id == update_id)
+            )
+            session.commit()
+
+    async def _claim(self, update_id: int) -> bool:
+        if self.db_url is None:
+            return True
+
+        try:
+            return await asyncio.to_thread(self._db_claim, update_id)
+        except Exception:
+            # Лучше обработать повтор, чем потерять апдейт
+            self.db_errors += 1
+            logger.warning(
+                "Can't check update %s in the database", update_id, exc_info=True
+            )
+            return True
+
+    async def is_duplicate(self, update: Update) -> bool:
+        """Проверка апдейта, новый апдейт запоминается
+
+        Args:
+            update (Update): Апдейт от телеграма
+
+        Returns:
+            bool: True, если апдейт уже обрабатывался этим или другим воркером
+                или повторяет недавнее сообщение того же чата
+        """
+        if update.update_id in self._updates:
+            self.duplicate_updates += 1
+            return True
+
+        self._updates.set(update.update_id, True)
+
+        if not await self._claim(update.update_id):
+            self.duplicate_updates += 1
+            self.shared_duplicates += 1
+            return True
+
+        if not self.message_window:
+            return False
+
+        key = message_key(update)
+        if key is None:
+            return False
+
+        if key in self._messages:
+            self.coalesced_messages += 1
+            return True
+
+        self._messages.set(key, update.update_id)
+        return False
+
+    async def forget(self, update: Update):
+        """Удаление апдейта из окна, чтобы повторная доставка
+        после ошибки обработки не отбросилась
+
+        Args:
+            update (Update): Апдейт от телеграма
+        """
+        self._updates.pop(update.update_id)
+
+        if self.db_url is not None:
+            try:
+                await asyncio.to_thread(self._db_forget, update.update_id)
+            except Exception:
+                self.db_errors += 1
+                logger.warning(
+                    "Can't forget update %s in the database",
+                    update.update_id,
+                    exc_info=True,
+                )
+
+        key = message_key(update)
+        if key is not None and self._messages.get(key, count=False) == update.update_id:
+            self._messages.pop(key)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "tracked_updates": len(self._updates),
+            "duplicate_updates": self.duplicate_updates,
+            "shared_duplicates": self.shared_duplicates,
+            "db_errors": self.db_errors,
+            "coalesced_messages": self.coalesced_messages,
+        }
+
+
+@lru_cache
+def get_update_deduplicator() -> UpdateDeduplicator:
+    settings = get_settings()
+
+    return UpdateDeduplicator(
+        # Та же база, что у FSM: с хранилищем в памяти воркер всё равно один
+        db_url=settings.FSM_DB_URL if settings.FSM_STORAGE == "sqlite" else None,
+        window=settings.UPDATE_DEDUP_WINDOW_SECONDS,
+        maxsize=settings.UPDATE_DEDUP_MAX_SIZE,
+        message_window=settings.MESSAGE_COALESCE_WINDOW_SECONDS,
+    )
@@ -0,0 +1,181 @@
+"""
+Очередь входящих апдейтов телеграма: вебхук сразу отвечает телеграму,
+а апдейты обрабатывают фоновые воркеры
+"""
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from app.bot.bot import get_bot, get_dispatcher
+from app.settings import get_settings
+from app.utils.metrics import UPDATE, stage_errors, stage_histogram
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """Ограниченная очередь апдейтов с пулом воркеров"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        maxsize: int = 1000,
+        workers: int = 8,
+        put_timeout: float = 1.0,
+    ):
+        """
+        Args:
+            dispatcher (Dispatcher): Диспетчер бота
+            bot (Bot): Бот
+            maxsize (int, optional): Максимальная длина очереди. Defaults to 1000.
+            workers (int, optional): Количество воркеров. Defaults to 8.
+            put_timeout (float, optional): Сколько секунд апдейт ждёт места
+                в полной очереди, после чего отбрасывается. Defaults to 1.0.
+        """
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.maxsize = maxsize
+        self.workers = workers
+        self.put_timeout = put_timeout
+
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._closing = False
+
+        self.received_total = 0
+        self.processed_total = 0
+        self.dropped_total = 0
+        self.errors_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.handle_seconds_total = 0.0
+
+    def start(self):
+        """Запуск воркеров в текущем event loop"""
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._run(), name=f"update_queue_{i}")
+            for i in range(self.workers)
+        ]
+
+    async def close(self, timeout: float | None = None):
+        """Остановка приёма апдейтов и обработка оставшихся в очереди
+
+        Args:
+            timeout (float | None, optional): Сколько секунд ждать обработки
+                очереди, после чего воркеры отменяются. Defaults to None.
+        """
+        self._closing = True
+
+        if self._queue is not None:
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._queue.join()
+            except TimeoutError:
+                logger.warning(
+                    "Update queue wasn't drained, %s updates left",
+                    self._queue.qsize(),
+                )
+
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def put(self, update: Update) -> bool:
+        """Постановка апдейта в очередь
+
+        Args:
+            update (Update): Апдейт от телеграма
+
+        Returns:
+            bool: False, если очередь переполнена или закрывается
+                и апдейт отброшен
+        """
+        self.received_total += 1
+        if self._closing:
+            self.dropped_total += 1
+            return False
+
+        self.start()
+
+        item = (update, time.perf_counter())
+        try:
+            if self.put_timeout > 0:
+                async with asyncio.timeout(self.put_timeout):
+                    await self._queue.put(item)
+            else:
+                self._queue.put_nowait(item)
+
+        except (TimeoutError, asyncio.QueueFull):
+            logger.warning("Update queue is full, update %s dropped", update.update_id)
+            self.dropped_total += 1
+            return False
+
+        return True
+
+    async def _run(self):
+        while True:
+            update, enqueued_at = await self._queue.get()
+
+            started = time.perf_counter()
+            wait = started - enqueued_at
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+            try:
+                await self.dispatcher.feed_update(bot=self.bot, update=update)
+            except Exception:
+                logger.exception("Update %s handling failed", update.update_id)
+                self.errors_total += 1
+                stage_errors.labels(UPDATE).inc()
+            finally:
+                elapsed = time.perf_counter() - started
+                self.processed_total += 1
+                self.handle_seconds_total += elapsed
+                stage_histogram(UPDATE).observe(elapsed)
+                self._queue.task_done()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict[str, int | float]:
+        processed = self.processed_total or 1
+
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "received_total": self.received_total,
+            "processed_total": self.processed_total,
+            "dropped_total": self.dropped_total,
+            "errors_total": self.errors_total,
+            "mean_wait_ms": self.wait_seconds_total / processed * 1000,
+            "max_wait_ms": self.wait_seconds_max * 1000,
+            "mean_handle_ms": self.handle_seconds_total / processed * 1000,
+        }
+
+
+@lru_cache
+def get_update_queue() -> UpdateQueue:
+    settings = get_settings()
+
+    return UpdateQueue(
+        dispatcher=get_dispatcher(),
+        bot=get_bot(),
+        maxsize=settings.WEBHOOK_QUEUE_SIZE,
+        workers=settings.WEBHOOK_QUEUE_WORKERS,
+        put_timeout=settings.WEBHOOK_QUEUE_PUT_TIMEOUT_SECONDS,
+    )
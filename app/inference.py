@@ -0,0 +1,397 @@
+"""
+Быстрый путь предсказания одной поездки без pandas:
+TaxiTravel или кортеж -> массив признаков фиксированного порядка -> модель
+"""
+
+import weakref
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable
+
+import numpy as np
+
+from app.model import (
+    FEATURES_ORDER,
+    GEODESIC_DISTANCE_FUNCS,
+    FeatureEngineering,
+    TaxiTravel,
+    calculate_distance,
+    feature_transformer,
+    get_calendar_table,
+    get_model,
+    get_transformer,
+    predict,
+)
+from app.utils.metrics import (
+    FEATURE_ENGINEERING,
+    MODEL_PREDICT,
+    predicted_trips,
+    track_stage,
+)
+
+# Классы шагов нужны только при разборе загруженной модели, которая уже
+# импортировала sklearn и category_encoders
+if TYPE_CHECKING:
+    from category_encoders import TargetEncoder
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+# Порядок полей кортежа совпадает с порядком полей TaxiTravel
+TripTuple = tuple[datetime, float, float, float, float, float]
+
+ArrayStep = Callable[[np.ndarray], np.ndarray]
+
+
+class UnsupportedPipelineError(Exception):
+    """Шаг пайплайна нельзя выполнить без pandas"""
+
+
+StepSpec = dict[str, Any]
+
+
+def _describe_target_encoder(
+    encoder: "TargetEncoder", columns: list[str] | None
+) -> StepSpec:
+    if columns is None or encoder.handle_unknown != "value":
+        raise UnsupportedPipelineError(encoder)
+
+    lookups = []
+    for ordinal_mapping in encoder.ordinal_encoder.mapping:
+        col = ordinal_mapping["col"]
+        target_mapping = encoder.mapping[col]
+        default = float(target_mapping.loc[-1])
+
+        categories = ordinal_mapping["mapping"].drop(np.nan, errors="ignore")
+        keys = categories.index.to_numpy(np.float64)
+        values = np.array([target_mapping.get(i, default) for i in categories])
+
+        order = np.argsort(keys)
+        lookups.append(
+            {
+                "column": columns.index(col),
+                "keys": keys[order].tolist(),
+                "values": values[order].tolist(),
+                "default": default,
+            }
+        )
+
+    return {"type": "target_encoder", "lookups": lookups}
+
+
+def _describe_polynomial_features(poly: "PolynomialFeatures") -> StepSpec:
+    return {"type": "polynomial_features", "powers": poly.powers_.tolist()}
+
+
+def _describe_standard_scaler(scaler: "StandardScaler") -> StepSpec:
+    return {
+        "type": "standard_scaler",
+        "mean": scaler.mean_.tolist() if scaler.with_mean else 0.0,
+        "scale": scaler.scale_.tolist() if scaler.with_std else 1.0,
+    }
+
+
+def describe_steps(
+    pipeline_steps: list[tuple[str, object]], columns: list[str] | None
+) -> tuple[list[StepSpec], list[str] | None]:
+    """Параметры шагов предобработки в виде JSON-совместимых словарей
+
+    Args:
+        pipeline_steps (list[tuple[str, object]]): Шаги sklearn Pipeline
+        columns (list[str] | None): Колонки на входе шагов
+
+    Raises:
+        UnsupportedPipelineError: если шаг нельзя выполнить без pandas
+
+    Returns:
+        tuple[list[StepSpec], list[str] | None]: Параметры шагов и колонки
+            на выходе, None - если колонки потеряли имена
+    """
+    from category_encoders import TargetEncoder
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+    specs = []
+    for _, step in pipeline_steps:
+        if step is None or step == "passthrough":
+            continue
+
+        if isinstance(step, Pipeline):
+            nested_specs, columns = describe_steps(step.steps, columns)
+            specs.extend(nested_specs)
+        elif isinstance(step, TargetEncoder):
+            specs.append(_describe_target_encoder(step, columns))
+        elif isinstance(step, PolynomialFeatures):
+            specs.append(_describe_polynomial_features(step))
+            columns = None
+        elif isinstance(step, StandardScaler):
+            specs.append(_describe_standard_scaler(step))
+        else:
+            raise UnsupportedPipelineError(step)
+
+    return specs, columns
+
+
+def _build_target_encoder(spec: StepSpec) -> ArrayStep:
+    lookups = [
+        (
+            i["column"],
+            np.array(i["keys"], np.float64),
+            np.array(i["values"], np.float64),
+            i["default"],
+        )
+        for i in spec["lookups"]
+    ]
+
+    def transform(X: np.ndarray) -> np.ndarray:
+        X = X.copy()
+        for i, keys, values, default in lookups:
+            position = np.searchsorted(keys, X[:, i]).clip(0, len(keys) - 1)
+            found = keys[position] == X[:, i]
+            X[:, i] = np.where(found, values[position], default)
+
+        return X
+
+    return transform
+
+
+def _build_polynomial_features(spec: StepSpec) -> ArrayStep:
+    powers = np.array(spec["powers"], np.int64)
+
+    def transform(X: np.ndarray) -> np.ndarray:
+        return np.prod(X[:, None, :] ** powers, axis=2)
+
+    return transform
+
+
+def _build_standard_scaler(spec: StepSpec) -> ArrayStep:
+    mean = np.asarray(spec["mean"], np.float64)
+    scale = np.asarray(spec["scale"], np.float64)
+
+    def transform(X: np.ndarray) -> np.ndarray:
+        return (X - mean) / scale
+
+    return transform
+
+
+STEP_BUILDERS: dict[str, Callable[[StepSpec], ArrayStep]] = {
+    "target_encoder": _build_target_encoder,
+    "polynomial_features": _build_polynomial_features,
+    "standard_scaler": _build_standard_scaler,
+}
+
+
+def build_steps(specs: list[StepSpec]) -> list[ArrayStep]:
+    """NumPy-преобразования по параметрам шагов из describe_steps
+
+    Args:
+        specs (list[StepSpec]): Параметры шагов
+
+    Raises:
+        UnsupportedPipelineError: если тип шага неизвестен
+
+    Returns:
+        list[ArrayStep]: Преобразования в порядке шагов
+    """
+    steps = []
+    for spec in specs:
+        if spec["type"] not in STEP_BUILDERS:
+            raise UnsupportedPipelineError(spec["type"])
+
+        steps.append(STEP_BUILDERS[spec["type"]](spec))
+
+    return steps
+
+
+class CompiledPipeline:
+    """Pipeline, разложенный на NumPy-преобразования и итоговый эстиматор"""
+
+    def __init__(self, pipeline: "Pipeline", columns: list[str]):
+        from sklearn.pipeline import Pipeline
+
+        if isinstance(pipeline, Pipeline):
+            specs, _ = describe_steps(pipeline.steps[:-1], list(columns))
+            self.steps = build_steps(specs)
+            self.estimator = pipeline.steps[-1][1]
+        else:
+            self.steps = []
+            self.estimator = pipeline
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Предсказание по массиву признаков в порядке FEATURES_ORDER
+
+        Args:
+            X (np.ndarray): Матрица признаков формы (n, len(FEATURES_ORDER))
+
+        Returns:
+            np.ndarray: Предсказания модели
+        """
+        for step in self.steps:
+            X = step(X)
+
+        return self.estimator.predict(X)
+
+
+_compiled_pipelines: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_compiled_pipeline(pipeline: "Pipeline") -> CompiledPipeline | None:
+    """Скомпилированная версия пайплайна, кэшируется на время жизни модели
+
+    Args:
+        pipeline (Pipeline): Загруженная модель
+
+    Returns:
+        CompiledPipeline | None: None, если пайплайн нельзя выполнить без pandas
+    """
+    if pipeline not in _compiled_pipelines:
+        try:
+            compiled = CompiledPipeline(pipeline, FEATURES_ORDER)
+        except UnsupportedPipelineError:
+            compiled = None
+
+        _compiled_pipelines[pipeline] = compiled
+
+    return _compiled_pipelines[pipeline]
+
+
+def trip_features(
+    trip: TaxiTravel | TripTuple, transformer: FeatureEngineering = feature_transformer
+) -> np.ndarray:
+    """Признаки одной поездки в порядке FEATURES_ORDER, те же что у FeatureEngineering
+
+    Args:
+        trip (TaxiTravel | TripTuple): Провалидированная поездка или кортеж полей
+            в порядке TaxiTravel
+        transformer (FeatureEngineering, optional): Источник функции расстояния.
+            Defaults to feature_transformer.
+
+    Returns:
+        np.ndarray: Вектор признаков типа float64
+    """
+    if isinstance(trip, TaxiTravel):
+        trip = (
+            trip.pickup_datetime,
+            trip.pickup_latitude,
+            trip.pickup_longitude,
+            trip.dropoff_latitude,
+            trip.dropoff_longitude,
+            trip.passenger_count,
+        )
+
+    (
+        pickup_datetime,
+        pickup_latitude,
+        pickup_longitude,
+        dropoff_latitude,
+        dropoff_longitude,
+        passenger_count,
+    ) = trip
+
+    distance_func = transformer.get_distance_func()
+    distance = calculate_distance(
+        np.array([pickup_latitude], np.float64),
+        np.array([pickup_longitude], np.float64),
+        np.array([dropoff_latitude], np.float64),
+        np.array([dropoff_longitude], np.float64),
+        distance_func,
+        transformer=(
+            None if distance_func in GEODESIC_DISTANCE_FUNCS else get_transformer()
+        ),
+    )
+
+    date = np.datetime64(pickup_datetime.date(), "D")
+    calendar = get_calendar_table()
+    index = calendar.day_index(np.array([date]))
+    if not calendar.covers(index):
+        calendar = get_calendar_table(pickup_datetime.year, pickup_datetime.year)
+        index = calendar.day_index(np.array([date]))
+
+    calendar_features = calendar.gather(index)
+
+    return np.array(
+        [
+            pickup_longitude,
+            pickup_latitude,
+            dropoff_longitude,
+            dropoff_latitude,
+            passenger_count,
+            calendar_features["year"][0],
+            calendar_features["month"][0],
+            calendar_features["day"][0],
+            calendar_features["hour"][0],
+            distance[0] / 1000,
+            calendar_features["is_holiday"][0],
+            calendar_features["is_weekend"][0],
+        ],
+        dtype=np.float64,
+    )
+
+
+def batch_features(trips: list[TaxiTravel]) -> np.ndarray:
+    """Матрица признаков поездок в порядке FEATURES_ORDER, которую можно
+    передать сразу нескольким моделям
+
+    Args:
+        trips (list[TaxiTravel]): Провалидированные поездки
+
+    Returns:
+        np.ndarray: Матрица признаков типа float64
+    """
+    with track_stage(FEATURE_ENGINEERING):
+        if len(trips) == 1:
+            return trip_features(trips[0])[None, :]
+
+        import pandas as pd
+
+        X = pd.DataFrame([trip.model_dump(mode="python") for trip in trips])
+        return feature_transformer.transform(X)[FEATURES_ORDER].to_numpy(np.float64)
+
+
+def predict_features(model: "Pipeline", features: np.ndarray) -> np.ndarray:
+    """Предсказание модели по готовой матрице признаков
+
+    Args:
+        model (Pipeline): Модель
+        features (np.ndarray): Матрица признаков в порядке FEATURES_ORDER
+
+    Returns:
+        np.ndarray: Предсказания модели
+    """
+    compiled = get_compiled_pipeline(model)
+    if compiled is None:
+        import pandas as pd
+
+        return model.predict(pd.DataFrame(features, columns=FEATURES_ORDER))
+
+    return compiled.predict(features)
+
+
+def predict_one(trip: TaxiTravel | TripTuple) -> float:
+    """Предсказание цены одной поездки без построения DataFrame
+
+    Возвращает то же значение, что predict(TaxiTravel(...).model_dump_df())[0].
+    Если пайплайн модели нельзя выполнить без pandas - уходит в predict
+
+    Args:
+        trip (TaxiTravel | TripTuple): Провалидированная поездка или кортеж полей
+            в порядке TaxiTravel
+
+    Returns:
+        float: Предсказанная цена поездки
+    """
+    compiled = get_compiled_pipeline(get_model())
+    if compiled is None:
+        if not isinstance(trip, TaxiTravel):
+            trip = TaxiTravel.model_construct(
+                **dict(zip(TaxiTravel.model_fields, trip))
+            )
+
+        return float(predict(trip.model_dump_df())[0])
+
+    with track_stage(FEATURE_ENGINEERING):
+        features = trip_features(trip)
+
+    with track_stage(MODEL_PREDICT):
+        prediction = float(compiled.predict(features[None, :])[0])
+
+    predicted_trips.inc()
+    return prediction
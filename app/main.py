@@ -1,16 +1,35 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import BufferedInputFile, WebhookInfo
-from fastapi import FastAPI
-
-from app.bot import get_bot
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+from app.bot import get_bot, get_dispatcher
+from app.bot.batch_jobs import get_batch_jobs
+from app.bot.update_queue import get_update_queue
+from app.model import model_registry
+from app.model_registry import ModelNotReadyError
+from app.prediction_router import router as prediction_router
+from app.prediction_service import get_prediction_service
 from app.router import router
 from app.settings import Settings, get_settings
+from app.shadow import get_shadow_evaluator
 from app.utils.aiohttpt_client import get_aiohttp_client
-from app.utils.logging_settings import setup_logging
+from app.utils.gazetteer import get_gazetteer
+from app.utils.geocode_client import geocode_client
+from app.utils.leader_lock import LeaderLock
+from app.utils.logging_settings import log_queue_depth, setup_logging, stop_logging
+from app.utils.metrics import metrics
+from app.utils.startup import startup_report
+from app.utils.worker_stats import (
+    RequestCountMiddleware,
+    get_worker_stats_reporter,
+    memory_usage,
+)
 
 settings: Settings = get_settings()
 setup_logging()
@@ -63,29 +82,121 @@ async def lifespan(app: FastAPI):
     Args:
         app (FastAPI): Приложение FastAPI
     """
+    # Модель загружается в фоне, пока приложение выполняет остальной запуск
+    model_registry.start()
+
+    aiohttp_client = get_aiohttp_client()
+    with startup_report.phase("http_client"):
+        await aiohttp_client.start()
+
     bot = get_bot()
-    await set_webhook(bot)
+    # Из нескольких воркеров вебхук регистрирует один
+    webhook_lock = LeaderLock(settings.WEBHOOK_LOCK_PATH)
+    if webhook_lock.acquire():
+        with startup_report.phase("webhook"):
+            await set_webhook(bot)
+
+    worker_stats = get_worker_stats_reporter()
+    worker_stats.extra["webhook_leader"] = webhook_lock.is_leader
+    worker_stats.start()
+
+    update_queue = get_update_queue()
+    batch_jobs = get_batch_jobs()
+    if settings.WEBHOOK_MODE == "queue":
+        update_queue.start()
+
+    shadow_evaluator = get_shadow_evaluator()
+    with startup_report.phase("shadow_models"):
+        await asyncio.to_thread(shadow_evaluator.load)
+
+    prediction_service = get_prediction_service()
+    prediction_service.start()
+
+    with startup_report.phase("gazetteer"):
+        get_gazetteer()
+
+    if geocode_client.cache is not None:
+        with startup_report.phase("geocode_cache"):
+            await geocode_client.cache.delete_expired()
+
+    metrics.gauge(
+        "taxi_webhook_queue_depth",
+        "Telegram updates waiting in the queue",
+        lambda: update_queue.depth,
+    )
+    metrics.gauge(
+        "taxi_batch_jobs_pending",
+        "Batch prediction files being scored or waiting",
+        lambda: batch_jobs.pending,
+    )
+    metrics.gauge(
+        "taxi_prediction_queue_depth",
+        "Trips waiting for a prediction batch",
+        lambda: prediction_service.queue_depth,
+    )
+    metrics.gauge(
+        "taxi_geocode_in_flight",
+        "Geocoder requests in flight",
+        lambda: geocode_client.stats()["in_flight"],
+    )
+    metrics.gauge(
+        "taxi_shadow_pending_batches",
+        "Batches waiting for shadow evaluation",
+        lambda: shadow_evaluator.stats()["pending_batches"],
+    )
+    metrics.gauge(
+        "taxi_log_queue_depth",
+        "Log records waiting to be written",
+        log_queue_depth,
+    )
+    metrics.gauge(
+        "process_resident_memory_bytes",
+        "Resident memory size in bytes",
+        lambda: memory_usage()["rss_bytes"],
+    )
+
+    startup_report.mark("ready")
+    startup_report.log_summary()
 
     yield
-    aiohttp_client = get_aiohttp_client()
+    # Очередь апдейтов дорабатывает первой, пока сервисы предсказаний ещё живы
+    await update_queue.close(settings.WEBHOOK_QUEUE_DRAIN_TIMEOUT_SECONDS)
+    await batch_jobs.close(settings.WEBHOOK_QUEUE_DRAIN_TIMEOUT_SECONDS)
+    # Состояния FSM, ожидающие пакетной записи, сохраняются до остановки
+    await get_dispatcher().storage.close()
+    await prediction_service.close()
+    shadow_evaluator.close()
+    await model_registry.close()
     await aiohttp_client.close()
     await bot.session.close()
+    await worker_stats.close()
+    webhook_lock.release()
+    stop_logging()
+
+
+async def model_not_ready_handler(
+    request: Request, exc: ModelNotReadyError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "5"},
+    )
 
 
 def create_app() -> FastAPI:
     app: FastAPI = FastAPI(lifespan=lifespan)
     app.include_router(router=router)
+    app.include_router(router=prediction_router)
+    app.add_middleware(RequestCountMiddleware)
+    app.add_exception_handler(ModelNotReadyError, model_not_ready_handler)
     return app
 
 
 app = create_app()
+startup_report.mark("imported")
 
 if __name__ == "__main__":
-    import uvicorn
+    from app.serving import serve
 
-    uvicorn.run(
-        app=app,
-        host=settings.HOST,
-        port=settings.PORT,
-        log_config=str(settings.LOGGING_CONFIG_PATH),
-    )
+    serve(app)
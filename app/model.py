@@ -1,17 +1,35 @@
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
-import holidays
-import joblib
 import numpy as np
-import pandas as pd
 from pydantic import BaseModel, field_validator, model_validator
-from pyproj import Transformer
-from sklearn.base import TransformerMixin
-from sklearn.pipeline import Pipeline
 
+from app.model_registry import MANIFEST_SUFFIX, ModelRegistry, latest_model_path
 from app.settings import get_settings
+from app.utils.metrics import (
+    FEATURE_ENGINEERING,
+    MODEL_PREDICT,
+    predicted_trips,
+    track_stage,
+)
+
+# pandas, sklearn, pyproj, holidays и joblib импортируются при первом использовании:
+# на импорт приложения они добавляют секунды, а модель загружается в фоне
+if TYPE_CHECKING:
+    import pandas as pd
+    from pyproj import Transformer
+    from sklearn.pipeline import Pipeline
+
+PASSENGER_COUNT_ERROR = (
+    "Количество пассажиров не может быть меньше 1 и не может превышать 8"
+)
+LATITUDE_ERROR = "Широта должна быть в пределах [-90, 90]"
+LONGITUDE_ERROR = "Долгота должна быть в пределах [-180, 180]"
+SAME_COORDS_ERROR = (
+    "Точка назначения та же, что и точка отправления, измените координаты"
+)
 
 
 class TaxiTravel(BaseModel):
@@ -30,9 +48,7 @@ class TaxiTravel(BaseModel):
     @classmethod
     def validate_passengers(cls, v: float) -> str:
         if not (1 <= v <= 8):
-            raise ValueError(
-                "Количество пассажиров не может быть меньше 1 и не может превышать 8"
-            )
+            raise ValueError(PASSENGER_COUNT_ERROR)
 
         return v
 
@@ -40,7 +56,7 @@ class TaxiTravel(BaseModel):
     @classmethod
     def validate_latitude(cls, v: float) -> str:
         if not (-90 <= v <= 90):
-            raise ValueError("Широта должна быть в пределах [-90, 90]")
+            raise ValueError(LATITUDE_ERROR)
 
         return v
 
@@ -48,7 +64,7 @@ class TaxiTravel(BaseModel):
     @classmethod
     def validate_longitude(cls, v: float) -> str:
         if not (-180 <= v <= 180):
-            raise ValueError("Долгота должна быть в пределах [-180, 180]")
+            raise ValueError(LONGITUDE_ERROR)
 
         return v
 
@@ -58,17 +74,34 @@ class TaxiTravel(BaseModel):
             abs(self.pickup_latitude - self.dropoff_latitude) <= 1e-5
             and abs(self.pickup_longitude - self.dropoff_longitude) <= 1e-5
         ):
-            raise ValueError(
-                "Точка назначения та же, что и точка отправления, измените координаты"
-            )
+            raise ValueError(SAME_COORDS_ERROR)
 
         return self
 
-    def model_dump_df(self) -> pd.DataFrame:
+    def model_dump_df(self) -> "pd.DataFrame":
+        import pandas as pd
+
         return pd.DataFrame([self.model_dump(mode="python")])
 
 
-def euclidian_distance(x1: pd.Series, x2: pd.Series, y1: pd.Series, y2: pd.Series):
+EARTH_RADIUS_M = 6_371_008.8
+
+DistanceFunc = Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+@lru_cache
+def get_transformer() -> "Transformer":
+    """Проекция WGS84 -> Web Mercator, создаётся один раз на процесс
+
+    Returns:
+        Transformer: Трансформер координат EPSG:4326 -> EPSG:3857
+    """
+    from pyproj import Transformer
+
+    return Transformer.from_crs("EPSG:4326", "EPSG:3857")
+
+
+def euclidian_distance(x1: np.ndarray, x2: np.ndarray, y1: np.ndarray, y2: np.ndarray):
     """
     Евклидово расстояние между двумя точками
     требует преобразования градусной системы координат в метрическую
@@ -76,75 +109,251 @@ def euclidian_distance(x1: pd.Series, x2: pd.Series, y1: pd.Series, y2: pd.Serie
     return np.sqrt((y1 - x1) ** 2 + (y2 - x2) ** 2)
 
 
-def calculate_distance(
-    x1: pd.Series,
-    x2: pd.Series,
-    y1: pd.Series,
-    y2: pd.Series,
-    dist_func: Callable[[pd.Series, pd.Series, pd.Series, pd.Series], pd.Series],
-    transformer: Transformer | None = None,
+def haversine_distance(x1: np.ndarray, x2: np.ndarray, y1: np.ndarray, y2: np.ndarray):
+    """
+    Расстояние по большому кругу в метрах,
+    принимает координаты в градусах: x1, y1 - широты, x2, y2 - долготы
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (x1, x2, y1, y2))
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def equirectangular_distance(
+    x1: np.ndarray, x2: np.ndarray, y1: np.ndarray, y2: np.ndarray
 ):
+    """
+    Приближённое расстояние в метрах в равнопромежуточной проекции,
+    на масштабах города совпадает с haversine_distance, но дешевле
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (x1, x2, y1, y2))
+
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS_M * np.sqrt(x**2 + y**2)
+
+
+DISTANCE_FUNCS: dict[str, DistanceFunc] = {
+    "euclidian": euclidian_distance,
+    "haversine": haversine_distance,
+    "equirectangular": equirectangular_distance,
+}
+
+# Функции, которые работают с градусами напрямую и не требуют проекции
+GEODESIC_DISTANCE_FUNCS: set[DistanceFunc] = {
+    haversine_distance,
+    equirectangular_distance,
+}
+
+
+def calculate_distance(
+    x1: "np.ndarray | pd.Series",
+    x2: "np.ndarray | pd.Series",
+    y1: "np.ndarray | pd.Series",
+    y2: "np.ndarray | pd.Series",
+    dist_func: DistanceFunc,
+    transformer: "Transformer | None" = None,
+) -> np.ndarray:
+    """Расчёт расстояния между точками отправления (x1, x2) и назначения (y1, y2)
+
+    Точки отправления и назначения проецируются одним вызовом трансформера
+    по непрерывному массиву, без промежуточных pd.Series
+
+    Args:
+        x1 (np.ndarray | pd.Series): Широты точек отправления
+        x2 (np.ndarray | pd.Series): Долготы точек отправления
+        y1 (np.ndarray | pd.Series): Широты точек назначения
+        y2 (np.ndarray | pd.Series): Долготы точек назначения
+        dist_func (DistanceFunc): Функция расстояния
+        transformer (Transformer | None, optional): Проекция координат. Defaults to None.
+
+    Returns:
+        np.ndarray: Расстояния между точками
+    """
     if transformer:
-        x1, x2 = transformer.transform(x1, x2)
-        y1, y2 = transformer.transform(y1, y2)
+        n = len(x1)
+        lat = np.concatenate([np.asarray(x1, np.float64), np.asarray(y1, np.float64)])
+        lon = np.concatenate([np.asarray(x2, np.float64), np.asarray(y2, np.float64)])
+        transformer.transform(lat, lon, inplace=True)
+
+        x1, x2, y1, y2 = lat[:n], lon[:n], lat[n:], lon[n:]
+    else:
+        x1, x2, y1, y2 = (np.asarray(i, np.float64) for i in (x1, x2, y1, y2))
 
     return dist_func(x1, x2, y1, y2)
 
 
-class FeatureEngineering(TransformerMixin):
+# Границы совпадают с диапазоном лет, который принимает validate_datetime
+CALENDAR_START_YEAR = 2009
+CALENDAR_YEARS_AHEAD = 5
+
+CALENDAR_FEATURES = ("year", "month", "day", "hour", "is_holiday", "is_weekend")
+
+
+class CalendarTable:
+    """
+    Предрасчитанные календарные признаки по дням:
+    индекс дня от начала таблицы -> year, month, day, hour, is_holiday, is_weekend
+    """
+
+    def __init__(self, start_year: int, end_year: int):
+        import holidays
+        import pandas as pd
+
+        self.start = np.datetime64(f"{start_year}-01-01", "D")
+        self.end = np.datetime64(f"{end_year + 1}-01-01", "D")
+
+        days = np.arange(self.start, self.end)
+        index = pd.DatetimeIndex(days)
+        us_calendar = holidays.USA(years=range(start_year, end_year + 1))
+        holiday_days = np.array(list(us_calendar.keys()), dtype="datetime64[D]")
+
+        self.year = index.year.to_numpy(np.int16)
+        self.month = index.month.to_numpy(np.int8)
+        self.day = index.day.to_numpy(np.int8)
+        # Признаки строятся по дате поездки без времени, поэтому час всегда 0,
+        # на таких значениях обучена текущая модель
+        self.hour = np.zeros(len(days), np.int8)
+        self.is_holiday = np.isin(days, holiday_days)
+        self.is_weekend = index.day_of_week.to_numpy() > 4
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    def day_index(self, dt: np.ndarray) -> np.ndarray:
+        """Индексы дней в таблице для массива datetime64
+
+        Args:
+            dt (np.ndarray): Даты и время поездок
+
+        Returns:
+            np.ndarray: Индексы строк таблицы
+        """
+        return (dt.astype("datetime64[D]") - self.start).astype(np.int64)
+
+    def covers(self, index: np.ndarray) -> bool:
+        return len(index) == 0 or (index.min() >= 0 and index.max() < len(self))
+
+    def gather(self, index: np.ndarray) -> dict[str, np.ndarray]:
+        """Выборка всех календарных признаков по индексам дней
+
+        Args:
+            index (np.ndarray): Индексы строк таблицы
+
+        Returns:
+            dict[str, np.ndarray]: Признаки в порядке CALENDAR_FEATURES
+        """
+        return {name: getattr(self, name)[index] for name in CALENDAR_FEATURES}
+
+
+@lru_cache
+def get_calendar_table(
+    start_year: int = CALENDAR_START_YEAR, end_year: int | None = None
+) -> CalendarTable:
+    """Календарная таблица, создаётся один раз на процесс для каждого диапазона лет
+
+    Args:
+        start_year (int, optional): Первый год таблицы. Defaults to CALENDAR_START_YEAR.
+        end_year (int | None, optional): Последний год таблицы.
+            Defaults to текущий год + CALENDAR_YEARS_AHEAD.
+
+    Returns:
+        CalendarTable: Календарная таблица
+    """
+    if end_year is None:
+        end_year = datetime.now().year + CALENDAR_YEARS_AHEAD
+
+    return CalendarTable(start_year, end_year)
+
+
+class FeatureEngineering:
     def __init__(
         self,
         copy_x: bool = True,
-        distance_func: Callable[
-            [pd.Series, pd.Series, pd.Series, pd.Series], pd.Series
-        ] = euclidian_distance,
+        distance_func: str | DistanceFunc = euclidian_distance,
     ):
+        """
+        Args:
+            copy_x (bool, optional): Копировать входной датафрейм. Defaults to True.
+            distance_func (str | DistanceFunc, optional): Функция расстояния или её
+                имя из DISTANCE_FUNCS: "euclidian" (по проекции EPSG:3857, на ней
+                обучена текущая модель), "haversine" или "equirectangular".
+                Defaults to euclidian_distance.
+        """
         self.copy_x = copy_x
         self.distance_func = distance_func
 
-    def fit(self, X: pd.DataFrame | None = None, y=None) -> "FeatureEngineering":
+    def fit(self, X: "pd.DataFrame | None" = None, y=None) -> "FeatureEngineering":
         return self
 
-    def _add_distance(self, X: pd.DataFrame):
-        transformer = Transformer.from_crs("EPSG:4326", "EPSG:3857")
+    def fit_transform(self, X: "pd.DataFrame", y=None) -> "pd.DataFrame":
+        # Как у sklearn TransformerMixin, без импорта sklearn
+        return self.fit(X, y).transform(X)
 
-        x1 = X["pickup_latitude"]
-        x2 = X["pickup_longitude"]
-        y1 = X["dropoff_latitude"]
-        y2 = X["dropoff_longitude"]
+    def get_distance_func(self) -> DistanceFunc:
+        if isinstance(self.distance_func, str):
+            return DISTANCE_FUNCS[self.distance_func]
 
-        X.loc[:, "distance_km"] = (
-            calculate_distance(
-                x1, x2, y1, y2, self.distance_func, transformer=transformer
-            )
-            / 1000
-        )
+        return self.distance_func
 
-        return X
-
-    def _prepare_datetime(self, X: pd.DataFrame) -> pd.DataFrame:
-        date = X["pickup_datetime"].dt.date.astype("datetime64[ns]")
-
-        X["year"] = date.dt.year
-        X["month"] = date.dt.month
-        X["day"] = date.dt.day
-        X["hour"] = date.dt.hour
+    def _add_distance(self, X: "pd.DataFrame"):
+        distance_func = self.get_distance_func()
+        transformer = (
+            None if distance_func in GEODESIC_DISTANCE_FUNCS else get_transformer()
+        )
 
-        us_calendar = holidays.USA()
+        x1 = X["pickup_latitude"].to_numpy()
+        x2 = X["pickup_longitude"].to_numpy()
+        y1 = X["dropoff_latitude"].to_numpy()
+        y2 = X["dropoff_longitude"].to_numpy()
 
-        is_holiday = date.map(us_calendar.get)
-        is_holiday = is_holiday.mask(is_holiday.notna(), True)
-        is_holiday = is_holiday.fillna(False)
+        X["distance_km"] = (
+            calculate_distance(x1, x2, y1, y2, distance_func, transformer=transformer)
+            / 1000
+        )
 
-        X["is_holiday"] = is_holiday
+        return X
 
-        X["is_weekend"] = date.dt.day_of_week > 4
+    def _prepare_datetime(self, X: "pd.DataFrame") -> "pd.DataFrame":
+        pickup_datetime = X["pickup_datetime"]
+        if pickup_datetime.dt.tz is not None:
+            pickup_datetime = pickup_datetime.dt.tz_localize(None)
+
+        dt = pickup_datetime.to_numpy(dtype="datetime64[ns]")
+        # NaT не ищется в календаре: как и до предрасчёта, год, месяц, день
+        # и час таких строк - NaN, а is_holiday и is_weekend - False
+        nat = np.isnat(dt)
+        if nat.any():
+            dt = dt[~nat]
+
+        calendar = get_calendar_table()
+        index = calendar.day_index(dt)
+        if not calendar.covers(index):
+            # Исторические выгрузки могут выходить за диапазон бота
+            years = dt.astype("datetime64[Y]").astype(np.int64) + 1970
+            calendar = get_calendar_table(int(years.min()), int(years.max()))
+            index = calendar.day_index(dt)
+
+        for name, values in calendar.gather(index).items():
+            if nat.any():
+                if values.dtype == bool:
+                    full = np.zeros(len(nat), bool)
+                else:
+                    full = np.full(len(nat), np.nan)
+                full[~nat] = values
+                values = full
+
+            X[name] = values
 
         X = X.drop("pickup_datetime", axis=1)
 
         return X
 
-    def transform(self, X: pd.DataFrame, y=None) -> pd.DataFrame:
+    def transform(self, X: "pd.DataFrame", y=None) -> "pd.DataFrame":
         if self.copy_x:
             X = X.copy()
 
@@ -154,34 +363,107 @@ class FeatureEngineering(TransformerMixin):
         return X
 
 
-def load_model(models_dir: Path) -> Pipeline:
-    model_path = sorted(list(models_dir.iterdir()), reverse=True)[0]
-    model = joblib.load(model_path)
+def load_model_file(path: Path) -> "Pipeline":
+    """Загрузка модели из файла: манифест нативного формата или joblib пайплайн
+
+    Args:
+        path (Path): Путь к манифесту или joblib файлу
+
+    Returns:
+        Pipeline: Модель с методом predict по признакам FEATURES_ORDER
+    """
+    if path.name.endswith(MANIFEST_SUFFIX):
+        # app.native_model импортирует этот модуль
+        from app.native_model import load_native_model
+
+        return load_native_model(path, thread_count=settings.MODEL_THREAD_COUNT)
+
+    import joblib
+
+    return joblib.load(path)
+
+
+def load_model(models_dir: Path) -> "Pipeline":
+    model_path = latest_model_path(models_dir)
+    model = load_model_file(model_path)
     return model
 
 
+FEATURES_ORDER = [
+    "pickup_longitude",
+    "pickup_latitude",
+    "dropoff_longitude",
+    "dropoff_latitude",
+    "passenger_count",
+    "year",
+    "month",
+    "day",
+    "hour",
+    "distance_km",
+    "is_holiday",
+    "is_weekend",
+]
+
+WARMUP_TRIPS = [
+    TaxiTravel(
+        pickup_datetime=datetime(2014, 7, 4, 18, 30),
+        pickup_latitude=40.641766,
+        pickup_longitude=-73.780968,
+        dropoff_latitude=40.754932,
+        dropoff_longitude=-73.984016,
+        passenger_count=2,
+    ),
+    TaxiTravel(
+        pickup_datetime=datetime(2012, 12, 31, 23, 59),
+        pickup_latitude=40.7580,
+        pickup_longitude=-73.9855,
+        dropoff_latitude=40.7061,
+        dropoff_longitude=-74.0087,
+        passenger_count=1,
+    ),
+]
+
 settings = get_settings()
 
 feature_transformer = FeatureEngineering()
-model = load_model(settings.MODELS_DIR)
-
-
-def predict(X: pd.DataFrame):
-    features_order = [
-        "pickup_longitude",
-        "pickup_latitude",
-        "dropoff_longitude",
-        "dropoff_latitude",
-        "passenger_count",
-        "year",
-        "month",
-        "day",
-        "hour",
-        "distance_km",
-        "is_holiday",
-        "is_weekend",
-    ]
-    X = feature_transformer.transform(X)
-    X = X[features_order]
-
-    return model.predict(X)
+
+
+def warmup_model(model: "Pipeline"):
+    """Прогрев модели перед подменой: первое предсказание заметно дольше
+    остальных, а ошибка в модели не должна дойти до пользователей
+
+    Args:
+        model (Pipeline): Загруженная модель
+    """
+    import pandas as pd
+
+    X = pd.DataFrame([i.model_dump(mode="python") for i in WARMUP_TRIPS])
+    X = feature_transformer.transform(X)[FEATURES_ORDER]
+
+    for i in range(len(X)):
+        model.predict(X.iloc[: i + 1])
+
+
+model_registry = ModelRegistry(
+    settings.MODELS_DIR,
+    loader=load_model_file,
+    warmup=warmup_model,
+    poll_interval=settings.MODEL_RELOAD_INTERVAL_SECONDS,
+)
+
+
+def get_model() -> "Pipeline":
+    """Активная модель из реестра моделей"""
+    return model_registry.get_model()
+
+
+def predict(X: "pd.DataFrame", **predict_params):
+    with track_stage(FEATURE_ENGINEERING):
+        X = feature_transformer.transform(X)
+        X = X[FEATURES_ORDER]
+
+    with track_stage(MODEL_PREDICT):
+        predictions = get_model().predict(X, **predict_params)
+
+    predicted_trips.inc(len(X))
+    return predictions
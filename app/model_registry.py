@@ -0,0 +1,302 @@
+"""
+Реестр моделей: загрузка последней версии из MODELS_DIR в фоне,
+прогрев и атомарная подмена активной модели без перезапуска приложения
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+ModelLoader = Callable[[Path], Any]
+ModelWarmup = Callable[[Any], None]
+
+
+MANIFEST_SUFFIX = ".manifest.json"
+# Файлы, которые загружаются только через манифест
+ARTIFACT_SUFFIXES = (".cbm",)
+
+
+def model_version_name(path: Path) -> str:
+    """Имя версии модели: имя файла без расширения формата"""
+    if path.name.endswith(MANIFEST_SUFFIX):
+        return path.name.removesuffix(MANIFEST_SUFFIX)
+
+    return path.stem
+
+
+def model_paths(models_dir: Path) -> list[Path]:
+    """Файлы всех версий моделей в папке, по одному на версию: манифест
+    нативного формата предпочтительнее pickle той же версии. Скрытые
+    и временные файлы пропускаются, чтобы не загрузить модель,
+    которая ещё копируется
+
+    Args:
+        models_dir (Path): Папка с моделями
+
+    Returns:
+        list[Path]: Пути к файлам моделей или манифестам, отсортированные по версии
+    """
+    versions: dict[str, Path] = {}
+    for path in models_dir.iterdir():
+        if (
+            not path.is_file()
+            or path.name.startswith(".")
+            or path.suffix == ".tmp"
+            or path.suffix in ARTIFACT_SUFFIXES
+        ):
+            continue
+
+        version = model_version_name(path)
+        if version not in versions or path.name.endswith(MANIFEST_SUFFIX):
+            versions[version] = path
+
+    return [versions[i] for i in sorted(versions)]
+
+
+def latest_model_path(models_dir: Path) -> Path:
+    """Файл последней по имени версии модели
+
+    Args:
+        models_dir (Path): Папка с моделями
+
+    Raises:
+        FileNotFoundError: если в папке нет моделей
+
+    Returns:
+        Path: Путь к файлу модели или манифесту
+    """
+    paths = model_paths(models_dir)
+    if not paths:
+        raise FileNotFoundError(f"No models in {models_dir}")
+
+    return paths[-1]
+
+
+class ModelNotReadyError(RuntimeError):
+    """Активной модели нет: она ещё загружается или не загрузилась"""
+
+
+class ModelVersion:
+    """Загруженная модель и сведения о её загрузке"""
+
+    def __init__(
+        self,
+        path: Path,
+        model: Any,
+        mtime: float,
+        load_seconds: float,
+        warmup_seconds: float,
+    ):
+        self.path = path
+        self.model = model
+        self.mtime = mtime
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.loaded_at = datetime.now()
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "version": self.name,
+            "path": str(self.path),
+            "loaded_at": self.loaded_at.isoformat(timespec="seconds"),
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
+
+
+class ModelRegistry:
+    """Активная модель из папки с моделями с перезагрузкой новых версий"""
+
+    def __init__(
+        self,
+        models_dir: Path,
+        loader: ModelLoader,
+        warmup: ModelWarmup | None = None,
+        poll_interval: float | None = None,
+    ):
+        """
+        Args:
+            models_dir (Path): Папка с моделями
+            loader (ModelLoader): Функция загрузки модели из файла
+            warmup (ModelWarmup | None, optional): Прогрев модели перед
+                подменой, например предсказание на тестовых данных.
+                Defaults to None.
+            poll_interval (float | None, optional): Период проверки папки
+                на новые версии в секундах, None - без проверки.
+                Defaults to None.
+        """
+        self.models_dir = models_dir
+        self.loader = loader
+        self.warmup = warmup
+        self.poll_interval = poll_interval
+
+        self._active: ModelVersion | None = None
+        # Файл, который не удалось загрузить, пропускается, пока не изменится
+        self._failed: tuple[Path, float] | None = None
+        self._load_lock = threading.Lock()
+        self._watcher: asyncio.Task | None = None
+        # Синхронная загрузка при обращении к модели - только для скриптов,
+        # в приложении модель грузит фоновая задача из start
+        self._autoload = True
+
+        self.reloads_total = 0
+        self.errors_total = 0
+        self.last_error: str | None = None
+
+    @property
+    def active(self) -> ModelVersion | None:
+        return self._active
+
+    def get_model(self) -> Any:
+        """Активная модель. До start при первом обращении модель загружается
+        синхронно, после start запросы не ждут фоновую загрузку
+
+        Raises:
+            ModelNotReadyError: если активной модели нет
+
+        Returns:
+            Any: Модель
+        """
+        # Ссылку на версию берём один раз, поэтому подмена модели
+        # не влияет на уже начатые предсказания
+        active = self._active
+        if active is None and self._autoload:
+            self.load_latest()
+            active = self._active
+
+        if active is None:
+            raise ModelNotReadyError(
+                f"Model isn't loaded yet: {self.last_error or 'loading'}"
+            )
+
+        return active.model
+
+    def _record_error(self, err: Exception):
+        self.errors_total += 1
+        self.last_error = repr(err)
+
+    def load_latest(self, force: bool = False) -> bool:
+        """Загрузка последней версии модели, если она отличается от активной
+
+        Args:
+            force (bool, optional): Перезагрузить, даже если версия
+                не изменилась. Defaults to False.
+
+        Returns:
+            bool: True, если активная модель подменена
+        """
+        with self._load_lock:
+            try:
+                path = latest_model_path(self.models_dir)
+                mtime = path.stat().st_mtime
+            except OSError as err:
+                self._record_error(err)
+                raise
+
+            active = self._active
+            if (
+                not force
+                and active is not None
+                and active.path == path
+                and active.mtime == mtime
+            ):
+                return False
+
+            # Сломанный файл не загружается повторно, пока его не заменят,
+            # даже если активной модели нет
+            if not force and self._failed == (path, mtime):
+                return False
+
+            try:
+                started = time.perf_counter()
+                model = self.loader(path)
+                load_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                if self.warmup is not None:
+                    self.warmup(model)
+                warmup_seconds = time.perf_counter() - started
+
+            except Exception as err:
+                self._failed = (path, mtime)
+                self._record_error(err)
+                raise
+
+            self._active = ModelVersion(
+                path, model, mtime, load_seconds, warmup_seconds
+            )
+            if active is not None:
+                self.reloads_total += 1
+
+        logger.info(
+            "Model %s loaded in %.2fs, warmed up in %.2fs",
+            path.name,
+            load_seconds,
+            warmup_seconds,
+        )
+        return True
+
+    async def reload(self, force: bool = False) -> bool:
+        """Загрузка последней версии модели вне event loop,
+        при ошибке остаётся прежняя модель
+
+        Args:
+            force (bool, optional): Перезагрузить, даже если версия
+                не изменилась. Defaults to False.
+
+        Returns:
+            bool: True, если активная модель подменена
+        """
+        try:
+            return await asyncio.to_thread(self.load_latest, force)
+        except Exception:
+            logger.exception("Model reload failed")
+            return False
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload()
+
+    def start(self):
+        """Фоновая загрузка модели и, если задан poll_interval,
+        проверка папки на новые версии"""
+        if self._watcher is not None and not self._watcher.done():
+            return
+
+        self._autoload = False
+
+        async def run():
+            await self.reload()
+            if self.poll_interval:
+                await self._watch()
+
+        self._watcher = asyncio.create_task(run(), name="model_registry")
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def stats(self) -> dict[str, Any]:
+        active = self._active
+
+        return {
+            "active": active.info() if active is not None else None,
+            "models_dir": str(self.models_dir),
+            "poll_interval": self.poll_interval,
+            "reloads_total": self.reloads_total,
+            "errors_total": self.errors_total,
+            "last_error": self.last_error,
+        }
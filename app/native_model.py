@@ -0,0 +1,199 @@
+"""
+Нативный формат модели: CatBoost в собственном бинарном формате .cbm
+и JSON манифест с порядком признаков и параметрами предобработки.
+Загрузка не зависит от pickle sklearn Pipeline, а предсказание идёт
+по массиву float без pandas
+
+Экспорт: PYTHONPATH=app python -m app.native_model models/1_catboost_v_1.joblib
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import joblib
+import numpy as np
+import pandas as pd
+from catboost import CatBoost, CatBoostClassifier, CatBoostRegressor
+from sklearn.pipeline import Pipeline
+
+from app.inference import (
+    ArrayStep,
+    StepSpec,
+    UnsupportedPipelineError,
+    build_steps,
+    describe_steps,
+)
+from app.model import FEATURES_ORDER
+from app.model_registry import MANIFEST_SUFFIX, model_version_name
+
+MANIFEST_FORMAT_VERSION = 1
+
+ESTIMATOR_CLASSES: dict[str, type[CatBoost]] = {
+    i.__name__: i for i in (CatBoost, CatBoostRegressor, CatBoostClassifier)
+}
+
+
+class NativeModelError(ValueError):
+    """Манифест не подходит к текущему коду или модель нельзя экспортировать"""
+
+
+class NativeModel:
+    """Предобработка на NumPy и CatBoost, загруженные из нативного формата,
+    с тем же интерфейсом predict, что и у sklearn Pipeline"""
+
+    def __init__(
+        self,
+        booster: CatBoost,
+        features: list[str],
+        preprocessing: list[StepSpec],
+        thread_count: int = -1,
+    ):
+        """
+        Args:
+            booster (CatBoost): Загруженная модель CatBoost
+            features (list[str]): Порядок признаков на входе
+            preprocessing (list[StepSpec]): Параметры шагов предобработки
+            thread_count (int, optional): Потоков CatBoost на предсказание,
+                -1 - все ядра. Defaults to -1.
+        """
+        self.booster = booster
+        self.features = features
+        self.preprocessing = preprocessing
+        self.thread_count = thread_count
+        self.steps: list[ArrayStep] = build_steps(preprocessing)
+
+    def predict(self, X: pd.DataFrame | np.ndarray, **predict_params) -> np.ndarray:
+        """Предсказание по признакам
+
+        Args:
+            X (pd.DataFrame | np.ndarray): DataFrame с колонками features
+                или матрица признаков в их порядке
+            **predict_params: Параметры predict CatBoost, например thread_count
+
+        Returns:
+            np.ndarray: Предсказания модели
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(np.float64)
+
+        for step in self.steps:
+            X = step(X)
+
+        predict_params.setdefault("thread_count", self.thread_count)
+        return self.booster.predict(X, **predict_params)
+
+
+def export_native_model(pipeline: Pipeline, manifest_path: Path) -> Path:
+    """Сохранение пайплайна в нативном формате: .cbm рядом с манифестом.
+    Файлы пишутся во временные и переименовываются, манифест последним,
+    поэтому реестр моделей не увидит модель, записанную наполовину
+
+    Args:
+        pipeline (Pipeline): Пайплайн предобработки с CatBoost на конце
+        manifest_path (Path): Путь манифеста, оканчивается на MANIFEST_SUFFIX
+
+    Raises:
+        NativeModelError: если последний шаг не CatBoost или предобработку
+            нельзя выполнить без pandas
+
+    Returns:
+        Path: Путь манифеста
+    """
+    estimator = pipeline.steps[-1][1] if isinstance(pipeline, Pipeline) else pipeline
+    if type(estimator).__name__ not in ESTIMATOR_CLASSES:
+        raise NativeModelError(f"Last step isn't CatBoost: {estimator!r}")
+
+    try:
+        preprocessing, _ = (
+            describe_steps(pipeline.steps[:-1], list(FEATURES_ORDER))
+            if isinstance(pipeline, Pipeline)
+            else ([], None)
+        )
+    except UnsupportedPipelineError as err:
+        raise NativeModelError(f"Unsupported preprocessing step: {err}")
+
+    version = model_version_name(manifest_path)
+    booster_path = manifest_path.with_name(f"{version}.cbm")
+    tmp_booster_path = booster_path.with_name(f".{booster_path.name}.tmp")
+    estimator.save_model(str(tmp_booster_path), format="cbm")
+    os.replace(tmp_booster_path, booster_path)
+
+    manifest = {
+        "format_version": MANIFEST_FORMAT_VERSION,
+        "model_file": booster_path.name,
+        "estimator": type(estimator).__name__,
+        "features": list(FEATURES_ORDER),
+        "preprocessing": preprocessing,
+    }
+    tmp_manifest_path = manifest_path.with_name(f".{manifest_path.name}.tmp")
+    tmp_manifest_path.write_text(json.dumps(manifest))
+    os.replace(tmp_manifest_path, manifest_path)
+
+    return manifest_path
+
+
+def read_manifest(manifest_path: Path) -> dict[str, Any]:
+    """Чтение и проверка манифеста
+
+    Raises:
+        NativeModelError: если версия формата или признаки не совпадают с кодом
+    """
+    manifest = json.loads(manifest_path.read_text())
+
+    if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+        raise NativeModelError(
+            f"Unsupported manifest format: {manifest.get('format_version')}"
+        )
+
+    if manifest["features"] != FEATURES_ORDER:
+        raise NativeModelError("Manifest features don't match FEATURES_ORDER")
+
+    return manifest
+
+
+def load_native_model(manifest_path: Path, thread_count: int = -1) -> NativeModel:
+    """Загрузка модели по манифесту
+
+    Args:
+        manifest_path (Path): Путь манифеста
+        thread_count (int, optional): Потоков CatBoost на предсказание.
+            Defaults to -1.
+
+    Returns:
+        NativeModel: Модель
+    """
+    manifest = read_manifest(manifest_path)
+
+    booster = ESTIMATOR_CLASSES[manifest["estimator"]]()
+    booster.load_model(str(manifest_path.with_name(manifest["model_file"])))
+
+    return NativeModel(
+        booster,
+        features=manifest["features"],
+        preprocessing=manifest["preprocessing"],
+        thread_count=thread_count,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Экспорт joblib пайплайна в нативный формат CatBoost с манифестом"
+    )
+    parser.add_argument("model", type=Path, help="joblib файл пайплайна")
+    parser.add_argument(
+        "--output-dir", type=Path, default=None, help="По умолчанию папка модели"
+    )
+    args = parser.parse_args(argv)
+
+    output_dir = args.output_dir or args.model.parent
+    manifest_path = output_dir / f"{model_version_name(args.model)}{MANIFEST_SUFFIX}"
+
+    export_native_model(joblib.load(args.model), manifest_path)
+    print(f"Exported {args.model} -> {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
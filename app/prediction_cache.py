@@ -0,0 +1,107 @@
+"""
+Кэш предсказаний по квантованным параметрам поездки:
+популярные маршруты в близкое время не пересчитываются моделью
+"""
+
+import weakref
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from app.model import TaxiTravel
+from app.settings import get_settings
+from app.utils.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+TripKey = tuple[datetime, float, float, float, float, float]
+
+
+class PredictionCache:
+    """LRU кэш предсказаний, сбрасывается при смене модели"""
+
+    def __init__(self, maxsize: int, ttl: float | None = None, coords_digits: int = 4):
+        """
+        Args:
+            maxsize (int): Максимальное количество записей
+            ttl (float | None, optional): Время жизни записи в секундах.
+                Defaults to None.
+            coords_digits (int, optional): Количество знаков после запятой
+                в координатах ключа, 4 знака ~ 11 метров. Defaults to 4.
+        """
+        self.coords_digits = coords_digits
+        self._cache: TTLCache[TripKey, float] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._model: weakref.ref | None = None
+
+        self.invalidations = 0
+
+    def key(self, trip: TaxiTravel) -> TripKey:
+        """Ключ кэша: координаты округлены, время поездки усечено до часа
+
+        Args:
+            trip (TaxiTravel): Провалидированная поездка
+
+        Returns:
+            TripKey: Квантованные параметры поездки
+        """
+        pickup_datetime = trip.pickup_datetime.replace(
+            minute=0, second=0, microsecond=0, tzinfo=None
+        )
+
+        return (
+            pickup_datetime,
+            round(trip.pickup_latitude, self.coords_digits),
+            round(trip.pickup_longitude, self.coords_digits),
+            round(trip.dropoff_latitude, self.coords_digits),
+            round(trip.dropoff_longitude, self.coords_digits),
+            trip.passenger_count,
+        )
+
+    def _check_model(self, model: "Pipeline"):
+        if self._model is not None and self._model() is model:
+            return
+
+        if self._model is not None:
+            self._cache.clear()
+            self.invalidations += 1
+
+        self._model = weakref.ref(model)
+
+    def get(self, trip: TaxiTravel, model: "Pipeline") -> float | None:
+        """Закэшированное предсказание для поездки
+
+        Args:
+            trip (TaxiTravel): Провалидированная поездка
+            model (Pipeline): Текущая модель, при её смене кэш очищается
+
+        Returns:
+            float | None: Предсказание или None при промахе
+        """
+        self._check_model(model)
+        return self._cache.get(self.key(trip))
+
+    def set(self, trip: TaxiTravel, model: "Pipeline", prediction: float):
+        # Предсказание посчитано моделью, которую уже заменили - не сохраняем
+        if self._model is not None and self._model() is not model:
+            return
+
+        self._check_model(model)
+        self._cache.set(self.key(trip), prediction)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+
+@lru_cache
+def get_prediction_cache() -> PredictionCache:
+    settings = get_settings()
+
+    return PredictionCache(
+        maxsize=settings.PREDICTION_CACHE_SIZE,
+        ttl=settings.PREDICTION_CACHE_TTL_SECONDS,
+        coords_digits=settings.PREDICTION_CACHE_COORDS_DIGITS,
+    )
@@ -0,0 +1,179 @@
+"""
+REST эндпоинты предсказания стоимости поездок для внутренних сервисов
+"""
+
+import asyncio
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing_extensions import Annotated
+
+from app.batch_prediction import (
+    ERROR_COLUMN,
+    PREDICTION_COLUMN,
+    TRIP_COLUMNS,
+    BatchFileError,
+    check_columns,
+    score_chunk,
+)
+from app.model import TaxiTravel
+from app.prediction_service import PredictionService, get_prediction_service
+from app.settings import Settings, get_settings
+from app.utils.aiohttpt_client import get_json_decoder
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+settings: Settings = get_settings()
+
+json_loads = get_json_decoder("orjson")
+
+router = APIRouter(prefix="/predict", default_response_class=FastJSONResponse)
+
+
+class PredictionResponse(BaseModel):
+    prediction: float
+
+
+class BatchPredictionError(BaseModel):
+    index: int
+    error: str
+
+
+class BatchPredictionResponse(BaseModel):
+    predictions: list[float | None]
+    errors: list[BatchPredictionError]
+
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """Чтение тела запроса с ограничением размера
+
+    Args:
+        request (Request): Запрос
+        max_size (int): Максимальный размер тела в байтах
+
+    Raises:
+        HTTPException: 413, если тело больше max_size
+
+    Returns:
+        bytes: Тело запроса
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Request body is larger than {max_size} bytes",
+    )
+
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit():
+        if int(content_length) > max_size:
+            raise too_large
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_size:
+            raise too_large
+
+    return bytes(body)
+
+
+def parse_trips(body: bytes) -> "pd.DataFrame":
+    """Разбор массива поездок из JSON сразу в DataFrame без pydantic на каждую поездку
+
+    Args:
+        body (bytes): JSON массив объектов с полями TaxiTravel
+
+    Raises:
+        HTTPException: 422, если тело не массив объектов или не хватает полей
+        HTTPException: 413, если поездок больше PREDICT_API_MAX_TRIPS
+
+    Returns:
+        pd.DataFrame: Сырые поездки
+    """
+    import pandas as pd
+
+    try:
+        records = json_loads(body)
+    except ValueError:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "Invalid JSON")
+
+    if not isinstance(records, list) or not all(isinstance(i, dict) for i in records):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, "Expected a JSON array of trips"
+        )
+
+    if len(records) > settings.PREDICT_API_MAX_TRIPS:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"Batch is larger than {settings.PREDICT_API_MAX_TRIPS} trips",
+        )
+
+    if not records:
+        return pd.DataFrame(columns=TRIP_COLUMNS)
+
+    trips = pd.DataFrame.from_records(records)
+    try:
+        check_columns(trips.columns)
+    except BatchFileError as err:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(err))
+
+    return trips
+
+
+@router.post("")
+async def predict_trip(
+    trip: TaxiTravel,
+    prediction_service: Annotated[PredictionService, Depends(get_prediction_service)],
+) -> PredictionResponse:
+    prediction = await prediction_service.predict(trip)
+    return PredictionResponse(prediction=prediction)
+
+
+@router.post(
+    "/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": TaxiTravel.model_json_schema(),
+                    }
+                }
+            },
+        }
+    },
+)
+async def predict_trips(request: Request):
+    """Предсказание для массива поездок одним векторизованным вызовом модели,
+    некорректные поездки не ломают батч и возвращаются в errors"""
+    body = await read_body(request, settings.PREDICT_API_MAX_BODY_SIZE)
+    trips = await asyncio.to_thread(parse_trips, body)
+
+    if trips.empty:
+        return FastJSONResponse({"predictions": [], "errors": []})
+
+    scored = await asyncio.to_thread(score_chunk, trips)
+
+    predictions = scored[PREDICTION_COLUMN].astype(object)
+    errors = scored[ERROR_COLUMN].dropna()
+
+    return FastJSONResponse(
+        {
+            "predictions": predictions.where(predictions.notna(), None).tolist(),
+            "errors": [
+                {"index": index, "error": error}
+                for index, error in zip(errors.index.tolist(), errors.tolist())
+            ],
+        }
+    )
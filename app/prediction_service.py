@@ -0,0 +1,264 @@
+"""
+Асинхронный сервис предсказаний с микробатчингом:
+запросы копятся короткое окно или до максимального размера батча,
+затем один векторизованный predict выполняется вне event loop
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from app.inference import batch_features, predict_features
+from app.model import TaxiTravel, get_model
+from app.prediction_cache import PredictionCache, get_prediction_cache
+from app.settings import get_settings
+from app.shadow import ShadowEvaluator, get_shadow_evaluator
+from app.utils.metrics import MODEL_PREDICT, predicted_trips, track_stage
+from app.utils.tracing import Trace, current_trace, run_traced
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_QUEUE = "prediction_queue"
+
+# Поездка, future ответа, время постановки в очередь и трасса апдейта
+BatchItem = tuple[TaxiTravel, asyncio.Future, float, Trace | None]
+
+
+def predict_batch(trips: list[TaxiTravel]) -> tuple[list[float], np.ndarray]:
+    """Предсказание для батча поездок одним вызовом модели
+
+    Args:
+        trips (list[TaxiTravel]): Провалидированные поездки
+
+    Returns:
+        tuple[list[float], np.ndarray]: Предсказания в порядке поездок
+            и матрица признаков для теневых моделей
+    """
+    features = batch_features(trips)
+    with track_stage(MODEL_PREDICT):
+        predictions = predict_features(get_model(), features)
+
+    predicted_trips.inc(len(trips))
+    return [float(i) for i in predictions], features
+
+
+class PredictionService:
+    """Сервис предсказаний, который собирает конкурентные запросы в батчи"""
+
+    def __init__(
+        self,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        executor: Executor | None = None,
+        concurrency: int = 1,
+        cache: PredictionCache | None = None,
+        shadow: ShadowEvaluator | None = None,
+    ):
+        """
+        Args:
+            max_batch_size (int, optional): Максимальный размер батча. Defaults to 64.
+            max_wait_ms (float, optional): Окно сбора батча после первого запроса.
+                Defaults to 5.0.
+            executor (Executor | None, optional): Пул, в котором выполняется
+                модель. Defaults to ThreadPoolExecutor на один поток.
+            concurrency (int, optional): Сколько батчей может выполняться
+                одновременно. Defaults to 1.
+            cache (PredictionCache | None, optional): Кэш предсказаний перед
+                очередью. Defaults to None.
+            shadow (ShadowEvaluator | None, optional): Теневые модели, которые
+                оцениваются на признаках батча после ответа. Defaults to None.
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.concurrency = concurrency
+        self.cache = cache
+        self.shadow = shadow
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="prediction"
+        )
+
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._batches_in_flight = 0
+
+        self.requests_total = 0
+        self.batches_total = 0
+        self.errors_total = 0
+        self.batch_sizes: Counter[int] = Counter()
+        self.queue_wait_seconds_total = 0.0
+        self.predict_seconds_total = 0.0
+
+    def start(self):
+        """Запуск фоновых задач сборки батчей в текущем event loop"""
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._run(), name=f"prediction_service_{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def close(self):
+        """Остановка фоновых задач и пула исполнителей,
+        ожидающие в очереди запросы отменяются"""
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while self._queue is not None and not self._queue.empty():
+            _, future, _, _ = self._queue.get_nowait()
+            future.cancel()
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def predict(self, trip: TaxiTravel) -> float:
+        """Предсказание цены поездки, запрос попадает в ближайший батч
+
+        Args:
+            trip (TaxiTravel): Провалидированная поездка
+
+        Returns:
+            float: Предсказанная цена поездки
+        """
+        model = get_model()
+        if self.cache is not None:
+            prediction = self.cache.get(trip, model)
+            if prediction is not None:
+                return prediction
+
+        self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((trip, future, time.perf_counter(), current_trace()))
+        prediction = await future
+
+        if self.cache is not None:
+            self.cache.set(trip, model, prediction)
+
+        return prediction
+
+    async def _collect_batch(self) -> list[BatchItem]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+
+            # asyncio.wait не отменяет задачу по таймауту, поэтому элемент,
+            # пришедший одновременно с таймаутом, остаётся в очереди
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+            if getter not in done:
+                getter.cancel()
+                break
+
+            batch.append(getter.result())
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect_batch()
+            trips = [trip for trip, *_ in batch]
+
+            started = time.perf_counter()
+            self._batches_in_flight += 1
+            self.requests_total += len(batch)
+            self.batches_total += 1
+            self.batch_sizes[len(batch)] += 1
+            self.queue_wait_seconds_total += sum(started - i for _, _, i, _ in batch)
+
+            try:
+                (predictions, features), spans = await loop.run_in_executor(
+                    self._executor, run_traced, predict_batch, trips
+                )
+            except Exception as err:
+                logger.exception("Prediction batch failed")
+                self.errors_total += 1
+                for _, future, *_ in batch:
+                    if not future.done():
+                        future.set_exception(err)
+                continue
+
+            finally:
+                self._batches_in_flight -= 1
+                self.predict_seconds_total += time.perf_counter() - started
+
+            for (_, future, enqueued_at, trace), prediction in zip(batch, predictions):
+                if trace is not None:
+                    trace.add_span(PREDICTION_QUEUE, enqueued_at, started - enqueued_at)
+                    trace.extend(spans, started)
+
+                if not future.done():
+                    future.set_result(prediction)
+
+            if self.shadow is not None:
+                self.shadow.submit(features, predictions)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict[str, float | int | dict]:
+        """Статистика сервиса для подбора окна и размера батча
+
+        Returns:
+            dict[str, float | int | dict]: Глубина очереди, счётчики,
+                распределение размеров батчей и статистика кэша
+        """
+        batches = self.batches_total or 1
+        requests = self.requests_total or 1
+
+        return {
+            "queue_depth": self.queue_depth,
+            "batches_in_flight": self._batches_in_flight,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "errors_total": self.errors_total,
+            "mean_batch_size": self.requests_total / batches,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_wait_ms": self.queue_wait_seconds_total / requests * 1000,
+            "mean_batch_predict_ms": self.predict_seconds_total / batches * 1000,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+@lru_cache
+def get_prediction_service() -> PredictionService:
+    settings = get_settings()
+
+    if settings.PREDICTION_EXECUTOR == "process":
+        executor = ProcessPoolExecutor(max_workers=settings.PREDICTION_WORKERS)
+    else:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.PREDICTION_WORKERS, thread_name_prefix="prediction"
+        )
+
+    return PredictionService(
+        max_batch_size=settings.PREDICTION_BATCH_MAX_SIZE,
+        max_wait_ms=settings.PREDICTION_BATCH_WAIT_MS,
+        executor=executor,
+        concurrency=settings.PREDICTION_WORKERS,
+        cache=get_prediction_cache() if settings.PREDICTION_CACHE_SIZE > 0 else None,
+        shadow=get_shadow_evaluator(),
+    )
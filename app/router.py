@@ -1,15 +1,56 @@
+import asyncio
+import secrets
+
 from aiogram.types import Update, WebhookInfo
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
 from typing_extensions import Annotated
 
 from app.bot import Bot, Dispatcher, get_bot, get_dispatcher
+from app.bot.batch_jobs import get_batch_jobs
+from app.bot.fsm_storage import SQLiteStorage
+from app.bot.update_dedup import (
+    UpdateDeduplicator,
+    get_update_deduplicator,
+    update_type,
+)
+from app.bot.update_queue import UpdateQueue, get_update_queue
+from app.model import model_registry
+from app.prediction_service import PredictionService, get_prediction_service
 from app.settings import Settings, get_settings
+from app.shadow import ShadowEvaluator, get_shadow_evaluator
+from app.utils.aiohttpt_client import AiohttpClient, get_aiohttp_client
+from app.utils.gazetteer import get_gazetteer
+from app.utils.geocode_client import geocode_client
+from app.utils.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    UPDATE,
+    WEBHOOK,
+    bot_updates,
+    bot_updates_dropped,
+    metrics,
+    track_stage,
+)
+from app.utils.profiler import ProfilerBusyError, SamplingProfiler, get_profiler
+from app.utils.startup import startup_report
+from app.utils.tracing import TraceBuffer, get_trace_buffer
+from app.utils.worker_stats import read_worker_stats
 
 settings: Settings = get_settings()
 
 router = APIRouter()
 
 
+async def require_admin(x_admin_token: Annotated[str | None, Header()] = None):
+    """Доступ к админским и служебным эндпоинтам (метрики, статистика, трассы)
+    только с заголовком X-Admin-Token, равным SECRET_KEY: они открыты на том же
+    хосте, что и вебхук"""
+    if x_admin_token is None or not secrets.compare_digest(
+        x_admin_token, settings.SECRET_KEY
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
 @router.get("/")
 async def check() -> dict[str, str]:
     return {"status": "ok, api is wooooooooooooOOsh?..."}
@@ -20,10 +61,164 @@ async def webhook(
     update: Update,
     dispatcher: Annotated[Dispatcher, Depends(get_dispatcher)],
     bot: Annotated[Bot, Depends(get_bot)],
+    update_queue: Annotated[UpdateQueue, Depends(get_update_queue)],
+    deduplicator: Annotated[UpdateDeduplicator, Depends(get_update_deduplicator)],
 ):
-    await dispatcher.feed_update(bot=bot, update=update)
+    with track_stage(WEBHOOK):
+        bot_updates.labels(update_type(update)).inc()
+
+        if await deduplicator.is_duplicate(update):
+            bot_updates_dropped.labels("duplicate").inc()
+            return
+
+        if settings.WEBHOOK_MODE == "inline":
+            try:
+                with track_stage(UPDATE):
+                    await dispatcher.feed_update(bot=bot, update=update)
+            except Exception:
+                await deduplicator.forget(update)
+                raise
+            return
+
+        # Телеграм повторит доставку апдейта, на который ответили ошибкой
+        if not await update_queue.put(update):
+            await deduplicator.forget(update)
+            bot_updates_dropped.labels("queue_full").inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Update queue is full",
+            )
+
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @router.get("/bot_webhook_info")
 async def bot_webhook_info(bot: Annotated[Bot, Depends(get_bot)]) -> WebhookInfo:
     return await bot.get_webhook_info()
+
+
+@router.get("/webhook_queue_stats", dependencies=[Depends(require_admin)])
+async def webhook_queue_stats(
+    update_queue: Annotated[UpdateQueue, Depends(get_update_queue)],
+) -> dict:
+    return update_queue.stats()
+
+
+@router.get("/update_dedup_stats", dependencies=[Depends(require_admin)])
+async def update_dedup_stats(
+    deduplicator: Annotated[UpdateDeduplicator, Depends(get_update_deduplicator)],
+) -> dict:
+    return deduplicator.stats()
+
+
+@router.get("/workers", dependencies=[Depends(require_admin)])
+async def workers_stats() -> dict:
+    # Статистика старше трёх периодов записи - воркер завис или остановлен
+    return await asyncio.to_thread(
+        read_worker_stats,
+        settings.WORKER_STATS_DIR,
+        3 * settings.WORKER_STATS_INTERVAL_SECONDS,
+    )
+
+
+@router.get("/fsm_storage_stats", dependencies=[Depends(require_admin)])
+async def fsm_storage_stats(
+    dispatcher: Annotated[Dispatcher, Depends(get_dispatcher)],
+) -> dict:
+    if not isinstance(dispatcher.storage, SQLiteStorage):
+        return {"storage": type(dispatcher.storage).__name__}
+
+    return {"storage": "sqlite", **dispatcher.storage.stats()}
+
+
+@router.get("/startup", dependencies=[Depends(require_admin)])
+async def startup_info() -> dict:
+    report = startup_report.as_dict()
+    active = model_registry.active
+    if active is not None:
+        report["model"] = {
+            "load_seconds": active.load_seconds,
+            "warmup_seconds": active.warmup_seconds,
+            # Модель загружается в фоне и может быть готова позже процесса
+            "loaded_after_seconds": active.loaded_at.timestamp()
+            - startup_report.started_at,
+        }
+
+    return report
+
+
+@router.get("/model_info", dependencies=[Depends(require_admin)])
+async def model_info() -> dict:
+    return model_registry.stats()
+
+
+@router.post("/admin/reload_model", dependencies=[Depends(require_admin)])
+async def reload_model(force: bool = False) -> dict:
+    reloaded = await model_registry.reload(force=force)
+    return {"reloaded": reloaded, **model_registry.stats()}
+
+
+@router.get("/shadow_stats", dependencies=[Depends(require_admin)])
+async def shadow_stats(
+    shadow_evaluator: Annotated[ShadowEvaluator, Depends(get_shadow_evaluator)],
+) -> dict:
+    return shadow_evaluator.stats()
+
+
+@router.get("/traces", dependencies=[Depends(require_admin)])
+async def slowest_traces(
+    trace_buffer: Annotated[TraceBuffer, Depends(get_trace_buffer)],
+    limit: Annotated[int, Query(ge=1)] = 20,
+) -> dict:
+    return {
+        **trace_buffer.stats(),
+        "traces": [i.as_dict() for i in trace_buffer.slowest(limit)],
+    }
+
+
+@router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+    seconds: Annotated[float, Query(gt=0)] = 10,
+    interval_ms: Annotated[float, Query(ge=1)] = 5,
+    limit: Annotated[int, Query(ge=1)] = 100,
+) -> dict:
+    """Сэмплирующее профилирование процесса на seconds секунд,
+    в ответе самые частые стеки всех потоков"""
+    try:
+        return await asyncio.to_thread(
+            profiler.profile, seconds, interval_ms / 1000, limit
+        )
+    except ProfilerBusyError as err:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(err))
+
+
+@router.get("/prediction_service_stats", dependencies=[Depends(require_admin)])
+async def prediction_service_stats(
+    prediction_service: Annotated[PredictionService, Depends(get_prediction_service)],
+) -> dict:
+    return prediction_service.stats()
+
+
+@router.get("/batch_jobs_stats", dependencies=[Depends(require_admin)])
+async def batch_jobs_stats() -> dict:
+    return get_batch_jobs().stats()
+
+
+@router.get("/geocode_stats", dependencies=[Depends(require_admin)])
+async def geocode_stats() -> dict:
+    gazetteer = get_gazetteer()
+    return {
+        **geocode_client.stats(),
+        "gazetteer": gazetteer.stats() if gazetteer is not None else None,
+    }
+
+
+@router.get("/http_client_stats", dependencies=[Depends(require_admin)])
+async def http_client_stats(
+    aiohttp_client: Annotated[AiohttpClient, Depends(get_aiohttp_client)],
+) -> dict:
+    return aiohttp_client.stats()
@@ -0,0 +1,159 @@
+"""
+Офлайн предсказание больших выгрузок поездок на нескольких ядрах
+
+Входной CSV или Parquet файл читается чанками, чанки раздаются пулу процессов,
+в каждом процессе модель загружается один раз. Результаты пишутся в файл
+в исходном порядке строк, а число чанков в работе ограничено,
+поэтому память не растёт с размером файла
+
+Запуск: PYTHONPATH=app python -m app.score trips.parquet predictions.parquet
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from app.batch_prediction import ChunkWriter, iter_chunks, score_chunk
+
+_predict_params: dict = {}
+
+
+def _init_worker(thread_count: int) -> None:
+    from app.model import get_model
+
+    _predict_params["thread_count"] = thread_count
+    get_model()
+
+
+def _score_worker(chunk: pd.DataFrame) -> tuple[pd.DataFrame, int, float]:
+    started = time.perf_counter()
+    scored = score_chunk(chunk, **_predict_params)
+    return scored, os.getpid(), time.perf_counter() - started
+
+
+class ScoreReport:
+    """Пропускная способность офлайн предсказания по процессам"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.rows = 0
+        self.chunks = 0
+        self.worker_rows: defaultdict[int, int] = defaultdict(int)
+        self.worker_seconds: defaultdict[int, float] = defaultdict(float)
+
+    def add(self, rows: int, pid: int, seconds: float) -> None:
+        self.rows += rows
+        self.chunks += 1
+        self.worker_rows[pid] += rows
+        self.worker_seconds[pid] += seconds
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def format(self) -> str:
+        lines = [
+            f"rows: {self.rows}, chunks: {self.chunks}, "
+            f"wall time: {self.seconds:.2f}s, "
+            f"throughput: {self.rows / self.seconds:,.0f} rows/s"
+        ]
+        for pid in sorted(self.worker_rows):
+            rows, seconds = self.worker_rows[pid], self.worker_seconds[pid]
+            lines.append(
+                f"  worker {pid}: {rows} rows in {seconds:.2f}s, "
+                f"{rows / seconds if seconds else 0:,.0f} rows/s"
+            )
+
+        return "\n".join(lines)
+
+
+def score(
+    input_path: Path,
+    output_path: Path,
+    chunk_size: int = 100_000,
+    workers: int | None = None,
+    max_in_flight: int | None = None,
+    thread_count: int = 1,
+) -> ScoreReport:
+    """Предсказание для файла пулом процессов с сохранением порядка строк
+
+    Args:
+        input_path (Path): Входной CSV или Parquet файл
+        output_path (Path): Файл результата, формат по расширению
+        chunk_size (int, optional): Размер чанка. Defaults to 100_000.
+        workers (int | None, optional): Количество процессов.
+            Defaults to os.cpu_count().
+        max_in_flight (int | None, optional): Сколько чанков одновременно
+            прочитано и ещё не записано. Defaults to 2 * workers.
+        thread_count (int, optional): Потоков CatBoost на процесс. Defaults to 1.
+
+    Returns:
+        ScoreReport: Статистика пропускной способности
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    report = ScoreReport()
+    writer = ChunkWriter(output_path)
+    in_flight: deque[Future] = deque()
+
+    def write_next():
+        scored, pid, seconds = in_flight.popleft().result()
+        writer.write(scored)
+        report.add(len(scored), pid, seconds)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(thread_count,)
+        ) as executor:
+            for chunk in iter_chunks(input_path, chunk_size):
+                if len(in_flight) >= max_in_flight:
+                    write_next()
+                in_flight.append(executor.submit(_score_worker, chunk))
+
+            while in_flight:
+                write_next()
+
+    finally:
+        for future in in_flight:
+            future.cancel()
+        writer.close()
+
+    report.finish()
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Офлайн предсказание стоимости поездок для CSV или Parquet файла"
+    )
+    parser.add_argument("input", type=Path, help="Входной CSV или Parquet файл")
+    parser.add_argument("output", type=Path, help="Файл результата")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1, help="Потоков CatBoost")
+    args = parser.parse_args(argv)
+
+    report = score(
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        thread_count=args.threads,
+    )
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Запуск приложения в несколько процессов на одной машине. Родитель загружает
+модель, открывает сокет и делает fork воркеров: страницы модели остаются
+общими, пока воркеры их не меняют. Воркеры принимают соединения с общего
+сокета, упавший воркер перезапускается
+"""
+
+import gc
+import logging
+import os
+import signal
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+from app.model import model_registry
+from app.settings import Settings, get_settings
+from app.utils.worker_stats import WORKER_ID_ENV
+
+settings: Settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Воркер, проживший меньше, перезапускается с паузой, чтобы не крутить падения
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+
+
+def _run_worker(config: uvicorn.Config, sockets: list, worker_id: int):
+    os.environ[WORKER_ID_ENV] = str(worker_id)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    code = 0
+    try:
+        uvicorn.Server(config).run(sockets=sockets)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        logger.exception("Worker %s failed", worker_id)
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def serve(app: FastAPI):
+    """Запуск uvicorn, при WORKERS > 1 - в несколько процессов через fork
+
+    Args:
+        app (FastAPI): Приложение
+    """
+    config = uvicorn.Config(
+        app=app,
+        host=settings.HOST,
+        port=settings.PORT,
+        # Логирование уже настроено setup_logging, в том числе очередь
+        log_config=None,
+    )
+    if settings.WORKERS == 1:
+        uvicorn.Server(config).run()
+        return
+
+    # До fork в родителе не должно быть потоков и event loop, только данные
+    model_registry.load_latest()
+    # Объекты, созданные до fork, не обходятся сборщиком мусора в воркерах,
+    # и он не копирует их страницы, меняя служебные поля
+    gc.freeze()
+
+    sockets = [config.bind_socket()]
+    workers: dict[int, tuple[int, float]] = {}
+
+    def spawn(worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(config, sockets, worker_id)
+
+        workers[pid] = (worker_id, time.monotonic())
+        logger.info("Worker %s started, pid %s", worker_id, pid)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(
+        "Serving on %s:%s with %s workers",
+        settings.HOST,
+        settings.PORT,
+        settings.WORKERS,
+    )
+    for worker_id in range(settings.WORKERS):
+        spawn(worker_id)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        if pid not in workers:
+            continue
+
+        worker_id, started = workers.pop(pid)
+        if stopping:
+            continue
+
+        logger.warning(
+            "Worker %s (pid %s) exited with code %s, restarting",
+            worker_id,
+            pid,
+            os.waitstatus_to_exitcode(status),
+        )
+        if time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+            time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+        if not stopping:
+            spawn(worker_id)
+
+    for sock in sockets:
+        sock.close()
@@ -1,5 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 from pydantic import AnyUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,14 +12,104 @@ class Settings(BaseSettings):
     MODELS_DIR: Path = PROJECT_DIR / "models"
     LOGGING_CONFIG_PATH: Path = PROJECT_DIR / "logging.yaml"
     LOGS_DIR: Path = PROJECT_DIR / "logs"
+    DATA_DIR: Path = PROJECT_DIR / "data"
 
     HOST: str = Field(default="0.0.0.0")
     PORT: int = Field(default=8080)
+    # Процессы uvicorn на одном сокете, модель загружается один раз до fork
+    WORKERS: int = Field(default=1, ge=1)
+    WORKER_STATS_DIR: Path = DATA_DIR / "workers"
+    WORKER_STATS_INTERVAL_SECONDS: float = Field(default=5, gt=0)
+    # Вебхук регистрирует только процесс, взявший этот лок
+    WEBHOOK_LOCK_PATH: Path = DATA_DIR / "webhook.lock"
     SECRET_KEY: str = Field()
     TG_BOT_TOKEN: str = Field()
     TG_WEBHOOK_CERTIFICATE: str | None = Field(default=None)
     TG_WEBHOOK_URL: AnyUrl = Field()
+    # queue - вебхук сразу отвечает телеграму, апдейты обрабатывают воркеры
+    WEBHOOK_MODE: Literal["inline", "queue"] = Field(default="queue")
+    WEBHOOK_QUEUE_SIZE: int = Field(default=1000, ge=1)
+    WEBHOOK_QUEUE_WORKERS: int = Field(default=8, ge=1)
+    WEBHOOK_QUEUE_PUT_TIMEOUT_SECONDS: float = Field(default=1.0, ge=0)
+    WEBHOOK_QUEUE_DRAIN_TIMEOUT_SECONDS: float = Field(default=10.0, ge=0)
+    UPDATE_DEDUP_WINDOW_SECONDS: float = Field(default=3600, gt=0)
+    UPDATE_DEDUP_MAX_SIZE: int = Field(default=100_000, ge=1)
+    # Одинаковые текстовые сообщения чата в этом окне обрабатываются один раз,
+    # 0 - выключено
+    MESSAGE_COALESCE_WINDOW_SECONDS: float = Field(default=2.0, ge=0)
     GEOCODE_API_KEY: str = Field()
+    GEOCODE_API_URL: str = Field(default="https://geocode.maps.co")
+    # Бесплатный тариф geocode.maps.co - 1 запрос в секунду
+    GEOCODE_RATE_LIMIT_PER_SECOND: float | None = Field(default=1.0, gt=0)
+    GEOCODE_RATE_LIMIT_BURST: float = Field(default=1.0, ge=1)
+    GEOCODE_RATE_LIMIT_MAX_WAIT_SECONDS: float | None = Field(default=5.0, gt=0)
+    GEOCODE_MAX_RETRIES: int = Field(default=2, ge=0)
+    GEOCODE_RETRY_BACKOFF_SECONDS: float = Field(default=0.5, ge=0)
+    GEOCODE_CACHE_SIZE: int = Field(default=10_000, ge=0)
+    GEOCODE_CACHE_DB_URL: str | None = Field(
+        default=f"sqlite:///{DATA_DIR / 'geocode_cache.sqlite3'}"
+    )
+    GEOCODE_CACHE_TTL_SECONDS: float = Field(default=30 * 24 * 3600, gt=0)
+    GEOCODE_CACHE_NEGATIVE_TTL_SECONDS: float = Field(default=3600, gt=0)
+    # Справочник адресов Нью-Йорка, найденные в нём адреса не идут в геокодер
+    GAZETTEER_PATH: Path | None = Field(
+        default=PROJECT_DIR / "app" / "data" / "nyc_gazetteer.json"
+    )
+
+    HTTP_POOL_LIMIT: int = Field(default=100, ge=0)
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(default=10, ge=0)
+    HTTP_KEEPALIVE_TIMEOUT: float = Field(default=30, gt=0)
+    HTTP_DNS_CACHE_TTL: int | None = Field(default=300, ge=0)
+    HTTP_CONNECT_TIMEOUT: float | None = Field(default=5, gt=0)
+    HTTP_READ_TIMEOUT: float | None = Field(default=10, gt=0)
+    HTTP_TOTAL_TIMEOUT: float | None = Field(default=20, gt=0)
+    HTTP_JSON_DECODER: Literal["json", "orjson"] = Field(default="json")
+
+    # Период проверки MODELS_DIR на новые версии модели, None - не проверять
+    MODEL_RELOAD_INTERVAL_SECONDS: float | None = Field(default=30, gt=0)
+    # Модели-кандидаты для теневой оценки, отсутствующая папка - оценка выключена
+    SHADOW_MODELS_DIR: Path | None = Field(default=MODELS_DIR / "shadow")
+    SHADOW_DB_URL: str | None = Field(
+        default=f"sqlite:///{DATA_DIR / 'shadow_predictions.sqlite3'}"
+    )
+    SHADOW_MAX_PENDING_BATCHES: int = Field(default=100, ge=1)
+    # Потоков CatBoost на предсказание для нативного формата, -1 - все ядра
+    MODEL_THREAD_COUNT: int = Field(default=-1)
+
+    PREDICTION_BATCH_MAX_SIZE: int = Field(default=64, ge=1)
+    PREDICTION_BATCH_WAIT_MS: float = Field(default=5.0, ge=0)
+    PREDICTION_EXECUTOR: Literal["thread", "process"] = Field(default="thread")
+    PREDICTION_WORKERS: int = Field(default=1, ge=1)
+
+    BATCH_PREDICTION_CHUNK_SIZE: int = Field(default=10_000, ge=1)
+    # Bot API не даёт скачивать файлы больше 20 МБ
+    BATCH_PREDICTION_MAX_FILE_SIZE: int = Field(default=20 * 1024 * 1024, ge=1)
+    BATCH_PREDICTION_MAX_CONCURRENT: int = Field(default=2, ge=1)
+
+    PREDICT_API_MAX_TRIPS: int = Field(default=10_000, ge=1)
+    PREDICT_API_MAX_BODY_SIZE: int = Field(default=5 * 1024 * 1024, ge=1)
+
+    PREDICTION_CACHE_SIZE: int = Field(default=10_000, ge=0)
+    PREDICTION_CACHE_TTL_SECONDS: float | None = Field(default=None, gt=0)
+    PREDICTION_CACHE_COORDS_DIGITS: int = Field(default=4, ge=0)
+
+    TRACING_ENABLED: bool = Field(default=True)
+    TRACE_BUFFER_SIZE: int = Field(default=100, ge=1)
+    # Трассы апдейтов быстрее порога не попадают в буфер медленных трасс
+    TRACE_SLOW_THRESHOLD_MS: float = Field(default=250, ge=0)
+    PROFILER_MAX_SECONDS: float = Field(default=60, gt=0)
+
+    # sqlite - состояние диалогов общее для всех процессов бота и переживает рестарт
+    FSM_STORAGE: Literal["memory", "sqlite"] = Field(default="sqlite")
+    FSM_DB_URL: str = Field(default=f"sqlite:///{DATA_DIR / 'fsm.sqlite3'}")
+    # Аренда ключа упавшего процесса освобождается через FSM_LOCK_TTL_SECONDS
+    FSM_LOCK_TTL_SECONDS: float = Field(default=60, gt=0)
+    FSM_LOCK_WAIT_SECONDS: float = Field(default=30, gt=0)
+    FSM_CACHE_SIZE: int = Field(default=10_000, ge=0)
+
+    # Логи пишутся в файлы из фонового потока, а не из event loop
+    LOG_QUEUE_ENABLED: bool = Field(default=True)
+    LOG_FORMAT: Literal["text", "json"] = Field(default="text")
 
     model_config = SettingsConfigDict(env_file=PROJECT_DIR / ".env")
 
@@ -0,0 +1,230 @@
+"""
+Теневая оценка моделей-кандидатов: кандидаты предсказывают на той же
+матрице признаков, что и продовая модель, уже после ответа пользователю,
+а их предсказания и задержки сохраняются для офлайн сравнения
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sqlalchemy import Engine, Float, Integer, String, Text
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.inference import predict_features
+from app.model import load_model_file, model_registry
+from app.model_registry import model_paths, model_version_name
+from app.settings import get_settings
+from app.utils.database import Base, get_engine
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowPredictionRecord(Base):
+    __tablename__ = "shadow_predictions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    created_at: Mapped[float] = mapped_column(Float, index=True)
+    model: Mapped[str] = mapped_column(String, index=True)
+    production_model: Mapped[str] = mapped_column(String)
+    features: Mapped[str] = mapped_column(Text)
+    production_prediction: Mapped[float] = mapped_column(Float)
+    prediction: Mapped[float] = mapped_column(Float)
+    batch_size: Mapped[int] = mapped_column(Integer)
+    batch_latency_ms: Mapped[float] = mapped_column(Float)
+
+
+class ShadowModelStats:
+    """Счётчики одной теневой модели"""
+
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+        self.abs_diff_total = 0.0
+
+    def as_dict(self) -> dict[str, int | float]:
+        batches = self.batches or 1
+        rows = self.rows or 1
+
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+            "mean_batch_ms": self.seconds_total / batches * 1000,
+            "mean_abs_diff": self.abs_diff_total / rows,
+        }
+
+
+class ShadowEvaluator:
+    """Теневые модели из отдельной папки, оцениваемые в фоновом потоке"""
+
+    def __init__(
+        self,
+        models_dir: Path | None,
+        db_url: str | None = None,
+        max_pending: int = 100,
+    ):
+        """
+        Args:
+            models_dir (Path | None): Папка с моделями-кандидатами,
+                None или отсутствующая папка - теневая оценка выключена
+            db_url (str | None, optional): URL базы для записи предсказаний,
+                None - только счётчики в памяти. Defaults to None.
+            max_pending (int, optional): Сколько батчей может ждать оценки,
+                лишние отбрасываются, чтобы не копить память. Defaults to 100.
+        """
+        self.models_dir = models_dir
+        self.db_url = db_url
+        self.max_pending = max_pending
+
+        self.models: dict[str, Any] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._engine: Engine | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.dropped_batches = 0
+        self.model_stats: defaultdict[str, ShadowModelStats] = defaultdict(
+            ShadowModelStats
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.models)
+
+    def load(self):
+        """Загрузка всех моделей из папки кандидатов, модели с ошибкой пропускаются"""
+        models = {}
+        if self.models_dir is not None and self.models_dir.is_dir():
+            for path in model_paths(self.models_dir):
+                try:
+                    models[model_version_name(path)] = load_model_file(path)
+                except Exception:
+                    logger.exception("Shadow model %s wasn't loaded", path.name)
+
+        self.models = models
+        if models:
+            logger.info("Shadow models loaded: %s", ", ".join(models))
+
+    def _get_engine(self) -> Engine:
+        if self._engine is None:
+            engine = get_engine(self.db_url)
+            ShadowPredictionRecord.__table__.create(engine, checkfirst=True)
+            self._engine = engine
+
+        return self._engine
+
+    def submit(self, features: np.ndarray, predictions: np.ndarray) -> bool:
+        """Постановка батча в очередь теневой оценки, не блокирует вызывающего
+
+        Args:
+            features (np.ndarray): Матрица признаков, по которой предсказывала
+                продовая модель
+            predictions (np.ndarray): Предсказания продовой модели
+
+        Returns:
+            bool: False, если оценка выключена или батч отброшен
+        """
+        if not self.models:
+            return False
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped_batches += 1
+                return False
+            self._pending += 1
+
+        active = model_registry.active
+        self._executor.submit(
+            self._evaluate,
+            features,
+            np.asarray(predictions),
+            active.name if active is not None else "",
+        )
+        return True
+
+    def _evaluate(
+        self, features: np.ndarray, predictions: np.ndarray, production_model: str
+    ):
+        try:
+            records = []
+            created_at = time.time()
+
+            for name, model in self.models.items():
+                stats = self.model_stats[name]
+                started = time.perf_counter()
+                try:
+                    shadow_predictions = predict_features(model, features)
+                except Exception:
+                    logger.exception("Shadow model %s failed", name)
+                    stats.errors += 1
+                    continue
+
+                elapsed = time.perf_counter() - started
+                stats.batches += 1
+                stats.rows += len(features)
+                stats.seconds_total += elapsed
+                stats.abs_diff_total += float(
+                    np.abs(shadow_predictions - predictions).sum()
+                )
+
+                records.extend(
+                    ShadowPredictionRecord(
+                        created_at=created_at,
+                        model=name,
+                        production_model=production_model,
+                        features=json.dumps(row.tolist()),
+                        production_prediction=float(production),
+                        prediction=float(shadow),
+                        batch_size=len(features),
+                        batch_latency_ms=elapsed * 1000,
+                    )
+                    for row, production, shadow in zip(
+                        features, predictions, shadow_predictions
+                    )
+                )
+
+            if records and self.db_url is not None:
+                with Session(self._get_engine()) as session:
+                    session.add_all(records)
+                    session.commit()
+
+        except Exception:
+            logger.exception("Shadow evaluation failed")
+
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "models": list(self.models),
+            "pending_batches": self._pending,
+            "dropped_batches": self.dropped_batches,
+            "per_model": {
+                name: self.model_stats[name].as_dict() for name in self.models
+            },
+        }
+
+
+@lru_cache
+def get_shadow_evaluator() -> ShadowEvaluator:
+    settings = get_settings()
+
+    return ShadowEvaluator(
+        models_dir=settings.SHADOW_MODELS_DIR,
+        db_url=settings.SHADOW_DB_URL,
+        max_pending=settings.SHADOW_MAX_PENDING_BATCHES,
+    )
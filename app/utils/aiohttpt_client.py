@@ -1,15 +1,157 @@
+import json
+import logging
+import time
+from collections import defaultdict
 from functools import lru_cache
-from typing import Any
+from types import SimpleNamespace
+from typing import Any, Callable
 
 import aiohttp
+from yarl import URL
+
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+JSONDecoder = Callable[[str | bytes], Any]
+
+
+def get_json_decoder(name: str) -> JSONDecoder:
+    """Декодер JSON по имени, orjson - опциональная зависимость
+
+    Args:
+        name (str): "json" или "orjson"
+
+    Returns:
+        JSONDecoder: Функция декодирования JSON
+    """
+    if name == "orjson":
+        try:
+            import orjson
+
+            return orjson.loads
+        except ImportError:
+            logger.warning("orjson isn't installed, fallback to json")
+
+    return json.loads
+
+
+class HostStats:
+    """Счётчики запросов к одному хосту"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def as_dict(self) -> dict[str, int | float]:
+        requests = self.requests or 1
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "mean_ms": self.seconds_total / requests * 1000,
+            "max_ms": self.seconds_max * 1000,
+        }
 
 
 class AiohttpClient:
     """Обёртка для AioHttp ClientSession"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15,
+        dns_cache_ttl: int | None = 10,
+        connect_timeout: float | None = None,
+        read_timeout: float | None = None,
+        total_timeout: float | None = None,
+        json_loads: JSONDecoder = json.loads,
+    ):
+        """
+        Args:
+            limit (int, optional): Общий лимит соединений пула, 0 - без лимита.
+                Defaults to 100.
+            limit_per_host (int, optional): Лимит соединений на один хост,
+                0 - без лимита. Defaults to 0.
+            keepalive_timeout (float, optional): Время жизни простаивающего
+                соединения в секундах. Defaults to 15.
+            dns_cache_ttl (int | None, optional): Время кэширования DNS в секундах,
+                None - навсегда. Defaults to 10.
+            connect_timeout (float | None, optional): Таймаут на получение
+                соединения из пула и подключение. Defaults to None.
+            read_timeout (float | None, optional): Таймаут чтения из сокета.
+                Defaults to None.
+            total_timeout (float | None, optional): Таймаут всего запроса.
+                Defaults to None.
+            json_loads (JSONDecoder, optional): Декодер JSON ответов.
+                Defaults to json.loads.
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout, connect=connect_timeout, sock_read=read_timeout
+        )
+        self.json_loads = json_loads
+
         self.session: aiohttp.ClientSession = None
 
+        self.hosts: defaultdict[str, HostStats] = defaultdict(HostStats)
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connections_queued = 0
+        self.connection_queue_seconds_total = 0.0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_queued_start(session, context, params):
+            context.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(session, context, params):
+            self.connections_queued += 1
+            self.connection_queue_seconds_total += (
+                time.perf_counter() - context.queued_at
+            )
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.trace_config_ctx_factory = SimpleNamespace
+        return trace_config
+
+    async def start(self):
+        """Создание сессии с настроенным пулом соединений,
+        вызывается на старте приложения"""
+        if self.session and not self.session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[self._trace_config()],
+        )
+
     async def make_request(
         self,
         method: str,
@@ -27,15 +169,61 @@ class AiohttpClient:
 
         Returns:
             dict[str, Any] | list[Any] : Результат запроса в формате JSON
+
+        Raises:
+            aiohttp.ClientError: если запрос не удался, в том числе по таймауту
         """
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        if not self.session or self.session.closed:
+            await self.start()
+
+        host_stats = self.hosts[URL(url).host]
+        host_stats.requests += 1
+        host_stats.in_flight += 1
+        started = time.perf_counter()
+
+        try:
+            async with self.session.request(
+                method=method, url=url, params=params, json=json
+            ) as resp:
+                resp.raise_for_status()
+                return await resp.json(loads=self.json_loads)
+
+        except TimeoutError as err:
+            host_stats.errors += 1
+            if isinstance(err, aiohttp.ClientError):
+                raise
 
-        async with self.session.request(
-            method=method, url=url, params=params, json=json
-        ) as resp:
-            resp.raise_for_status()
-            return await resp.json()
+            # Таймаут всего запроса aiohttp поднимает голым TimeoutError,
+            # а вызывающий код ловит aiohttp.ClientError
+            raise aiohttp.ServerTimeoutError(f"{method} {url} timed out") from err
+
+        except Exception:
+            host_stats.errors += 1
+            raise
+
+        finally:
+            elapsed = time.perf_counter() - started
+            host_stats.in_flight -= 1
+            host_stats.seconds_total += elapsed
+            host_stats.seconds_max = max(host_stats.seconds_max, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        """Задержки по хостам и заполненность пула соединений"""
+        connector = self.session.connector if self.session else None
+        in_flight = sum(i.in_flight for i in self.hosts.values())
+
+        return {
+            "pool_limit": self.limit,
+            "pool_limit_per_host": self.limit_per_host,
+            "pool_in_use": in_flight,
+            "pool_saturation": in_flight / self.limit if self.limit else 0.0,
+            "pool_closed": connector.closed if connector else True,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "connections_queued": self.connections_queued,
+            "connection_queue_seconds_total": self.connection_queue_seconds_total,
+            "hosts": {host: i.as_dict() for host, i in self.hosts.items()},
+        }
 
     async def close(self):
         if self.session and not self.session.closed:
@@ -44,4 +232,15 @@ class AiohttpClient:
 
 @lru_cache
 def get_aiohttp_client() -> AiohttpClient:
-    return AiohttpClient()
+    settings = get_settings()
+
+    return AiohttpClient(
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        total_timeout=settings.HTTP_TOTAL_TIMEOUT,
+        json_loads=get_json_decoder(settings.HTTP_JSON_DECODER),
+    )
@@ -0,0 +1,40 @@
+from functools import lru_cache
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(DeclarativeBase):
+    """Базовый класс для ORM моделей локальной базы"""
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL позволяет нескольким процессам читать базу во время записи
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+@lru_cache
+def get_engine(url: str) -> Engine:
+    """Движок SQLAlchemy для url, создаётся один раз на процесс
+
+    Args:
+        url (str): URL базы данных, например sqlite:///data/cache.sqlite3
+
+    Returns:
+        Engine: Движок SQLAlchemy
+    """
+    parsed_url = make_url(url)
+    if parsed_url.get_backend_name() != "sqlite":
+        return create_engine(url)
+
+    if parsed_url.database and parsed_url.database != ":memory:":
+        Path(parsed_url.database).parent.mkdir(parents=True, exist_ok=True)
+
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
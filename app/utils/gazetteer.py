@@ -0,0 +1,483 @@
+"""
+Локальный справочник адресов Нью-Йорка: аэропорты, районы, достопримечательности
+и сетка улиц Манхэттена с диапазонами номеров домов. Частые адреса
+разрешаются в памяти за микросекунды, в геокодер идут только промахи.
+
+Адрес нормализуется в токены: сокращения раскрываются (st -> street,
+ave -> avenue), порядковые числительные заменяются числами (42nd, fifth),
+город, штат, индекс и страна в конце отбрасываются. Дальше по порядку:
+точное совпадение названия, адрес на сетке Манхэттена ("350 5th Ave",
+"225 W 42nd St", "8th Ave & W 42nd St"), уникальный префикс названия
+и название с опечаткой
+"""
+
+import json
+import logging
+import re
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.settings import get_settings
+from app.utils.geocode_cache import normalize_address
+
+logger = logging.getLogger(__name__)
+
+ABBREVIATIONS = {
+    "st": "street",
+    "str": "street",
+    "ave": "avenue",
+    "av": "avenue",
+    "blvd": "boulevard",
+    "dr": "drive",
+    "pl": "place",
+    "sq": "square",
+    "ctr": "center",
+    "intl": "international",
+    "w": "west",
+    "e": "east",
+    "&": "and",
+    "first": "1",
+    "second": "2",
+    "third": "3",
+    "fourth": "4",
+    "fifth": "5",
+    "sixth": "6",
+    "seventh": "7",
+    "eighth": "8",
+    "ninth": "9",
+    "tenth": "10",
+    "eleventh": "11",
+    "twelfth": "12",
+}
+STOP_WORDS = {"the"}
+
+# Хвосты адреса, после которых остаётся место в городе
+LOCALITY_SUFFIXES = (
+    ("united", "states", "of", "america"),
+    ("united", "states"),
+    ("usa",),
+    ("us",),
+    ("new", "york", "city"),
+    ("new", "york"),
+    ("nyc",),
+    ("ny",),
+)
+MANHATTAN = "manhattan"
+BOROUGHS = {
+    ("manhattan",): MANHATTAN,
+    ("brooklyn",): "brooklyn",
+    ("queens",): "queens",
+    ("bronx",): "bronx",
+    ("staten", "island"): "staten island",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|&")
+_ORDINAL_RE = re.compile(r"(\d+)(?:st|nd|rd|th)")
+_ZIP_RE = re.compile(r"\d{5}")
+_STREET_RE = re.compile(r"(?:(east|west) )?(\d+) street")
+_ADDRESS_RE = re.compile(r"(\d+) (.+)")
+_INTERSECTION_RE = re.compile(r"(.+) (?:and|at) (.+)")
+
+
+def normalize_tokens(text: str) -> list[str]:
+    """Токены адреса с раскрытыми сокращениями и числами вместо числительных
+
+    Args:
+        text (str): Адрес от пользователя
+
+    Returns:
+        list[str]: Токены адреса
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize_address(text).replace("'", "")):
+        ordinal = _ORDINAL_RE.fullmatch(token)
+        if ordinal is not None:
+            token = ordinal.group(1)
+
+        token = ABBREVIATIONS.get(token, token)
+        if token not in STOP_WORDS:
+            tokens.append(token)
+
+    return tokens
+
+
+def strip_locality(tokens: list[str]) -> tuple[list[str], str | None]:
+    """Отбрасывание города, штата, индекса и района в конце адреса
+
+    Args:
+        tokens (list[str]): Токены адреса
+
+    Returns:
+        tuple[list[str], str | None]: Токены без хвоста и район из хвоста
+    """
+    borough = None
+    stripped = True
+    while stripped:
+        stripped = False
+        if len(tokens) > 1 and _ZIP_RE.fullmatch(tokens[-1]):
+            tokens = tokens[:-1]
+            stripped = True
+            continue
+
+        for suffix in (*LOCALITY_SUFFIXES, *BOROUGHS):
+            n = len(suffix)
+            if len(tokens) > n and tuple(tokens[-n:]) == suffix:
+                tokens = tokens[:-n]
+                borough = BOROUGHS.get(suffix, borough)
+                stripped = True
+                break
+
+    return tokens, borough
+
+
+def is_locality(tokens: list[str]) -> bool:
+    """Состоит ли часть адреса только из города, штата, индекса, страны
+    и района Нью-Йорка, например "new york ny 10013" или "brooklyn"
+
+    Args:
+        tokens (list[str]): Токены части адреса
+
+    Returns:
+        bool: True, если часть не указывает на место за пределами Нью-Йорка
+    """
+    while tokens:
+        if _ZIP_RE.fullmatch(tokens[-1]):
+            tokens = tokens[:-1]
+            continue
+
+        for suffix in (*LOCALITY_SUFFIXES, *BOROUGHS):
+            n = len(suffix)
+            if tuple(tokens[-n:]) == suffix:
+                tokens = tokens[:-n]
+                break
+        else:
+            return False
+
+    return True
+
+
+def _interpolate(points: list[tuple[float, float]], x: float) -> float | None:
+    """Кусочно-линейная интерполяция, вне диапазона точек - None"""
+    if not points[0][0] <= x <= points[-1][0]:
+        return None
+
+    i = max(bisect_left(points, (x,)), 1)
+    (x0, y0), (x1, y1) = points[i - 1], points[i]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def _edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Расстояние Левенштейна с ранним выходом, если оно больше max_distance"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return previous[-1]
+
+
+class GazetteerMatch(BaseModel):
+    lat: float
+    lon: float
+    name: str
+    # place - название, address - дом на сетке, intersection - перекрёсток
+    kind: str
+
+
+class Avenue:
+    """Авеню Манхэттена: положение на сетке и перевод номера дома в улицу"""
+
+    def __init__(
+        self,
+        name: str,
+        offset: float | list[tuple[float, float]],
+        streets: tuple[int, int],
+        rules: list[tuple[int, float, float]],
+    ):
+        """
+        Args:
+            name (str): Название авеню
+            offset (float | list[tuple[float, float]]): Смещение от 5th Avenue
+                в кварталах на запад или точки (улица, смещение) для косых
+                авеню вроде Broadway
+            streets (tuple[int, int]): Первая и последняя улицы авеню
+            rules (list[tuple[int, float, float]]): Правила (последний номер,
+                делитель, ключ), улица = номер / делитель + ключ
+        """
+        self.name = name
+        self.offset = offset
+        self.streets = streets
+        self.rules = rules
+
+    def offset_at(self, street: float) -> float | None:
+        if not self.streets[0] <= street <= self.streets[1]:
+            return None
+
+        if isinstance(self.offset, list):
+            return _interpolate(self.offset, street)
+
+        return self.offset
+
+    def cross_street(self, number: int) -> float | None:
+        for max_number, divisor, key in self.rules:
+            if number <= max_number:
+                return number / divisor + key
+
+        return None
+
+
+class Gazetteer:
+    """Поиск координат адреса в справочнике без обращений к сети"""
+
+    # Префикс короче этого слишком часто совпадает с несколькими местами
+    MIN_PREFIX_LENGTH = 4
+
+    def __init__(self, data: dict[str, Any]):
+        """
+        Args:
+            data (dict[str, Any]): Справочник в формате app/data/nyc_gazetteer.json
+        """
+        grid = data["grid"]
+        self.origin = grid["origin"]
+        self.street_step = grid["street_step"]
+        self.avenue_step = grid["avenue_step"]
+        self.streets = tuple(grid["streets"])
+
+        house_numbers = grid["house_numbers"]
+        self.east_numbers = [tuple(i) for i in house_numbers["east"]]
+        self.west_numbers = [tuple(i) for i in house_numbers["west"]]
+        # Вдоль Central Park номера западных улиц начинаются от Central Park West
+        central_park = house_numbers["west_central_park"]
+        self.central_park_streets = tuple(central_park["streets"])
+        self.central_park_numbers = [tuple(i) for i in central_park["numbers"]]
+
+        self.avenues: dict[str, Avenue] = {}
+        for item in data["avenues"]:
+            offset = item["offset"]
+            avenue = Avenue(
+                name=item["names"][0],
+                offset=(
+                    [tuple(i) for i in offset] if isinstance(offset, list) else offset
+                ),
+                streets=tuple(item["streets"]),
+                rules=[tuple(i) for i in item["rules"]],
+            )
+            for name in item["names"]:
+                self.avenues[" ".join(normalize_tokens(name))] = avenue
+
+        # Нормализованное название -> (место, широта, долгота)
+        self.places: dict[str, tuple[str, float, float]] = {}
+        for _, name, lat, lon, aliases in data["places"]:
+            for alias in (name, *aliases):
+                self.places.setdefault(
+                    " ".join(normalize_tokens(alias)), (name, lat, lon)
+                )
+
+        # Отсортированные названия для поиска по префиксу и по первой букве
+        self._names = sorted(self.places)
+        self._names_by_letter: dict[str, list[str]] = {}
+        for name in self._names:
+            self._names_by_letter.setdefault(name[0], []).append(name)
+
+        self.lookups = 0
+        self.hits: Counter[str] = Counter()
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Gazetteer":
+        with path.open(encoding="utf8") as file:
+            return cls(json.load(file))
+
+    def _grid_point(self, offset: float, street: float) -> tuple[float, float]:
+        lat = (
+            self.origin[0] + street * self.street_step[0] + offset * self.avenue_step[0]
+        )
+        lon = (
+            self.origin[1] + street * self.street_step[1] + offset * self.avenue_step[1]
+        )
+        return round(lat, 6), round(lon, 6)
+
+    def _street_address(
+        self, number: int, direction: str, street: int
+    ) -> tuple[float, float] | None:
+        if not self.streets[0] <= street <= self.streets[1]:
+            return None
+
+        if direction == "east":
+            numbers = self.east_numbers
+        elif self.central_park_streets[0] <= street <= self.central_park_streets[1]:
+            numbers = self.central_park_numbers
+        else:
+            numbers = self.west_numbers
+
+        offset = _interpolate(numbers, number)
+        return None if offset is None else self._grid_point(offset, street)
+
+    def _avenue_address(self, number: int, name: str) -> tuple[float, float] | None:
+        avenue = self.avenues.get(name)
+        if avenue is None or number < 1:
+            return None
+
+        street = avenue.cross_street(number)
+        offset = None if street is None else avenue.offset_at(street)
+        return None if offset is None else self._grid_point(offset, street)
+
+    def _intersection(self, first: str, second: str) -> tuple[float, float] | None:
+        for street_name, avenue_name in ((first, second), (second, first)):
+            street = _STREET_RE.fullmatch(street_name)
+            avenue = self.avenues.get(avenue_name)
+            if street is None or avenue is None:
+                continue
+
+            number = int(street.group(2))
+            if not self.streets[0] <= number <= self.streets[1]:
+                return None
+
+            offset = avenue.offset_at(number)
+            return None if offset is None else self._grid_point(offset, number)
+
+        return None
+
+    def _grid_lookup(self, text: str) -> tuple[str, tuple[float, float]] | None:
+        address = _ADDRESS_RE.fullmatch(text)
+        if address is not None:
+            number, rest = int(address.group(1)), address.group(2)
+            street = _STREET_RE.fullmatch(rest)
+            if street is not None and street.group(1) is not None:
+                point = self._street_address(
+                    number, street.group(1), int(street.group(2))
+                )
+            else:
+                point = self._avenue_address(number, rest)
+
+            if point is not None:
+                return "address", point
+
+        intersection = _INTERSECTION_RE.fullmatch(text)
+        if intersection is not None:
+            point = self._intersection(*intersection.groups())
+            if point is not None:
+                return "intersection", point
+
+        return None
+
+    def _prefix_lookup(self, text: str) -> tuple[str, float, float] | None:
+        if len(text) < self.MIN_PREFIX_LENGTH:
+            return None
+
+        places, covered = set(), False
+        i = bisect_left(self._names, text)
+        while i < len(self._names) and self._names[i].startswith(text):
+            places.add(self.places[self._names[i]])
+            # Префикс должен покрывать хотя бы половину названия: "park"
+            # - это не Park Slope, а "metropolitan museum" - это Met
+            covered = covered or 2 * len(text) >= len(self._names[i])
+            i += 1
+
+        return places.pop() if len(places) == 1 and covered else None
+
+    def _fuzzy_lookup(self, text: str) -> tuple[str, float, float] | None:
+        if len(text) < self.MIN_PREFIX_LENGTH:
+            return None
+
+        max_distance = 1 if len(text) < 8 else 2
+        best_distance, places = max_distance, set()
+        for name in self._names_by_letter.get(text[0], ()):
+            if abs(len(name) - len(text)) > max_distance:
+                continue
+
+            distance = _edit_distance(text, name, max_distance)
+            if distance > max_distance:
+                continue
+
+            if distance < best_distance:
+                best_distance, places = distance, {self.places[name]}
+            elif distance == best_distance:
+                places.add(self.places[name])
+
+        return places.pop() if len(places) == 1 else None
+
+    def lookup(self, text: str) -> GazetteerMatch | None:
+        """Координаты адреса или места из справочника
+
+        Args:
+            text (str): Адрес от пользователя
+
+        Returns:
+            GazetteerMatch | None: Координаты или None, если адреса нет
+                в справочнике
+        """
+        self.lookups += 1
+
+        tokens = normalize_tokens(text)
+        place = self.places.get(" ".join(tokens))
+        if place is None:
+            # Части после первой запятой - город, штат и страна. Если среди
+            # них есть что-то кроме Нью-Йорка ("Soho, London", "Newark, NJ"),
+            # адрес решает геокодер
+            parts = normalize_address(text).split(", ")[1:]
+            if not all(is_locality(normalize_tokens(i)) for i in parts):
+                return None
+
+            tokens, borough = strip_locality(tokens)
+            text = " ".join(tokens)
+            place = self.places.get(text)
+
+            # Сетка улиц есть только у Манхэттена, в других районах
+            # те же номера улиц и авеню - другие места
+            if place is None and borough in (None, MANHATTAN) and text:
+                found = self._grid_lookup(text)
+                if found is not None:
+                    kind, (lat, lon) = found
+                    self.hits[kind] += 1
+                    return GazetteerMatch(lat=lat, lon=lon, name=text, kind=kind)
+
+            if place is None and text:
+                place = self._prefix_lookup(text) or self._fuzzy_lookup(text)
+
+        if place is None:
+            return None
+
+        self.hits["place"] += 1
+        name, lat, lon = place
+        return GazetteerMatch(lat=lat, lon=lon, name=name, kind="place")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "places": len(set(self.places.values())),
+            "names": len(self.places),
+            "avenues": len(set(map(id, self.avenues.values()))),
+            "lookups": self.lookups,
+            "hits": dict(self.hits),
+            "misses": self.lookups - sum(self.hits.values()),
+        }
+
+
+@lru_cache
+def get_gazetteer() -> Gazetteer | None:
+    settings = get_settings()
+    if settings.GAZETTEER_PATH is None:
+        return None
+
+    if not settings.GAZETTEER_PATH.exists():
+        logger.warning(
+            "Gazetteer %s not found, addresses go to the geocoder",
+            settings.GAZETTEER_PATH,
+        )
+        return None
+
+    return Gazetteer.from_file(settings.GAZETTEER_PATH)
@@ -0,0 +1,218 @@
+"""
+Двухуровневый кэш геокодинга: LRU в памяти процесса и SQLite на диске,
+чтобы ответы геокодера переживали перезапуск контейнера
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import Engine, Float, String, Text, delete
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.settings import get_settings
+from app.utils.database import Base, get_engine
+from app.utils.ttl_cache import TTLCache
+
+GeocodeAnswer = list[dict[str, Any]]
+
+
+class GeocodeCacheRecord(Base):
+    __tablename__ = "geocode_cache"
+
+    address: Mapped[str] = mapped_column(String, primary_key=True)
+    results: Mapped[str] = mapped_column(Text)
+    expires_at: Mapped[float] = mapped_column(Float, index=True)
+
+
+def normalize_address(address: str) -> str:
+    """Нормализация адреса для ключа кэша: регистр, пробелы, запятые
+
+    Args:
+        address (str): Адрес от пользователя
+
+    Returns:
+        str: Нормализованный адрес
+    """
+    address = unicodedata.normalize("NFKC", address).casefold()
+    address = re.sub(r"\s*,\s*", ", ", address)
+    address = re.sub(r"\s+", " ", address)
+    return address.strip(" .,;")
+
+
+class GeocodeCache:
+    """Кэш сырых ответов геокодера, пустые ответы хранятся меньшее время"""
+
+    def __init__(
+        self,
+        db_url: str | None,
+        maxsize: int = 10_000,
+        ttl: float = 30 * 24 * 3600,
+        negative_ttl: float = 3600,
+    ):
+        """
+        Args:
+            db_url (str | None): URL базы для постоянного уровня, None - только память
+            maxsize (int, optional): Размер уровня в памяти. Defaults to 10_000.
+            ttl (float, optional): Время жизни найденных адресов в секундах.
+                Defaults to 30 дней.
+            negative_ttl (float, optional): Время жизни адресов без результатов
+                в секундах. Defaults to 1 час.
+        """
+        self.db_url = db_url
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory: TTLCache[str, GeocodeAnswer] = TTLCache(maxsize=maxsize)
+        self._engine: Engine | None = None
+        self._engine_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.db_seconds_total = 0.0
+        self.upstream_requests = 0
+        self.upstream_seconds_total = 0.0
+
+    def _get_engine(self) -> Engine:
+        with self._engine_lock:
+            if self._engine is None:
+                engine = get_engine(self.db_url)
+                GeocodeCacheRecord.__table__.create(engine, checkfirst=True)
+                self._engine = engine
+
+        return self._engine
+
+    def _db_get(self, address: str) -> tuple[GeocodeAnswer, float] | None:
+        with Session(self._get_engine()) as session:
+            record = session.get(GeocodeCacheRecord, address)
+            if record is None:
+                return
+
+            if record.expires_at <= time.time():
+                session.delete(record)
+                session.commit()
+                return
+
+            return json.loads(record.results), record.expires_at
+
+    def _db_set(self, address: str, results: GeocodeAnswer, expires_at: float):
+        with Session(self._get_engine()) as session:
+            session.merge(
+                GeocodeCacheRecord(
+                    address=address,
+                    results=json.dumps(results),
+                    expires_at=expires_at,
+                )
+            )
+            session.commit()
+
+    def _db_delete_expired(self) -> int:
+        with Session(self._get_engine()) as session:
+            result = session.execute(
+                delete(GeocodeCacheRecord).where(
+                    GeocodeCacheRecord.expires_at <= time.time()
+                )
+            )
+            session.commit()
+            return result.rowcount
+
+    def _count_hit(self, results: GeocodeAnswer):
+        if not results:
+            self.negative_hits += 1
+
+    async def get(self, address: str) -> GeocodeAnswer | None:
+        """Результаты геокодинга из кэша
+
+        Args:
+            address (str): Нормализованный адрес
+
+        Returns:
+            GeocodeAnswer | None: Результаты или None при промахе,
+                пустой список - закэшированный ответ без результатов
+        """
+        results = self._memory.get(address)
+        if results is not None:
+            self.memory_hits += 1
+            self._count_hit(results)
+            return results
+
+        if self.db_url is not None:
+            started = time.perf_counter()
+            record = await asyncio.to_thread(self._db_get, address)
+            self.db_seconds_total += time.perf_counter() - started
+
+            if record is not None:
+                results, expires_at = record
+                self._memory.set(address, results, ttl=expires_at - time.time())
+                self.db_hits += 1
+                self._count_hit(results)
+                return results
+
+        self.misses += 1
+
+    async def set(self, address: str, results: GeocodeAnswer):
+        """Сохранение результатов геокодинга в оба уровня кэша
+
+        Args:
+            address (str): Нормализованный адрес
+            results (GeocodeAnswer): Ответ геокодера
+        """
+        ttl = self.ttl if results else self.negative_ttl
+        self._memory.set(address, results, ttl=ttl)
+
+        if self.db_url is not None:
+            await asyncio.to_thread(self._db_set, address, results, time.time() + ttl)
+
+    async def delete_expired(self) -> int:
+        """Удаление просроченных записей из постоянного уровня
+
+        Returns:
+            int: Количество удалённых записей
+        """
+        if self.db_url is None:
+            return 0
+
+        return await asyncio.to_thread(self._db_delete_expired)
+
+    def record_upstream(self, seconds: float):
+        """Учёт задержки запроса к геокодеру для оценки сэкономленного времени"""
+        self.upstream_requests += 1
+        self.upstream_seconds_total += seconds
+
+    def stats(self) -> dict[str, int | float]:
+        hits = self.memory_hits + self.db_hits
+        requests = hits + self.misses
+        mean_upstream = (
+            self.upstream_seconds_total / self.upstream_requests
+            if self.upstream_requests
+            else 0.0
+        )
+
+        return {
+            "memory_size": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / requests if requests else 0.0,
+            "mean_upstream_ms": mean_upstream * 1000,
+            "saved_seconds": hits * mean_upstream - self.db_seconds_total,
+        }
+
+
+@lru_cache
+def get_geocode_cache() -> GeocodeCache:
+    settings = get_settings()
+
+    return GeocodeCache(
+        db_url=settings.GEOCODE_CACHE_DB_URL,
+        maxsize=settings.GEOCODE_CACHE_SIZE,
+        ttl=settings.GEOCODE_CACHE_TTL_SECONDS,
+        negative_ttl=settings.GEOCODE_CACHE_NEGATIVE_TTL_SECONDS,
+    )
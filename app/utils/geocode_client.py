@@ -1,7 +1,20 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any
+
+import aiohttp
 from pydantic import BaseModel
 
 from app.settings import get_settings
 from app.utils.aiohttpt_client import AiohttpClient, get_aiohttp_client
+from app.utils.geocode_cache import GeocodeCache, get_geocode_cache, normalize_address
+from app.utils.metrics import GEOCODING, track_stage
+from app.utils.rate_limiter import TokenBucket
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 
 class GeocodeResult(BaseModel):
@@ -16,25 +29,149 @@ class GeocodeClient:
     HOST = "https://geocode.maps.co"
     PATH = "/search"
 
-    def __init__(self, token: str):
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        token: str,
+        cache: GeocodeCache | None = None,
+        rate_limiter: TokenBucket | None = None,
+        rate_limit_timeout: float | None = None,
+        max_retries: int = 0,
+        retry_backoff: float = 0.5,
+        host: str | None = None,
+        client: AiohttpClient | None = None,
+    ):
+        """
+        Args:
+            token (str): API ключ геокодера
+            cache (GeocodeCache | None, optional): Кэш ответов. Defaults to None.
+            rate_limiter (TokenBucket | None, optional): Ограничитель частоты
+                запросов к API. Defaults to None.
+            rate_limit_timeout (float | None, optional): Сколько секунд запрос может
+                ждать токен, после чего поднимается RateLimitTimeoutError.
+                Defaults to None.
+            max_retries (int, optional): Количество повторов при ответах 429 и 5xx.
+                Defaults to 0.
+            retry_backoff (float, optional): Базовая задержка экспоненциального
+                backoff в секундах. Defaults to 0.5.
+            host (str | None, optional): Адрес API, например локальной заглушки.
+                Defaults to HOST.
+            client (AiohttpClient | None, optional): HTTP клиент.
+                Defaults to get_aiohttp_client().
+        """
         self.__token: str = token
-        self.__client: AiohttpClient = get_aiohttp_client()
+        self.__client: AiohttpClient = client or get_aiohttp_client()
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.rate_limit_timeout = rate_limit_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.host = host or self.HOST
+        self._single_flight = SingleFlight()
+
+        self.retries = 0
+
+    def _retry_delay(self, attempt: int, err: aiohttp.ClientResponseError) -> float:
+        retry_after = err.headers.get("Retry-After") if err.headers else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+
+        return self.retry_backoff * 2**attempt * random.uniform(0.5, 1.5)
+
+    async def _request(self, address: str) -> list[dict[str, Any]]:
+        url = self.host + self.PATH
+        params = {"api_key": self.__token, "q": address}
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(self.rate_limit_timeout)
+
+            try:
+                return await self.__client.make_request(
+                    method="GET", url=url, params=params
+                )
+            except aiohttp.ClientResponseError as err:
+                if err.status not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    raise
+
+                delay = self._retry_delay(attempt, err)
+                if (
+                    self.rate_limit_timeout is not None
+                    and delay > self.rate_limit_timeout
+                ):
+                    raise
+
+                logger.warning(
+                    "Geocoder answered %s, retry in %.2fs", err.status, delay
+                )
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def _fetch(self, address: str) -> list[dict[str, Any]]:
+        started = time.perf_counter()
+        results = await self._request(address)
+
+        if self.cache is not None:
+            self.cache.record_upstream(time.perf_counter() - started)
+            await self.cache.set(address, results)
+
+        return results
 
     async def get_coordinates(self, address: str) -> list[GeocodeResult]:
         """Метод для получения координат по адресу
 
+        Одинаковые конкурентные запросы объединяются в один запрос к API
+
         Args:
             address (str): Адрес на английском языке
 
         Returns:
             list[GeocodeResult]: Список возможных точек
+
+        Raises:
+            aiohttp.ClientError: если API ответил ошибкой после всех повторов
+            RateLimitTimeoutError: если запрос не дождался своей очереди к API
         """
-        url = self.HOST + self.PATH
-        params = {"api_key": self.__token, "q": address}
-        results = await self.__client.make_request(method="GET", url=url, params=params)
-        results = [GeocodeResult(**i) for i in results]
-        return results
+        with track_stage(GEOCODING):
+            address = normalize_address(address)
+
+            results = await self.cache.get(address) if self.cache is not None else None
+            if results is None:
+                results = await self._single_flight.do(
+                    address, lambda: self._fetch(address)
+                )
+
+            results = [GeocodeResult(**i) for i in results]
+            return results
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self._single_flight.calls,
+            "coalesced": self._single_flight.coalesced,
+            "in_flight": self._single_flight.in_flight,
+            "retries": self.retries,
+            "rate_limiter": (
+                self.rate_limiter.stats() if self.rate_limiter is not None else None
+            ),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
 
 
 settings = get_settings()
-geocode_client = GeocodeClient(settings.GEOCODE_API_KEY)
+geocode_client = GeocodeClient(
+    settings.GEOCODE_API_KEY,
+    cache=get_geocode_cache() if settings.GEOCODE_CACHE_SIZE > 0 else None,
+    rate_limiter=(
+        TokenBucket(
+            rate=settings.GEOCODE_RATE_LIMIT_PER_SECOND,
+            capacity=settings.GEOCODE_RATE_LIMIT_BURST,
+        )
+        if settings.GEOCODE_RATE_LIMIT_PER_SECOND
+        else None
+    ),
+    rate_limit_timeout=settings.GEOCODE_RATE_LIMIT_MAX_WAIT_SECONDS,
+    max_retries=settings.GEOCODE_MAX_RETRIES,
+    retry_backoff=settings.GEOCODE_RETRY_BACKOFF_SECONDS,
+    host=settings.GEOCODE_API_URL,
+)
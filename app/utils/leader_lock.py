@@ -0,0 +1,55 @@
+"""
+Выбор одного процесса среди воркеров на машине через flock на файл.
+Лок держится, пока файл открыт, и освобождается ОС, если процесс упал
+"""
+
+import fcntl
+import os
+from pathlib import Path
+
+
+class LeaderLock:
+    """Неблокирующий межпроцессный лок: лидером становится первый процесс,
+    который его взял"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path (Path): Файл лока, общий для всех процессов
+        """
+        self.path = path
+        self._fd: int | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Попытка стать лидером без ожидания
+
+        Returns:
+            bool: True, если лок взят этим процессом
+        """
+        if self._fd is not None:
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -1,15 +1,251 @@
+"""
+Настройка логирования из logging.yaml. В режиме очереди обработчики
+корневого логгера переносятся в фоновый поток QueueListener: в месте вызова
+логгера запись только кладётся в очередь, а форматирование и запись
+на диск, включая ротацию файлов, не блокируют event loop
+"""
+
+import json
 import logging
 import logging.config
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Literal
 
 import yaml
-from settings import get_settings
+
+from app.settings import get_settings
+from app.utils.metrics import log_records_dropped
 
 settings = get_settings()
 
+LogFormat = Literal["text", "json"]
+
+# Стандартные поля LogRecord, остальные поля записи - это extra
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON, поля из extra попадают в объект"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Ограничение частоты записей логгера token bucket'ом отдельно для
+    каждого шаблона сообщения. Записи выше max_level проходят всегда,
+    число отброшенных дописывается к следующей прошедшей записи"""
+
+    def __init__(
+        self, rate: float, burst: float = 1, max_level: int | str = logging.INFO
+    ):
+        """
+        Args:
+            rate (float): Записей в секунду на шаблон сообщения
+            burst (float, optional): Допустимый всплеск. Defaults to 1.
+            max_level (int | str, optional): Максимальный ограничиваемый
+                уровень. Defaults to logging.INFO.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = logging._checkLevel(max_level)
+        # Шаблон -> токены, время обновления, отброшено с прошлой записи
+        self._buckets: dict[tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                log_records_dropped.labels(record.name).inc()
+                return False
+
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar suppressed)"
+            record.args = None
+
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Случайная выборка доли записей, записи выше max_level проходят всегда"""
+
+    def __init__(self, rate: float, max_level: int | str = logging.INFO):
+        """
+        Args:
+            rate (float): Доля записей, которые проходят, от 0 до 1
+            max_level (int | str, optional): Максимальный прореживаемый
+                уровень. Defaults to logging.INFO.
+        """
+        super().__init__()
+        self.rate = rate
+        self.max_level = logging._checkLevel(max_level)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or random.random() < self.rate:
+            return True
+
+        log_records_dropped.labels(record.name).inc()
+        return False
+
+
+class LocalQueueHandler(QueueHandler):
+    """Постановка записи в очередь того же процесса: запись не копируется
+    и не форматируется, подставляются только аргументы сообщения,
+    чтобы их последующие изменения не попали в лог"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+
+        return record
+
+
+class QueueLogging:
+    """Перенос обработчиков корневого логгера в фоновый поток"""
+
+    def __init__(self):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handler = LocalQueueHandler(self.queue)
+        self.listener: QueueListener | None = None
+        self._handlers: list[logging.Handler] = []
+
+    @property
+    def running(self) -> bool:
+        return self.listener is not None and self.listener._thread is not None
+
+    def start(self):
+        root = logging.getLogger()
+        self._handlers = [i for i in root.handlers if i is not self.handler]
+        for handler in self._handlers:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+
+        self.listener = QueueListener(
+            self.queue, *self._handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def stop(self):
+        """Запись оставшихся в очереди записей и возврат обработчиков
+        корневому логгеру, дальше логирование идёт синхронно"""
+        if self.listener is None:
+            return
+
+        if self.running:
+            self.listener.stop()
+        self.listener = None
+
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        for handler in self._handlers:
+            root.addHandler(handler)
+            handler.flush()
+
+    def _before_fork(self):
+        # Поток слушателя не переживает fork, а его локи могут остаться занятыми
+        if self.running:
+            self.listener.stop()
+
+    def _after_fork(self):
+        if self.listener is not None and not self.running:
+            self.listener.start()
+
+
+_queue_logging = QueueLogging()
+os.register_at_fork(
+    before=_queue_logging._before_fork,
+    after_in_parent=_queue_logging._after_fork,
+    after_in_child=_queue_logging._after_fork,
+)
+
+
+def configure_logging(
+    config: dict[str, Any], use_queue: bool = False, log_format: LogFormat = "text"
+):
+    """Применение конфига logging.config.dictConfig
+
+    Args:
+        config (dict[str, Any]): Конфиг логирования
+        use_queue (bool, optional): Писать логи из фонового потока.
+            Defaults to False.
+        log_format (LogFormat, optional): json - все обработчики пишут JSON.
+            Defaults to "text".
+    """
+    stop_logging()
+
+    if log_format == "json":
+        config = {
+            **config,
+            "formatters": {
+                **config.get("formatters", {}),
+                "json": {"()": JSONFormatter},
+            },
+            "handlers": {
+                name: {**handler, "formatter": "json"}
+                for name, handler in config.get("handlers", {}).items()
+            },
+        }
+
+    logging.config.dictConfig(config)
+    if use_queue:
+        _queue_logging.start()
+
 
 def setup_logging():
     settings.LOGS_DIR.mkdir(exist_ok=True)
 
     with settings.LOGGING_CONFIG_PATH.open(mode="r") as file:
         loaded_config = yaml.safe_load(file)
-        logging.config.dictConfig(loaded_config)
+
+    configure_logging(loaded_config, settings.LOG_QUEUE_ENABLED, settings.LOG_FORMAT)
+
+
+def stop_logging():
+    """Запись логов из очереди, вызывается при остановке приложения"""
+    _queue_logging.stop()
+
+
+def log_queue_depth() -> int:
+    return _queue_logging.queue.qsize() if _queue_logging.running else 0
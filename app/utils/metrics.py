@@ -0,0 +1,440 @@
+"""
+Метрики процесса: счётчики и гистограммы задержек с фиксированными бакетами.
+Запись метрики - поиск бакета и пара сложений под локом, поэтому метрики
+пишутся на каждом запросе. Отдаются в текстовом формате Prometheus.
+
+Метрики живут в памяти процесса: то, что посчитано в ProcessPoolExecutor,
+в них не попадает
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Generic, TypeVar
+
+from app.utils.tracing import current_trace
+
+# Границы бакетов задержек в секундах: от микросекунд признаков одной поездки
+# до секунд геокодера с повторами
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(f'{k}="{_escape(str(v))}"' for k, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class CounterValue:
+    """Значение счётчика с одним набором меток"""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class HistogramValue:
+    """Бакеты, сумма и количество наблюдений с одним набором меток"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # Последний элемент - бакет +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> "Timer":
+        """Контекстный менеджер, который записывает длительность блока"""
+        return Timer(self)
+
+    def quantile(self, q: float) -> float | None:
+        """Оценка квантиля по бакетам линейной интерполяцией внутри бакета,
+        как histogram_quantile в Prometheus
+
+        Args:
+            q (float): Квантиль от 0 до 1
+
+        Returns:
+            float | None: Оценка квантиля или None, если наблюдений нет
+        """
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+
+        if not count:
+            return None
+
+        rank = q * count
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+
+            cumulative += bucket_count
+
+        return self.buckets[-1]
+
+
+class Timer:
+    """Запись длительности блока with в гистограмму,
+    при исключении дополнительно увеличивается счётчик ошибок.
+    Если задано имя, а в контексте есть трасса, блок пишется в неё спаном"""
+
+    __slots__ = ("histogram", "errors", "name", "started")
+
+    def __init__(
+        self,
+        histogram: HistogramValue,
+        errors: CounterValue | None = None,
+        name: str | None = None,
+    ):
+        self.histogram = histogram
+        self.errors = errors
+        self.name = name
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.histogram.observe(elapsed)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc()
+
+        if self.name is not None:
+            trace = current_trace()
+            if trace is not None:
+                trace.add_span(self.name, self.started, elapsed, exc_type is not None)
+
+
+ValueT = TypeVar("ValueT", CounterValue, HistogramValue)
+
+
+class Metric(Generic[ValueT]):
+    """Семейство значений одной метрики с разными значениями меток"""
+
+    type: str
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+        self._values: dict[tuple[str, ...], ValueT] = {}
+        self._lock = threading.Lock()
+
+    def _new_value(self) -> ValueT:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> ValueT:
+        """Значение метрики для набора меток, создаётся при первом обращении.
+        На горячем пути значение лучше получить один раз и сохранить
+
+        Args:
+            *values (str): Значения меток в порядке labelnames
+
+        Returns:
+            ValueT: Значение метрики
+        """
+        value = self._values.get(values)
+        if value is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+
+            with self._lock:
+                value = self._values.setdefault(values, self._new_value())
+
+        return value
+
+    def items(self) -> list[tuple[tuple[str, ...], ValueT]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def _samples(self, values: ValueT) -> list[tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for labels, value in self.items():
+            for suffix, extra_labels, sample in self._samples(value):
+                label_text = _format_labels(self.labelnames, labels)
+                if extra_labels:
+                    label_text = (
+                        label_text[:-1] + "," + extra_labels + "}"
+                        if label_text
+                        else "{" + extra_labels + "}"
+                    )
+
+                lines.append(f"{self.name}{suffix}{label_text} {_format_value(sample)}")
+
+        return lines
+
+
+class Counter(Metric[CounterValue]):
+    type = "counter"
+
+    def _new_value(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1):
+        """Увеличение счётчика без меток"""
+        self.labels().inc(amount)
+
+    def total(self) -> float:
+        """Сумма счётчика по всем меткам"""
+        return sum(value.value for _, value in self.items())
+
+    def _samples(self, value: CounterValue) -> list[tuple[str, str, float]]:
+        return [("", "", value.value)]
+
+
+class Histogram(Metric[HistogramValue]):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        """Наблюдение гистограммы без меток"""
+        self.labels().observe(value)
+
+    def _samples(self, value: HistogramValue) -> list[tuple[str, str, float]]:
+        with value._lock:
+            counts = list(value.counts)
+            total, count = value.sum, value.count
+
+        samples = []
+        cumulative = 0
+        for bucket, bucket_count in zip((*self.buckets, float("inf")), counts):
+            cumulative += bucket_count
+            samples.append(("_bucket", f'le="{_format_value(bucket)}"', cumulative))
+
+        samples.append(("_sum", "", total))
+        samples.append(("_count", "", count))
+        return samples
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса и gauge, которые считаются при выгрузке"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._metrics: dict[str, Metric] = {}
+        self._gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, func: Callable[[], float]):
+        """Gauge, значение которого берётся из func при каждой выгрузке,
+        например глубина очереди. Повторная регистрация заменяет функцию
+
+        Args:
+            name (str): Имя метрики
+            documentation (str): Описание
+            func (Callable[[], float]): Функция текущего значения
+        """
+        with self._lock:
+            self._gauges[name] = (documentation, func)
+
+    def uptime(self) -> float:
+        return time.time() - self.started_at
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4
+
+        Returns:
+            str: Текст для эндпоинта /metrics
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            gauges = list(self._gauges.items())
+
+        lines = [
+            "# HELP process_start_time_seconds Start time of the process",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {_format_value(self.started_at)}",
+        ]
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        for name, (documentation, func) in gauges:
+            try:
+                value = func()
+            except Exception:
+                continue
+
+            lines.append(f"# HELP {name} {_escape(documentation)}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+WEBHOOK = "webhook"
+UPDATE = "update"
+GEOCODING = "geocoding"
+VALIDATION = "validation"
+FEATURE_ENGINEERING = "feature_engineering"
+MODEL_PREDICT = "model_predict"
+TELEGRAM_SEND = "telegram_send"
+
+STAGES = (
+    WEBHOOK,
+    UPDATE,
+    GEOCODING,
+    VALIDATION,
+    FEATURE_ENGINEERING,
+    MODEL_PREDICT,
+    TELEGRAM_SEND,
+)
+
+stage_seconds = metrics.histogram(
+    "taxi_stage_duration_seconds", "Duration of a processing stage", ("stage",)
+)
+stage_errors = metrics.counter(
+    "taxi_stage_errors_total", "Processing stage calls that raised", ("stage",)
+)
+bot_updates = metrics.counter(
+    "taxi_bot_updates_total", "Telegram updates received by type", ("type",)
+)
+bot_updates_dropped = metrics.counter(
+    "taxi_bot_updates_dropped_total", "Telegram updates not handled", ("reason",)
+)
+telegram_requests = metrics.counter(
+    "taxi_telegram_requests_total", "Telegram Bot API calls by method", ("method",)
+)
+predicted_trips = metrics.counter(
+    "taxi_predicted_trips_total", "Trips passed to the model"
+)
+log_records_dropped = metrics.counter(
+    "taxi_log_records_dropped_total",
+    "Log records dropped by rate limiting or sampling",
+    ("logger",),
+)
+geocode_resolutions = metrics.counter(
+    "taxi_geocode_resolutions_total",
+    "Pickup and dropoff texts resolved to coordinates by source",
+    ("source",),
+)
+http_requests = metrics.counter(
+    "taxi_http_requests_total", "HTTP requests served by the worker process"
+)
+
+# Значения по этапам создаются заранее, запись метрики обходится без поиска меток
+_stage_values = {
+    stage: (stage_seconds.labels(stage), stage_errors.labels(stage)) for stage in STAGES
+}
+
+
+def track_stage(stage: str) -> Timer:
+    """Замер этапа обработки: with track_stage(GEOCODING): ...
+
+    Args:
+        stage (str): Этап из STAGES
+
+    Returns:
+        Timer: Контекстный менеджер, который пишет длительность этапа,
+            ошибку, если блок завершился исключением, и спан текущей трассы
+    """
+    histogram, errors = _stage_values[stage]
+    return Timer(histogram, errors, stage)
+
+
+def stage_histogram(stage: str) -> HistogramValue:
+    """Гистограмма длительностей этапа из STAGES"""
+    return _stage_values[stage][0]
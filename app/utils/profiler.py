@@ -0,0 +1,136 @@
+"""
+Статистический профилировщик по запросу: отдельный поток раз в interval
+снимает стеки всех потоков через sys._current_frames и считает одинаковые
+стеки. Пока профилирование не запущено, он ничего не стоит
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Any
+
+from app.settings import get_settings
+
+
+class ProfilerBusyError(Exception):
+    """Профилирование уже идёт"""
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик, одновременно идёт одно профилирование"""
+
+    def __init__(self, max_seconds: float = 60):
+        """
+        Args:
+            max_seconds (float, optional): Максимальная длительность
+                профилирования. Defaults to 60.
+        """
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._code_names: dict[CodeType, str] = {}
+
+        self.profiles_total = 0
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _code_name(self, code: CodeType) -> str:
+        name = self._code_names.get(code)
+        if name is None:
+            path = code.co_filename
+            for prefix in sys.path:
+                if prefix and path.startswith(prefix + os.sep):
+                    path = path[len(prefix) + 1 :]
+                    break
+
+            name = f"{code.co_name} ({path}:{code.co_firstlineno})"
+            self._code_names[code] = name
+
+        return name
+
+    def _stack(self, frame: FrameType | None) -> tuple[str, ...]:
+        stack = []
+        while frame is not None:
+            stack.append(self._code_name(frame.f_code))
+            frame = frame.f_back
+
+        return tuple(reversed(stack))
+
+    def profile(
+        self, seconds: float, interval: float = 0.005, limit: int = 100
+    ) -> dict[str, Any]:
+        """Профилирование текущего процесса, блокирует вызывающий поток
+        на seconds, поэтому из event loop вызывается через asyncio.to_thread
+
+        Args:
+            seconds (float): Длительность, не больше max_seconds
+            interval (float, optional): Период снятия стеков в секундах.
+                Defaults to 0.005.
+            limit (int, optional): Сколько самых частых стеков вернуть.
+                Defaults to 100.
+
+        Raises:
+            ProfilerBusyError: если профилирование уже идёт
+
+        Returns:
+            dict[str, Any]: Количество сэмплов, самые частые стеки в формате
+                "поток;функция;...;функция" и функции, на которых стеки
+                заканчиваются
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Profiling is already running")
+
+        try:
+            seconds = min(seconds, self.max_seconds)
+            own_id = threading.get_ident()
+            stacks: Counter[tuple[str, tuple[str, ...]]] = Counter()
+            samples = 0
+
+            started = time.perf_counter()
+            deadline = started + seconds
+            while time.perf_counter() < deadline:
+                thread_names = {i.ident: i.name for i in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+
+                    thread_name = thread_names.get(thread_id, str(thread_id))
+                    stacks[(thread_name, self._stack(frame))] += 1
+
+                samples += 1
+                time.sleep(interval)
+
+            elapsed = time.perf_counter() - started
+            self.profiles_total += 1
+
+        finally:
+            self._lock.release()
+
+        leaves: Counter[str] = Counter()
+        for (_, stack), count in stacks.items():
+            if stack:
+                leaves[stack[-1]] += count
+
+        return {
+            "seconds": elapsed,
+            "interval_ms": interval * 1000,
+            "samples": samples,
+            "stacks": [
+                {"stack": ";".join((thread, *stack)), "count": count}
+                for (thread, stack), count in stacks.most_common(limit)
+            ],
+            "leaf_functions": [
+                {"function": name, "count": count}
+                for name, count in leaves.most_common(limit)
+            ],
+        }
+
+
+@lru_cache
+def get_profiler() -> SamplingProfiler:
+    return SamplingProfiler(max_seconds=get_settings().PROFILER_MAX_SECONDS)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+
+class RateLimitTimeoutError(TimeoutError):
+    """Токен не получен за отведённое время ожидания"""
+
+
+class TokenBucket:
+    """Асинхронный token bucket: вызовы встают в очередь (FIFO),
+    пока не накопится токен, но не дольше заданного таймаута"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Args:
+            rate (float): Скорость пополнения, токенов в секунду
+            capacity (float, optional): Размер корзины - допустимый всплеск.
+                Defaults to 1.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.timeouts = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, timeout: float | None = None):
+        """Получение одного токена
+
+        Args:
+            timeout (float | None, optional): Максимальное время ожидания в секундах,
+                None - ждать сколько потребуется. Defaults to None.
+
+        Raises:
+            RateLimitTimeoutError: если токен не получен за timeout
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        try:
+            async with asyncio.timeout(timeout):
+                await self._lock.acquire()
+        except TimeoutError:
+            self.timeouts += 1
+            raise RateLimitTimeoutError(f"Token wasn't acquired in {timeout}s")
+
+        try:
+            self._refill()
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    self.timeouts += 1
+                    raise RateLimitTimeoutError(f"Token wasn't acquired in {timeout}s")
+
+                await asyncio.sleep(wait)
+                self._refill()
+
+            self._tokens -= 1
+        finally:
+            self._lock.release()
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        if waited > 0.001:
+            self.waits += 1
+            self.wait_seconds_total += waited
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "wait_seconds_total": self.wait_seconds_total,
+            "timeouts": self.timeouts,
+        }
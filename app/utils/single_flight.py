@@ -0,0 +1,51 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Объединение одинаковых конкурентных вызовов в один:
+    пока вызов с ключом выполняется, остальные вызовы с тем же ключом
+    ждут его результат вместо повторного выполнения"""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        # Помечаем исключение полученным, даже если все ожидающие отменились
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Выполнение func или ожидание уже идущего вызова с тем же ключом
+
+        Отмена одного из ожидающих не отменяет общий вызов для остальных
+
+        Args:
+            key (Hashable): Ключ вызова
+            func (Callable[[], Awaitable[T]]): Фабрика корутины
+
+        Returns:
+            T: Результат вызова
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
@@ -0,0 +1,76 @@
+"""
+Отчёт о запуске процесса: когда закончились импорты, сколько заняли этапы
+lifespan и когда процесс стал готов принимать апдейты. Время считается
+от старта процесса, а не от импорта модуля, поэтому в отчёт попадают
+и импорты до него
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Generator
+
+logger = logging.getLogger(__name__)
+
+
+def process_started_at() -> float:
+    """Время старта процесса по /proc, без него - время импорта модуля
+
+    Returns:
+        float: Unix время старта процесса
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # Имя процесса в скобках может содержать пробелы
+            fields = file.read().rsplit(")", 1)[1].split()
+        with open("/proc/stat") as file:
+            boot_time = next(
+                int(line.split()[1]) for line in file if line.startswith("btime")
+            )
+
+        return boot_time + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, StopIteration, IndexError, ValueError):
+        return time.time()
+
+
+class StartupReport:
+    """Отметки и длительности этапов запуска процесса"""
+
+    def __init__(self):
+        self.started_at = process_started_at()
+        # Отметка -> секунды от старта процесса
+        self.marks: dict[str, float] = {}
+        # Этап lifespan -> длительность в секундах
+        self.phases: dict[str, float] = {}
+
+    def mark(self, name: str):
+        self.marks[name] = time.time() - self.started_at
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Замер этапа запуска: with startup_report.phase("webhook"): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def log_summary(self):
+        phases = ", ".join(f"{k} {v:.2f}s" for k, v in self.phases.items())
+        logger.info(
+            "Startup: imported in %.2fs, ready in %.2fs (%s)",
+            self.marks.get("imported", 0),
+            self.marks.get("ready", 0),
+            phases,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "process_started_at": self.started_at,
+            "marks": self.marks,
+            "phases": self.phases,
+        }
+
+
+startup_report = StartupReport()
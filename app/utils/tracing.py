@@ -0,0 +1,220 @@
+"""
+Лёгкая трассировка: трасса апдейта хранится в contextvar, этапы внутри неё
+записываются как спаны (имя, смещение от начала, длительность). Самые
+медленные трассы попадают в ограниченный кольцевой буфер
+"""
+
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+
+from app.settings import get_settings
+
+T = TypeVar("T")
+
+# Имя, смещение от начала трассы и длительность в секундах, ошибка
+SpanRecord = tuple[str, float, float, bool]
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Трасса одной единицы работы, например апдейта телеграма"""
+
+    __slots__ = ("name", "attrs", "started_at", "started", "duration", "error", "spans")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: float | None = None
+        self.error = False
+        self.spans: list[SpanRecord] = []
+
+    def add_span(self, name: str, started: float, duration: float, error: bool = False):
+        """Запись спана
+
+        Args:
+            name (str): Имя спана
+            started (float): Начало по time.perf_counter
+            duration (float): Длительность в секундах
+            error (bool, optional): Спан завершился исключением. Defaults to False.
+        """
+        self.spans.append((name, started - self.started, duration, error))
+
+    def extend(self, spans: list[SpanRecord], started: float):
+        """Добавление спанов, записанных в другом потоке или процессе
+        относительно их собственного начала
+
+        Args:
+            spans (list[SpanRecord]): Спаны со смещениями от их начала
+            started (float): Начало этих спанов по time.perf_counter
+                текущего процесса
+        """
+        offset = started - self.started
+        self.spans.extend(
+            (name, offset + start, duration, error)
+            for name, start, duration, error in spans
+        )
+
+    def finish(self, error: bool = False):
+        self.duration = time.perf_counter() - self.started
+        self.error = error
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "attrs": self.attrs,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(
+                timespec="milliseconds"
+            ),
+            "duration_ms": (self.duration or 0) * 1000,
+            "error": self.error,
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": start * 1000,
+                    "duration_ms": duration * 1000,
+                    "error": error,
+                }
+                for name, start, duration, error in sorted(
+                    self.spans, key=lambda i: i[1]
+                )
+            ],
+        }
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+class span:
+    """Спан в текущей трассе: with span("handler"): ...
+    Без активной трассы ничего не записывает"""
+
+    __slots__ = ("name", "trace", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "span":
+        self.trace = _current_trace.get()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None:
+            self.trace.add_span(
+                self.name,
+                self.started,
+                time.perf_counter() - self.started,
+                exc_type is not None,
+            )
+
+
+def run_traced(func: Callable[..., T], *args) -> tuple[T, list[SpanRecord]]:
+    """Вызов func в отдельной трассе, чтобы вернуть её спаны из пула
+    потоков или процессов, куда contextvar не передаётся
+
+    Args:
+        func (Callable[..., T]): Функция, для ProcessPoolExecutor - уровня модуля
+        *args: Аргументы func
+
+    Returns:
+        tuple[T, list[SpanRecord]]: Результат и спаны со смещениями от начала вызова
+    """
+    trace = Trace(getattr(func, "__name__", "call"))
+    token = _current_trace.set(trace)
+    try:
+        result = func(*args)
+    finally:
+        _current_trace.reset(token)
+
+    return result, trace.spans
+
+
+class TraceBuffer:
+    """Кольцевой буфер последних медленных трасс"""
+
+    def __init__(self, maxsize: int = 100, slow_threshold_ms: float = 0):
+        """
+        Args:
+            maxsize (int, optional): Сколько трасс хранить. Defaults to 100.
+            slow_threshold_ms (float, optional): Трассы быстрее порога
+                не сохраняются. Defaults to 0.
+        """
+        self.maxsize = maxsize
+        self.slow_threshold = slow_threshold_ms / 1000
+        self._traces: deque[Trace] = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+        self.traces_total = 0
+        self.slow_traces_total = 0
+
+    def trace(self, name: str, **attrs: Any) -> "TraceScope":
+        """Контекстный менеджер новой трассы, которая становится текущей"""
+        return TraceScope(self, Trace(name, **attrs))
+
+    def add(self, trace: Trace):
+        self.traces_total += 1
+        if trace.duration is None or trace.duration < self.slow_threshold:
+            return
+
+        with self._lock:
+            self._traces.append(trace)
+        self.slow_traces_total += 1
+
+    def slowest(self, limit: int = 20) -> list[Trace]:
+        """Самые медленные трассы из буфера
+
+        Args:
+            limit (int, optional): Количество трасс. Defaults to 20.
+
+        Returns:
+            list[Trace]: Трассы по убыванию длительности
+        """
+        with self._lock:
+            traces = list(self._traces)
+
+        return sorted(traces, key=lambda i: i.duration, reverse=True)[:limit]
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "maxsize": self.maxsize,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "buffered": len(self._traces),
+            "traces_total": self.traces_total,
+            "slow_traces_total": self.slow_traces_total,
+        }
+
+
+class TraceScope:
+    __slots__ = ("buffer", "trace", "token")
+
+    def __init__(self, buffer: TraceBuffer, trace: Trace):
+        self.buffer = buffer
+        self.trace = trace
+
+    def __enter__(self) -> Trace:
+        self.token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self.token)
+        self.trace.finish(error=exc_type is not None)
+        self.buffer.add(self.trace)
+
+
+@lru_cache
+def get_trace_buffer() -> TraceBuffer:
+    settings = get_settings()
+
+    return TraceBuffer(
+        maxsize=settings.TRACE_BUFFER_SIZE,
+        slow_threshold_ms=settings.TRACE_SLOW_THRESHOLD_MS,
+    )
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный по размеру LRU кэш с опциональным временем жизни записей"""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        """
+        Args:
+            maxsize (int): Максимальное количество записей
+            ttl (float | None, optional): Время жизни записи в секундах,
+                None - без ограничения. Defaults to None.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: K, default: V | None = None, count: bool = True) -> V | None:
+        """Значение по ключу, запись становится самой свежей
+
+        Args:
+            key (K): Ключ
+            default (V | None, optional): Значение при промахе. Defaults to None.
+            count (bool, optional): Учитывать обращение в hits/misses. Defaults to True.
+
+        Returns:
+            V | None: Закэшированное значение или default
+        """
+        item = self._data.get(key, _MISSING)
+        if item is not _MISSING:
+            value, expires_at = item
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+
+            del self._data[key]
+            self.expirations += 1
+
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: K, value: V, ttl: float | None = _MISSING):
+        """Сохранение значения, при переполнении вытесняется самая старая запись
+
+        Args:
+            key (K): Ключ
+            value (V): Значение
+            ttl (float | None, optional): Время жизни именно этой записи.
+                Defaults to ttl кэша.
+        """
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        requests = self.hits + self.misses
+
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,210 @@
+"""
+Статистика воркеров при запуске в несколько процессов: каждый воркер
+периодически пишет память и число обработанных запросов в свой файл
+в общей папке, любой воркер отдаёт сводку по всем
+"""
+
+import asyncio
+import json
+import logging
+import os
+import resource
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.settings import get_settings
+from app.utils.metrics import http_requests
+
+logger = logging.getLogger(__name__)
+
+# Номер воркера задаёт родительский процесс перед запуском uvicorn
+WORKER_ID_ENV = "TAXI_WORKER_ID"
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def memory_usage() -> dict[str, int]:
+    """Память процесса в байтах. PSS делит общие страницы между процессами,
+    которые их используют, поэтому сумма PSS воркеров показывает,
+    сколько памяти они занимают вместе с моделью, общей после fork
+
+    Returns:
+        dict[str, int]: rss_bytes, а если доступен /proc/self/smaps_rollup,
+            ещё pss_bytes и shared_bytes
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as file:
+            fields = {}
+            for line in file:
+                name, _, value = line.partition(":")
+                if value.endswith("kB\n"):
+                    fields[name] = int(value.split()[0]) * 1024
+
+        return {
+            "rss_bytes": fields["Rss"],
+            "pss_bytes": fields["Pss"],
+            "shared_bytes": fields["Shared_Clean"] + fields["Shared_Dirty"],
+        }
+    except (OSError, KeyError):
+        pass
+
+    try:
+        with open("/proc/self/statm") as file:
+            return {"rss_bytes": int(file.read().split()[1]) * PAGE_SIZE}
+    except OSError:
+        # Максимальный, а не текущий RSS, в Linux в килобайтах
+        return {"rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+class RequestCountMiddleware:
+    """ASGI мидлварь, которая считает HTTP запросы процесса"""
+
+    def __init__(self, app):
+        self.app = app
+        self.requests = http_requests.labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.requests.inc()
+
+        await self.app(scope, receive, send)
+
+
+class WorkerStatsReporter:
+    """Периодическая запись статистики воркера в файл <pid>.json"""
+
+    def __init__(self, stats_dir: Path, interval: float = 5, worker_id: int = 0):
+        """
+        Args:
+            stats_dir (Path): Папка, общая для всех воркеров
+            interval (float, optional): Период записи в секундах. Defaults to 5.
+            worker_id (int, optional): Номер воркера. Defaults to 0.
+        """
+        self.stats_dir = stats_dir
+        self.interval = interval
+        self.worker_id = worker_id
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.extra: dict[str, Any] = {}
+
+        self._task: asyncio.Task | None = None
+        self._last: tuple[float, float] = (time.monotonic(), 0.0)
+
+    @property
+    def path(self) -> Path:
+        return self.stats_dir / f"{self.pid}.json"
+
+    def snapshot(self) -> dict[str, Any]:
+        """Текущая статистика воркера, запросы в секунду - за время
+        с прошлого снимка"""
+        now = time.monotonic()
+        requests_total = http_requests.total()
+        last_time, last_requests = self._last
+        self._last = (now, requests_total)
+
+        elapsed = now - last_time
+        return {
+            "pid": self.pid,
+            "worker_id": self.worker_id,
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "requests_total": int(requests_total),
+            "requests_per_second": (
+                (requests_total - last_requests) / elapsed if elapsed > 0 else 0.0
+            ),
+            **memory_usage(),
+            **self.extra,
+        }
+
+    def write(self):
+        self.stats_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        # Замена файла атомарна, читатели не видят недописанный JSON
+        os.replace(tmp_path, self.path)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError:
+                logger.exception("Can't write worker stats")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        # После fork pid другой, а счётчик запросов начинается с нуля
+        self.pid = os.getpid()
+        self._last = (time.monotonic(), http_requests.total())
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="worker_stats")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        self.path.unlink(missing_ok=True)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def read_worker_stats(stats_dir: Path, max_age: float) -> dict[str, Any]:
+    """Сводка по воркерам из их файлов статистики, файлы завершившихся
+    процессов и не обновлявшиеся дольше max_age пропускаются
+
+    Args:
+        stats_dir (Path): Папка со статистикой воркеров
+        max_age (float): Максимальный возраст статистики в секундах
+
+    Returns:
+        dict[str, Any]: Статистика воркеров и суммы по ним
+    """
+    workers = []
+    now = time.time()
+    for path in stats_dir.glob("*.json"):
+        try:
+            stats = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+
+        if now - stats["updated_at"] > max_age or not _is_alive(stats["pid"]):
+            continue
+
+        workers.append(stats)
+
+    workers.sort(key=lambda i: i["worker_id"])
+
+    return {
+        "workers": workers,
+        "total": {
+            "workers": len(workers),
+            "requests_per_second": sum(i["requests_per_second"] for i in workers),
+            "rss_bytes": sum(i["rss_bytes"] for i in workers),
+            "pss_bytes": sum(i.get("pss_bytes", i["rss_bytes"]) for i in workers),
+        },
+    }
+
+
+@lru_cache
+def get_worker_stats_reporter() -> WorkerStatsReporter:
+    settings = get_settings()
+
+    return WorkerStatsReporter(
+        stats_dir=settings.WORKER_STATS_DIR,
+        interval=settings.WORKER_STATS_INTERVAL_SECONDS,
+        worker_id=int(os.environ.get(WORKER_ID_ENV, 0)),
+    )
@@ -0,0 +1,175 @@
+"""
+Колоночная валидация поездок теми же правилами, что и TaxiTravel:
+каждое правило - маска над массивом, а ошибки строки хранятся битами,
+поэтому сообщения собираются только для уникальных комбинаций ошибок
+"""
+
+from typing import TYPE_CHECKING, Mapping, TypeAlias
+
+import numpy as np
+
+from app.model import (
+    LATITUDE_ERROR,
+    LONGITUDE_ERROR,
+    PASSENGER_COUNT_ERROR,
+    SAME_COORDS_ERROR,
+    TaxiTravel,
+)
+
+# pandas импортируется при первой валидации, как и в app.model
+if TYPE_CHECKING:
+    import pandas as pd
+
+TRIP_COLUMNS = list(TaxiTravel.model_fields)
+
+DATETIME_ERROR = "Дата поездки должна быть в формате ГГГГ-ММ-ДД чч:мм:сс"
+
+# Биты ошибок в порядке полей TaxiTravel, в том же порядке pydantic
+# возвращает ошибки валидации полей
+PICKUP_LATITUDE = 1 << 0
+PICKUP_LONGITUDE = 1 << 1
+DROPOFF_LATITUDE = 1 << 2
+DROPOFF_LONGITUDE = 1 << 3
+PASSENGER_COUNT = 1 << 4
+SAME_COORDS = 1 << 5
+DATETIME = 1 << 6
+
+ERROR_MESSAGES = {
+    PICKUP_LATITUDE: LATITUDE_ERROR,
+    PICKUP_LONGITUDE: LONGITUDE_ERROR,
+    DROPOFF_LATITUDE: LATITUDE_ERROR,
+    DROPOFF_LONGITUDE: LONGITUDE_ERROR,
+    PASSENGER_COUNT: PASSENGER_COUNT_ERROR,
+    SAME_COORDS: SAME_COORDS_ERROR,
+    DATETIME: DATETIME_ERROR,
+}
+
+Trips: TypeAlias = "pd.DataFrame | Mapping[str, np.ndarray]"
+
+
+def error_message(code: int) -> str | None:
+    """Сообщение об ошибках строки по её битам, как у TaxiTravel
+
+    Args:
+        code (int): Биты ошибок строки
+
+    Returns:
+        str | None: Сообщения через "; " или None для корректной строки
+    """
+    if not code:
+        return None
+
+    # Нераспознанная дата заменяет остальные ошибки строки
+    if code & DATETIME:
+        return DATETIME_ERROR
+
+    return "; ".join(message for bit, message in ERROR_MESSAGES.items() if code & bit)
+
+
+def _in_range(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    # NaN не проходит сравнение, как и в валидаторах TaxiTravel
+    return (values >= low) & (values <= high)
+
+
+def validate_trips_codes(trips: Trips) -> np.ndarray:
+    """Биты ошибок для каждой поездки
+
+    Args:
+        trips (Trips): DataFrame или словарь массивов с колонками TaxiTravel,
+            числовые колонки уже приведены к float, дата к datetime64
+
+    Returns:
+        np.ndarray: uint8 массив, 0 - поездка корректна
+    """
+    columns = {col: np.asarray(trips[col]) for col in TRIP_COLUMNS}
+    pickup_lat = columns["pickup_latitude"].astype(float, copy=False)
+    pickup_lon = columns["pickup_longitude"].astype(float, copy=False)
+    dropoff_lat = columns["dropoff_latitude"].astype(float, copy=False)
+    dropoff_lon = columns["dropoff_longitude"].astype(float, copy=False)
+    passengers = columns["passenger_count"].astype(float, copy=False)
+
+    codes = np.zeros(len(pickup_lat), dtype=np.uint8)
+    codes[~_in_range(pickup_lat, -90, 90)] |= PICKUP_LATITUDE
+    codes[~_in_range(pickup_lon, -180, 180)] |= PICKUP_LONGITUDE
+    codes[~_in_range(dropoff_lat, -90, 90)] |= DROPOFF_LATITUDE
+    codes[~_in_range(dropoff_lon, -180, 180)] |= DROPOFF_LONGITUDE
+    codes[~_in_range(passengers, 1, 8)] |= PASSENGER_COUNT
+
+    # Проверка одной точки - валидатор модели, он выполняется только
+    # если поля прошли валидацию
+    with np.errstate(invalid="ignore"):
+        same_coords = (np.abs(pickup_lat - dropoff_lat) <= 1e-5) & (
+            np.abs(pickup_lon - dropoff_lon) <= 1e-5
+        )
+    codes[same_coords & (codes == 0)] |= SAME_COORDS
+
+    import pandas as pd
+
+    codes[pd.isna(columns["pickup_datetime"])] |= DATETIME
+    return codes
+
+
+class TripsValidation:
+    """Результат колоночной валидации: маска корректных строк и биты ошибок"""
+
+    def __init__(self, trips: Trips, codes: np.ndarray, index: "pd.Index"):
+        self.trips = trips
+        self.codes = codes
+        self.index = index
+        self.valid = codes == 0
+
+    @property
+    def clean(self) -> "pd.DataFrame":
+        """Корректные поездки"""
+        import pandas as pd
+
+        trips = self.trips
+        if not isinstance(trips, pd.DataFrame):
+            trips = pd.DataFrame(trips, index=self.index)
+
+        return trips[self.valid]
+
+    def _messages(self, codes: np.ndarray) -> np.ndarray:
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        messages = np.array([error_message(i) for i in unique_codes], dtype=object)
+        return messages[inverse]
+
+    def errors(self) -> "pd.Series":
+        """Сообщения об ошибках только для некорректных строк
+
+        Returns:
+            pd.Series: Сообщения с индексом исходных строк
+        """
+        import pandas as pd
+
+        invalid = ~self.valid
+        return pd.Series(
+            self._messages(self.codes[invalid]),
+            index=self.index[invalid],
+            dtype="string",
+        )
+
+    def errors_full(self) -> "pd.Series":
+        """Сообщения об ошибках для всех строк, NA для корректных"""
+        import pandas as pd
+
+        return pd.Series(self._messages(self.codes), index=self.index, dtype="string")
+
+
+def validate_trips(trips: Trips) -> TripsValidation:
+    """Колоночная валидация поездок правилами TaxiTravel
+
+    Args:
+        trips (Trips): DataFrame или словарь массивов с колонками TaxiTravel
+
+    Returns:
+        TripsValidation: Маска корректных строк и отчёт об ошибках
+    """
+    import pandas as pd
+
+    if isinstance(trips, pd.DataFrame):
+        index = trips.index
+    else:
+        index = pd.RangeIndex(len(np.asarray(trips[TRIP_COLUMNS[0]])))
+
+    return TripsValidation(trips, validate_trips_codes(trips), index)
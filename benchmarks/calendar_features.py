@@ -0,0 +1,57 @@
+"""Бенчмарк календарных признаков в FeatureEngineering._prepare_datetime
+
+Сравнивает прежний путь (holidays.USA() на каждый вызов и поэлементный map)
+с выборкой из предрасчитанной календарной таблицы
+
+Запуск: PYTHONPATH=app python -m benchmarks.calendar_features
+"""
+
+import warnings
+
+import holidays
+import pandas as pd
+
+from app.model import FeatureEngineering, get_calendar_table
+from benchmarks.suite import bench_frame, make_trips
+
+SIZES = (1, 10_000, 1_000_000)
+
+
+def legacy_prepare_datetime(X: pd.DataFrame) -> pd.DataFrame:
+    date = X["pickup_datetime"].dt.date.astype("datetime64[ns]")
+
+    X["year"] = date.dt.year
+    X["month"] = date.dt.month
+    X["day"] = date.dt.day
+    X["hour"] = date.dt.hour
+
+    us_calendar = holidays.USA()
+
+    is_holiday = date.map(us_calendar.get)
+    is_holiday = is_holiday.mask(is_holiday.notna(), True)
+    is_holiday = is_holiday.fillna(False)
+
+    X["is_holiday"] = is_holiday
+    X["is_weekend"] = date.dt.day_of_week > 4
+
+    return X.drop("pickup_datetime", axis=1)
+
+
+def main():
+    warnings.simplefilter("ignore", FutureWarning)
+    get_calendar_table()
+
+    engines = {
+        "legacy": legacy_prepare_datetime,
+        "calendar_table": FeatureEngineering()._prepare_datetime,
+    }
+
+    print(f"{'rows':>10} " + " ".join(f"{name:>16}" for name in engines))
+    for n in SIZES:
+        X = make_trips(n)[["pickup_datetime"]]
+        timings = [bench_frame(func, X) for func in engines.values()]
+        print(f"{n:>10} " + " ".join(f"{t * 1e3:>13.3f} ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Бенчмарк расчёта расстояния в FeatureEngineering._add_distance
+
+Сравнивает прежний путь (Transformer на каждый вызов и два прохода по pd.Series)
+с кэшированной проекцией по непрерывному массиву и NumPy-функциями расстояния
+
+Запуск: PYTHONPATH=app python -m benchmarks.distance
+"""
+
+import warnings
+
+import pandas as pd
+from pyproj import Transformer
+
+from app.model import FeatureEngineering, euclidian_distance
+from benchmarks.suite import bench_frame, make_trips
+
+COORDINATE_COLUMNS = [
+    "pickup_latitude",
+    "pickup_longitude",
+    "dropoff_latitude",
+    "dropoff_longitude",
+]
+
+SIZES = (1, 10_000, 1_000_000)
+
+
+def legacy_add_distance(X: pd.DataFrame) -> pd.DataFrame:
+    transformer = Transformer.from_crs("EPSG:4326", "EPSG:3857")
+
+    x1, x2 = transformer.transform(X["pickup_latitude"], X["pickup_longitude"])
+    y1, y2 = transformer.transform(X["dropoff_latitude"], X["dropoff_longitude"])
+
+    X.loc[:, "distance_km"] = euclidian_distance(x1, x2, y1, y2) / 1000
+    return X
+
+
+def main():
+    # pyproj предупреждает о float() от одноэлементной pd.Series в прежнем пути
+    warnings.simplefilter("ignore", FutureWarning)
+
+    engines = {
+        "legacy": legacy_add_distance,
+        "euclidian": FeatureEngineering(distance_func="euclidian")._add_distance,
+        "haversine": FeatureEngineering(distance_func="haversine")._add_distance,
+        "equirectangular": FeatureEngineering(
+            distance_func="equirectangular"
+        )._add_distance,
+    }
+
+    print(f"{'rows':>10} " + " ".join(f"{name:>16}" for name in engines))
+    for n in SIZES:
+        X = make_trips(n)[COORDINATE_COLUMNS]
+        timings = [bench_frame(func, X) for func in engines.values()]
+        print(f"{n:>10} " + " ".join(f"{t * 1e3:>13.3f} ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
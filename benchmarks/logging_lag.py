@@ -0,0 +1,158 @@
+"""Задержка event loop при логировании с записью в файлы и через очередь
+
+В event loop работают корутины, которые пишут логи с заданной частотой,
+и монитор, который спит по 1 мс и меряет, насколько позже он просыпается.
+Обработчики - консоль и RotatingFileHandler с маленьким maxBytes, чтобы
+в замер попадала и ротация файлов. Вывод консоли уходит в /dev/null
+
+Запуск: PYTHONPATH=app python -m benchmarks.logging_lag --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.utils.logging_settings import configure_logging, stop_logging
+from benchmarks.suite import git_commit
+
+MONITOR_INTERVAL = 0.001
+
+
+def logging_config(logs_dir: Path, console) -> dict[str, Any]:
+    file_handler = {
+        "class": "logging.handlers.RotatingFileHandler",
+        "formatter": "simple",
+        "maxBytes": 1024 * 1024,
+        "backupCount": 3,
+        "encoding": "utf8",
+    }
+
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "simple": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"}
+        },
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "formatter": "simple",
+                "stream": console,
+            },
+            "info_file_handler": {
+                **file_handler,
+                "level": "INFO",
+                "filename": str(logs_dir / "info.log"),
+            },
+            "error_file_handler": {
+                **file_handler,
+                "level": "ERROR",
+                "filename": str(logs_dir / "errors.log"),
+            },
+        },
+        "root": {
+            "level": "INFO",
+            "handlers": ["console", "info_file_handler", "error_file_handler"],
+        },
+    }
+
+
+async def run_load(
+    duration: float, records_per_second: float, writers: int
+) -> dict[str, Any]:
+    """Логирование из writers корутин и замер задержки event loop
+
+    Returns:
+        dict[str, Any]: Количество записей и квантили задержки пробуждения
+    """
+    logger = logging.getLogger("benchmark")
+    deadline = time.monotonic() + duration
+    interval = writers / records_per_second
+    records = 0
+    lags: list[float] = []
+
+    async def writer(i: int):
+        nonlocal records
+        while time.monotonic() < deadline:
+            logger.info("Trip %s predicted: %.2f $ in %.1f ms", i, 12.5, 3.2)
+            records += 1
+            if records % 100 == 0:
+                logger.error("Geocoder failed for trip %s", i)
+            await asyncio.sleep(interval)
+
+    async def monitor():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            await asyncio.sleep(MONITOR_INTERVAL)
+            lags.append(time.perf_counter() - started - MONITOR_INTERVAL)
+
+    started = time.perf_counter()
+    await asyncio.gather(monitor(), *(writer(i) for i in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    lags_ms = np.array(lags) * 1000
+    return {
+        "records": records,
+        "records_per_second": records / elapsed,
+        "lag_p50_ms": float(np.percentile(lags_ms, 50)),
+        "lag_p99_ms": float(np.percentile(lags_ms, 99)),
+        "lag_max_ms": float(lags_ms.max()),
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--rate", type=float, default=20_000, help="Записей в секунду")
+    parser.add_argument("--writers", type=int, default=100)
+    parser.add_argument("--output", type=Path, default=None, help="JSON результатов")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, open("/dev/null", "w") as console:
+        for mode in ("direct", "queue"):
+            logs_dir = Path(tmp) / mode
+            logs_dir.mkdir()
+            configure_logging(logging_config(logs_dir, console), mode == "queue")
+
+            result = asyncio.run(run_load(args.duration, args.rate, args.writers))
+            # Время записи хвоста очереди не входит в замер event loop
+            started = time.perf_counter()
+            stop_logging()
+            result["flush_ms"] = (time.perf_counter() - started) * 1000
+
+            results.append({"mode": mode, **result})
+            print(
+                f"{mode:>7} {result['records_per_second']:>10.0f} records/s "
+                f"lag p50 {result['lag_p50_ms']:>7.3f} ms "
+                f"p99 {result['lag_p99_ms']:>7.3f} ms "
+                f"max {result['lag_max_ms']:>7.3f} ms "
+                f"flush {result['flush_ms']:>7.1f} ms",
+                file=sys.stderr,
+            )
+
+    report = {
+        "suite": "logging_lag",
+        "git_commit": git_commit(),
+        "duration": args.duration,
+        "target_records_per_second": args.rate,
+        "writers": args.writers,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Бенчмарк форматов модели: joblib пайплайн против нативного CatBoost с манифестом
+
+Время загрузки и прирост RSS замеряются в отдельном процессе на каждый формат,
+задержка предсказания - для одной строки и для батча
+
+Запуск: PYTHONPATH=app python -m benchmarks.model_formats
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from app.inference import CompiledPipeline
+from app.model import FEATURES_ORDER, feature_transformer, load_model_file
+from app.model_registry import MANIFEST_SUFFIX, latest_model_path, model_version_name
+from app.native_model import export_native_model
+from app.settings import get_settings
+from benchmarks.suite import make_trips
+
+N_RUNS = 2_000
+BATCH_SIZE = 10_000
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+
+
+def child(path: Path):
+    """Замер загрузки в чистом процессе, библиотеки импортированы заранее"""
+    import catboost  # noqa: F401
+    import category_encoders  # noqa: F401
+    import sklearn.pipeline  # noqa: F401
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    load_model_file(path)
+    load_seconds = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {"load_seconds": load_seconds, "rss_mb": (rss_bytes() - rss_before) / 2**20}
+        )
+    )
+
+
+def measure_load(path: Path) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.model_formats", "--child", str(path)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def make_features(n: int) -> np.ndarray:
+    trips = make_trips(n)
+    return feature_transformer.transform(trips)[FEATURES_ORDER].to_numpy(np.float64)
+
+
+def measure_latency(model, X: np.ndarray) -> tuple[float, float]:
+    compiled = CompiledPipeline(model, FEATURES_ORDER)
+    row = X[:1]
+
+    for _ in range(N_RUNS // 10):
+        compiled.predict(row)
+
+    timings = np.empty(N_RUNS)
+    for i in range(N_RUNS):
+        start = time.perf_counter()
+        compiled.predict(row)
+        timings[i] = time.perf_counter() - start
+
+    batch_timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        compiled.predict(X)
+        batch_timings.append(time.perf_counter() - start)
+
+    return np.percentile(timings, 50), min(batch_timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", type=Path, default=None)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    if args.child is not None:
+        child(args.child)
+        return
+
+    joblib_path = latest_model_path(get_settings().MODELS_DIR)
+    if joblib_path.name.endswith(MANIFEST_SUFFIX):
+        joblib_path = joblib_path.with_name(f"{model_version_name(joblib_path)}.joblib")
+
+    X = make_features(BATCH_SIZE)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest_path = (
+            Path(tmp_dir) / f"{model_version_name(joblib_path)}{MANIFEST_SUFFIX}"
+        )
+        export_native_model(joblib.load(joblib_path), manifest_path)
+
+        print(
+            f"{'format':>8} {'load, s':>9} {'RSS, MB':>9} "
+            f"{'p50 row, ms':>12} {f'batch {BATCH_SIZE}, ms':>16}"
+        )
+        for name, path in (("joblib", joblib_path), ("native", manifest_path)):
+            load = measure_load(path)
+            row, batch = measure_latency(load_model_file(path), X)
+            print(
+                f"{name:>8} {load['load_seconds']:>9.3f} {load['rss_mb']:>9.1f} "
+                f"{row * 1000:>12.3f} {batch * 1000:>16.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
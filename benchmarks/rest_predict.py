@@ -0,0 +1,99 @@
+"""Бенчмарк пропускной способности REST эндпоинтов предсказания
+
+Запросы идут в приложение FastAPI в том же процессе через ASGI транспорт httpx,
+поэтому в замер попадают разбор JSON, валидация, модель и сериализация ответа
+без сетевого стека. Для сравнения замеряется последовательная отправка
+тех же поездок в POST /predict
+
+Запуск: PYTHONPATH=app python -m benchmarks.rest_predict
+"""
+
+import asyncio
+import time
+import warnings
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.prediction_router import router
+
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000)
+SINGLE_REQUESTS = 200
+MIN_REQUESTS = 5
+DURATION_SECONDS = 2.0
+
+
+def make_trips(n: int, seed: int = 42) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 7 * 365 * 24 * 3600, n)
+    dates = np.datetime64("2009-01-01T00:00:00") + seconds.astype("timedelta64[s]")
+
+    return [
+        {
+            "pickup_datetime": str(dates[i]),
+            "pickup_latitude": float(rng.uniform(40.6, 40.85)),
+            "pickup_longitude": float(rng.uniform(-74.05, -73.75)),
+            "dropoff_latitude": float(rng.uniform(40.6, 40.85)),
+            "dropoff_longitude": float(rng.uniform(-74.05, -73.75)),
+            "passenger_count": int(rng.integers(1, 7)),
+        }
+        for i in range(n)
+    ]
+
+
+async def bench_batch(
+    client: httpx.AsyncClient, batch_size: int
+) -> tuple[float, float]:
+    trips = make_trips(batch_size)
+    await client.post("/predict/batch", json=trips)
+
+    timings = []
+    deadline = time.perf_counter() + DURATION_SECONDS
+    while len(timings) < MIN_REQUESTS or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/predict/batch", json=trips)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+    latency = np.median(timings)
+    return latency, batch_size / latency
+
+
+async def bench_single(client: httpx.AsyncClient) -> tuple[float, float]:
+    trips = make_trips(SINGLE_REQUESTS)
+
+    start = time.perf_counter()
+    for trip in trips:
+        response = await client.post("/predict", json=trip)
+        response.raise_for_status()
+
+    elapsed = time.perf_counter() - start
+    return elapsed / len(trips), len(trips) / elapsed
+
+
+async def main():
+    warnings.simplefilter("ignore", FutureWarning)
+
+    app = FastAPI()
+    app.include_router(router)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        print(f"{'endpoint':>16} {'batch':>7} {'p50 ms':>10} {'rows/s':>12}")
+
+        latency, throughput = await bench_single(client)
+        print(f"{'/predict':>16} {1:>7} {latency * 1000:>10.2f} {throughput:>12,.0f}")
+
+        for batch_size in BATCH_SIZES:
+            latency, throughput = await bench_batch(client, batch_size)
+            print(
+                f"{'/predict/batch':>16} {batch_size:>7} "
+                f"{latency * 1000:>10.2f} {throughput:>12,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,230 @@
+"""Пропускная способность и память сервиса при разном числе воркеров
+
+Для каждого значения --workers запускается `python app/main.py` с синтетической
+моделью, POST /predict нагружается с заданной конкурентностью, после чего
+из /workers берутся запросы в секунду и память каждого воркера. Вебхук
+в Telegram не регистрируется: лок лидера держит сам бенчмарк
+
+Запуск: PYTHONPATH=app python -m benchmarks.serving --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+
+from app.settings import get_settings
+from app.utils.leader_lock import LeaderLock
+from benchmarks.suite import git_commit, train_synthetic_model
+
+PROJECT_DIR = get_settings().PROJECT_DIR
+
+TRIP = {
+    "pickup_datetime": "2014-07-04 18:30:00",
+    "pickup_latitude": 40.64,
+    "pickup_longitude": -73.78,
+    "dropoff_latitude": 40.75,
+    "dropoff_longitude": -73.98,
+    "passenger_count": 2,
+}
+
+# Обязательные настройки, которые не нужны без Telegram
+PLACEHOLDER_ENV = {
+    "SECRET_KEY": "benchmark",
+    "TG_BOT_TOKEN": "123456:benchmark",
+    "TG_WEBHOOK_URL": "https://example.com",
+    "GEOCODE_API_KEY": "benchmark",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env(workers: int, port: int, tmp_dir: Path) -> dict[str, str]:
+    data_dir = tmp_dir / "data"
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    env.update(
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WORKERS=str(workers),
+        MODELS_DIR=str(tmp_dir / "models"),
+        SHADOW_MODELS_DIR=str(tmp_dir / "models" / "shadow"),
+        DATA_DIR=str(data_dir),
+        WORKER_STATS_DIR=str(data_dir / "workers"),
+        WORKER_STATS_INTERVAL_SECONDS="1",
+        WEBHOOK_LOCK_PATH=str(tmp_dir / "webhook.lock"),
+        FSM_DB_URL=f"sqlite:///{data_dir / 'fsm.sqlite3'}",
+        GEOCODE_CACHE_DB_URL=f"sqlite:///{data_dir / 'geocode_cache.sqlite3'}",
+        SHADOW_DB_URL=f"sqlite:///{data_dir / 'shadow.sqlite3'}",
+        PYTHONPATH=os.pathsep.join(
+            filter(
+                None,
+                [str(PROJECT_DIR / "app"), str(PROJECT_DIR), env.get("PYTHONPATH")],
+            )
+        ),
+    )
+    return env
+
+
+async def wait_ready(
+    session: aiohttp.ClientSession,
+    url: str,
+    workers: int,
+    admin_headers: dict[str, str],
+    timeout: float = 120,
+):
+    """Ожидание, пока все воркеры не запишут статистику"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/workers", headers=admin_headers) as response:
+                if (await response.json())["total"]["workers"] == workers:
+                    return
+        except aiohttp.ClientError:
+            pass
+
+        await asyncio.sleep(0.5)
+
+    raise TimeoutError(f"{workers} workers didn't start in {timeout}s")
+
+
+async def load(
+    session: aiohttp.ClientSession, url: str, duration: float, concurrency: int
+) -> dict[str, Any]:
+    """Нагрузка POST /predict с concurrency одновременными запросами"""
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.post(f"{url}/predict", json=TRIP) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except aiohttp.ClientError:
+                ok = False
+
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+    }
+
+
+async def bench_workers(
+    workers: int, tmp_dir: Path, duration: float, concurrency: int
+) -> dict[str, Any]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = server_env(workers, port, tmp_dir)
+    # Статистика воркеров доступна только с админским токеном
+    admin_headers = {"X-Admin-Token": env["SECRET_KEY"]}
+    process = subprocess.Popen(
+        [sys.executable, str(PROJECT_DIR / "app" / "main.py")],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_ready(session, url, workers, admin_headers)
+            # Прогрев, чтобы первые запросы не попали в замер
+            await load(session, url, 1, concurrency)
+
+            result = await load(session, url, duration, concurrency)
+            # Статистика воркеров обновляется раз в секунду
+            await asyncio.sleep(1.5)
+            async with session.get(f"{url}/workers", headers=admin_headers) as response:
+                worker_stats = await response.json()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    result = {"workers": workers, "concurrency": concurrency, **result}
+    result["worker_stats"] = worker_stats
+    print(
+        f"{workers:>7} {result['requests_per_second']:>10.1f} req/s "
+        f"p50 {result['p50_ms'] or 0:>8.2f} ms p99 {result['p99_ms'] or 0:>8.2f} ms "
+        f"RSS {worker_stats['total']['rss_bytes'] / 2**20:>8.1f} MiB "
+        f"PSS {worker_stats['total']['pss_bytes'] / 2**20:>8.1f} MiB",
+        file=sys.stderr,
+    )
+    for stats in worker_stats["workers"]:
+        print(
+            f"{'':>7} worker {stats['worker_id']} pid {stats['pid']} "
+            f"RSS {stats['rss_bytes'] / 2**20:.1f} MiB "
+            f"PSS {stats.get('pss_bytes', stats['rss_bytes']) / 2**20:.1f} MiB",
+            file=sys.stderr,
+        )
+
+    return result
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", type=Path, default=None, help="JSON результатов")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        (tmp_dir / "models").mkdir()
+        train_synthetic_model(tmp_dir / "models")
+
+        webhook_lock = LeaderLock(tmp_dir / "webhook.lock")
+        webhook_lock.acquire()
+        for workers in args.workers:
+            results.append(
+                asyncio.run(
+                    bench_workers(workers, tmp_dir, args.duration, args.concurrency)
+                )
+            )
+        webhook_lock.release()
+
+    report = {
+        "suite": "serving",
+        "git_commit": git_commit(),
+        "cpu_count": os.cpu_count(),
+        "prediction_executor": get_settings().PREDICTION_EXECUTOR,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
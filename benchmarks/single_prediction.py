@@ -0,0 +1,64 @@
+"""Бенчмарк задержки предсказания одной поездки
+
+Сравнивает путь бота через DataFrame (model_dump_df -> predict)
+с быстрым путём predict_one по массиву признаков
+
+Запуск: PYTHONPATH=app python -m benchmarks.single_prediction
+"""
+
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+from app.inference import predict_one
+from app.model import TaxiTravel, predict
+
+N_RUNS = 2_000
+
+
+def make_trip() -> TaxiTravel:
+    return TaxiTravel(
+        pickup_datetime=datetime(2014, 7, 4, 18, 30),
+        pickup_latitude=40.641766,
+        pickup_longitude=-73.780968,
+        dropoff_latitude=40.754932,
+        dropoff_longitude=-73.984016,
+        passenger_count=2,
+    )
+
+
+def measure(func, n_runs: int = N_RUNS) -> np.ndarray:
+    for _ in range(n_runs // 10):
+        func()
+
+    timings = np.empty(n_runs)
+    for i in range(n_runs):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+
+    return timings
+
+
+def main():
+    warnings.simplefilter("ignore", FutureWarning)
+    trip = make_trip()
+    trip_tuple = tuple(trip.model_dump().values())
+
+    paths = {
+        "dataframe": lambda: predict(trip.model_dump_df())[0],
+        "predict_one": lambda: predict_one(trip),
+        "predict_one_tuple": lambda: predict_one(trip_tuple),
+    }
+
+    print(f"{'path':>18} {'p50':>12} {'p99':>12}")
+    for name, func in paths.items():
+        timings = measure(func) * 1e3
+        p50, p99 = np.percentile(timings, [50, 99])
+        print(f"{name:>18} {p50:>9.3f} ms {p99:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
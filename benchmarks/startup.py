@@ -0,0 +1,144 @@
+"""Время импорта app.main в новом процессе и проверка ленивых импортов
+
+Каждый прогон - отдельный `python -X importtime -c "import app.main"`.
+Скрипт выводит медиану времени импорта, самые долгие пакеты по собственному
+времени импорта и завершается с кодом 1, если импорт дольше --max-seconds
+или если при импорте загрузились тяжёлые зависимости модели
+
+Запуск: PYTHONPATH=app python -m benchmarks.startup --max-seconds 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from app.settings import get_settings
+from benchmarks.serving import PLACEHOLDER_ENV
+from benchmarks.suite import git_commit
+
+PROJECT_DIR = get_settings().PROJECT_DIR
+
+# Нужны только для загрузки и разбора модели, которые идут в lifespan,
+# и для пакетных предсказаний
+LAZY_MODULES = (
+    "pandas",
+    "sklearn",
+    "category_encoders",
+    "catboost",
+    "scipy",
+    "joblib",
+    "pyproj",
+    "holidays",
+)
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+lazy = [i for i in {LAZY_MODULES!r} if i in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded_lazy_modules": lazy}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Counter[str]:
+    """Собственное время импорта в секундах по пакетам верхнего уровня"""
+    packages: Counter[str] = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, _, name = line[len("import time:") :].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e6
+
+    return packages
+
+
+def run_import() -> dict[str, Any]:
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(
+            None, [str(PROJECT_DIR / "app"), str(PROJECT_DIR), env.get("PYTHONPATH")]
+        )
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        check=True,
+        cwd=PROJECT_DIR,
+        env=env,
+        text=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["packages"] = parse_importtime(process.stderr)
+    return result
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--max-seconds", type=float, default=None, help="Граница времени импорта"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="JSON результатов")
+    args = parser.parse_args(argv)
+
+    runs = [run_import() for _ in range(args.repeat)]
+    seconds = [i["seconds"] for i in runs]
+    median = statistics.median(seconds)
+
+    packages: Counter[str] = Counter()
+    for run in runs:
+        packages.update(run["packages"])
+
+    top_packages = {
+        name: total / len(runs) for name, total in packages.most_common(args.top)
+    }
+    loaded_lazy_modules = sorted(
+        {i for run in runs for i in run["loaded_lazy_modules"]}
+    )
+
+    print(
+        f"import app.main: median {median:.3f}s, "
+        f"min {min(seconds):.3f}s, max {max(seconds):.3f}s",
+        file=sys.stderr,
+    )
+    for name, value in top_packages.items():
+        print(f"{name:>30} {value:>8.3f}s", file=sys.stderr)
+
+    report = {
+        "suite": "startup",
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "import_seconds": seconds,
+        "median_seconds": median,
+        "top_packages_seconds": top_packages,
+        "loaded_lazy_modules": loaded_lazy_modules,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    failures = []
+    if loaded_lazy_modules:
+        failures.append(f"import app.main loaded {', '.join(loaded_lazy_modules)}")
+    if args.max_seconds is not None and median > args.max_seconds:
+        failures.append(f"import app.main took {median:.3f}s > {args.max_seconds}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
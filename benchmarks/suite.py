@@ -0,0 +1,345 @@
+"""Набор микробенчмарков горячего пути предсказания
+
+Работает без сети и без продовой модели: на синтетических поездках обучается
+маленький пайплайн той же структуры, что и продовый, и подставляется в реестр
+моделей. Геокодер заменяется заглушкой. Результаты пишутся в JSON,
+чтобы сравнивать прогоны между собой
+
+Запуск: PYTHONPATH=app python -m benchmarks.suite --output results.json
+Сравнение: PYTHONPATH=app python -m benchmarks.suite --compare results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+import warnings
+from datetime import datetime
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any, Callable
+
+import joblib
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRegressor
+from category_encoders import TargetEncoder
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+from app.bot import single_predicion_router
+from app.inference import predict_one
+from app.model import (
+    FEATURES_ORDER,
+    TaxiTravel,
+    feature_transformer,
+    model_registry,
+    predict,
+)
+from app.utils.gazetteer import get_gazetteer
+from app.utils.geocode_client import GeocodeResult
+from app.validation import TRIP_COLUMNS, validate_trips
+
+FEATURE_SIZES = (1, 1_000, 100_000, 1_000_000)
+PREDICT_SIZES = (1, 1_000, 100_000)
+VALIDATION_SIZES = (1_000, 100_000)
+# Запросы к справочнику адресов по веткам поиска, miss - адрес для геокодера
+GAZETTEER_QUERIES = {
+    "place": "JFK Airport",
+    "address": "350 5th Ave, New York, NY 10118",
+    "intersection": "8th Ave & W 42nd St",
+    "prefix": "Metropolitan Museum",
+    "fuzzy": "empire state buildng",
+    "miss": "127 Hudson St, New York, NY 10013, United States",
+}
+TRAIN_SIZE = 5_000
+
+PACKAGES = ("numpy", "pandas", "scikit-learn", "catboost", "pydantic", "pyproj")
+
+
+def make_trips(n: int, seed: int = 42) -> pd.DataFrame:
+    """Синтетические поездки по Нью-Йорку за 2009-2015 годы,
+    общие для всех бенчмарков
+
+    Args:
+        n (int): Количество поездок
+        seed (int, optional): Сид генератора. Defaults to 42.
+
+    Returns:
+        pd.DataFrame: Поездки с колонками TaxiTravel
+    """
+    seconds = np.random.default_rng(seed).integers(0, 7 * 365 * 24 * 3600, n)
+    rng = np.random.default_rng(seed)
+    trips = pd.DataFrame(
+        {
+            "pickup_datetime": pd.Timestamp("2009-01-01")
+            + pd.to_timedelta(seconds, "s"),
+            "pickup_latitude": rng.uniform(40.6, 40.85, n),
+            "pickup_longitude": rng.uniform(-74.05, -73.75, n),
+            "dropoff_latitude": rng.uniform(40.6, 40.85, n),
+            "dropoff_longitude": rng.uniform(-74.05, -73.75, n),
+            "passenger_count": rng.integers(1, 7, n).astype(float),
+        }
+    )
+    return trips[TRIP_COLUMNS]
+
+
+def bench_frame(func: Callable[[pd.DataFrame], Any], X: pd.DataFrame) -> float:
+    """Лучшее время одного вызова func на свежей копии X: функции признаков
+    меняют X на месте. Копирование входит в замер одинаково для всех функций
+
+    Args:
+        func (Callable[[pd.DataFrame], Any]): Функция, которая может менять X
+        X (pd.DataFrame): Входные данные
+
+    Returns:
+        float: Время вызова в секундах
+    """
+    number = max(1, 1_000 // len(X))
+    timer = timeit.Timer(lambda: func(X.copy()))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def train_synthetic_model(models_dir: Path, seed: int = 42) -> Path:
+    """Обучение маленького пайплайна со структурой продового:
+    TargetEncoder -> PolynomialFeatures -> StandardScaler -> CatBoost
+
+    Args:
+        models_dir (Path): Папка, куда сохраняется модель
+        seed (int, optional): Сид данных и CatBoost. Defaults to 42.
+
+    Returns:
+        Path: Путь к joblib файлу модели
+    """
+    rng = np.random.default_rng(seed)
+    X = feature_transformer.transform(make_trips(TRAIN_SIZE, seed))[FEATURES_ORDER]
+    y = 2.5 + 1.6 * X["distance_km"] + 0.5 * X["is_weekend"] + rng.normal(0, 1, len(X))
+
+    pipeline = Pipeline(
+        [
+            (
+                "data_prep",
+                Pipeline(
+                    [
+                        (
+                            "encoder",
+                            TargetEncoder(cols=["year", "month", "day", "hour"]),
+                        ),
+                        ("feature_poly", PolynomialFeatures()),
+                        ("scaler", StandardScaler()),
+                    ]
+                ),
+            ),
+            (
+                "model",
+                CatBoostRegressor(
+                    iterations=100,
+                    depth=6,
+                    random_seed=seed,
+                    verbose=False,
+                    allow_writing_files=False,
+                ),
+            ),
+        ]
+    )
+    pipeline.fit(X, y)
+
+    path = models_dir / "1_synthetic.joblib"
+    joblib.dump(pipeline, path)
+    return path
+
+
+class StubGeocoder:
+    """Геокодер без сети с фиксированным ответом"""
+
+    RESULTS = [
+        GeocodeResult(lat="40.7203", lon="-74.0089", importance=0.6),
+        GeocodeResult(lat="40.7209", lon="-74.0077", importance=0.8),
+        GeocodeResult(lat="40.7300", lon="-74.0100", importance=0.3),
+    ]
+
+    async def get_coordinates(self, address: str) -> list[GeocodeResult]:
+        return list(self.RESULTS)
+
+
+def bench(
+    name: str, func: Callable[[], Any], rows: int = 1, repeat: int = 5
+) -> dict[str, Any]:
+    """Замер функции: количество вызовов на повтор подбирается timeit.autorange,
+    в результат идёт время одного вызова по повторам
+
+    Args:
+        name (str): Имя замера
+        func (Callable[[], Any]): Замеряемая функция
+        rows (int, optional): Строк на вызов для пропускной способности.
+            Defaults to 1.
+        repeat (int, optional): Количество повторов. Defaults to 5.
+
+    Returns:
+        dict[str, Any]: Результат замера
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = np.array(timer.repeat(repeat=repeat, number=number)) / number
+
+    result = {
+        "name": name,
+        "rows": rows,
+        "number": number,
+        "repeat": repeat,
+        "min_ms": timings.min() * 1000,
+        "median_ms": float(np.median(timings)) * 1000,
+        "max_ms": timings.max() * 1000,
+        "rows_per_second": rows / timings.min(),
+    }
+    print(
+        f"{name:>40} {rows:>9} {result['min_ms']:>12.4f} ms "
+        f"{result['median_ms']:>12.4f} ms {result['rows_per_second']:>14.0f} rows/s",
+        file=sys.stderr,
+    )
+    return result
+
+
+def run_suite(
+    feature_sizes: tuple[int, ...] = FEATURE_SIZES, repeat: int = 5
+) -> list[dict[str, Any]]:
+    results = []
+
+    trip = make_trips(1).iloc[0].to_dict()
+    results.append(
+        bench("taxi_travel_validation", lambda: TaxiTravel(**trip), 1, repeat)
+    )
+    for n in VALIDATION_SIZES:
+        trips = make_trips(n)
+        results.append(
+            bench("validate_trips", lambda: validate_trips(trips).errors(), n, repeat)
+        )
+
+    for n in feature_sizes:
+        trips = make_trips(n)
+        results.append(
+            bench(
+                "feature_engineering_transform",
+                lambda: feature_transformer.transform(trips),
+                n,
+                repeat,
+            )
+        )
+
+    taxi_travel = TaxiTravel(**trip)
+    results.append(bench("predict_one", lambda: predict_one(taxi_travel), 1, repeat))
+    for n in PREDICT_SIZES:
+        trips = make_trips(n)
+        results.append(bench("predict", lambda: predict(trips), n, repeat))
+
+    get_coords = single_predicion_router.get_coords_from_text
+    loop = asyncio.new_event_loop()
+    for case, text in (
+        ("coordinates", "40 -74"),
+        ("address", "127 Hudson St, New York, NY 10013, United States"),
+        ("gazetteer", "350 5th Ave, New York, NY 10118"),
+    ):
+        results.append(
+            bench(
+                f"get_coords_from_text[{case}]",
+                lambda: loop.run_until_complete(get_coords(text)),
+                1,
+                repeat,
+            )
+        )
+    loop.close()
+
+    gazetteer = get_gazetteer()
+    for case, text in GAZETTEER_QUERIES.items():
+        results.append(
+            bench(
+                f"gazetteer_lookup[{case}]", lambda: gazetteer.lookup(text), 1, repeat
+            )
+        )
+
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict[str, Any]], baseline_path: Path):
+    """Вывод изменения минимального времени относительно прошлого прогона"""
+    baseline = {
+        (i["name"], i["rows"]): i
+        for i in json.loads(baseline_path.read_text())["results"]
+    }
+
+    print(f"\n{'name':>40} {'rows':>9} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for result in results:
+        previous = baseline.get((result["name"], result["rows"]))
+        if previous is None:
+            continue
+
+        ratio = result["min_ms"] / previous["min_ms"]
+        print(
+            f"{result['name']:>40} {result['rows']:>9} "
+            f"{previous['min_ms']:>9.4f} ms {result['min_ms']:>9.4f} ms {ratio:>8.2f}"
+        )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=None, help="JSON результатов")
+    parser.add_argument(
+        "--compare", type=Path, default=None, help="JSON прошлого прогона"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--quick", action="store_true", help="Без FeatureEngineering на 1M строк"
+    )
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore", FutureWarning)
+
+    single_predicion_router.geocode_client = StubGeocoder()
+    feature_sizes = FEATURE_SIZES[:-1] if args.quick else FEATURE_SIZES
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_synthetic_model(Path(tmp_dir))
+        model_registry.models_dir = Path(tmp_dir)
+        model_registry.load_latest(force=True)
+
+        results = run_suite(feature_sizes, args.repeat)
+
+    report = {
+        "suite": "inference",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {name: version(name) for name in PACKAGES},
+        "model": "synthetic",
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
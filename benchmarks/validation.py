@@ -0,0 +1,116 @@
+"""Проверка совпадения и бенчмарк колоночной валидации поездок
+
+Сначала сравнивает сообщения validate_trips с построчной валидацией TaxiTravel
+на данных с граничными значениями, NaN, inf и совпадающими точками,
+затем замеряет оба пути
+
+Запуск: PYTHONPATH=app python -m benchmarks.validation
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from pydantic import ValidationError
+
+from app.model import TaxiTravel
+from app.validation import DATETIME_ERROR, TRIP_COLUMNS, validate_trips
+
+SIZES = (1_000, 100_000, 1_000_000)
+PARITY_SIZE = 100_000
+# Построчная валидация на миллионе строк занимает минуты
+ROW_BY_ROW_MAX_SIZE = 100_000
+
+
+def make_trips(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def column(low: float, high: float, edges: list[float]) -> np.ndarray:
+        values = rng.uniform(low, high, n)
+        mask = rng.random(n) < 0.1
+        values[mask] = rng.choice(np.array(edges, dtype=float), mask.sum())
+        return values
+
+    lat_edges = [-90, 90, -90.0001, 90.0001, 1000, np.nan, np.inf, -np.inf]
+    lon_edges = [-180, 180, -180.0001, 180.0001, np.nan, np.inf]
+    trips = pd.DataFrame(
+        {
+            "pickup_datetime": pd.Timestamp("2009-01-01")
+            + pd.to_timedelta(rng.integers(0, 7 * 365 * 24 * 3600, n), "s"),
+            "pickup_latitude": column(40.6, 40.85, lat_edges),
+            "pickup_longitude": column(-74.05, -73.75, lon_edges),
+            "dropoff_latitude": column(40.6, 40.85, lat_edges),
+            "dropoff_longitude": column(-74.05, -73.75, lon_edges),
+            "passenger_count": column(1, 8, [0, 0.999, 1, 8, 8.001, 100, np.nan]),
+        }
+    )
+
+    same = rng.random(n) < 0.05
+    shift = rng.choice([0, 5e-6, 1e-5, 2e-5], n)
+    trips.loc[same, "dropoff_latitude"] = trips["pickup_latitude"][same] + shift[same]
+    trips.loc[same, "dropoff_longitude"] = trips["pickup_longitude"][same]
+    trips.loc[rng.random(n) < 0.01, "pickup_datetime"] = pd.NaT
+    return trips
+
+
+def validate_row_by_row(trips: pd.DataFrame) -> pd.Series:
+    errors = []
+    for row in trips[TRIP_COLUMNS].to_dict(orient="records"):
+        if pd.isna(row["pickup_datetime"]):
+            errors.append(DATETIME_ERROR)
+            continue
+
+        try:
+            TaxiTravel(**row)
+            errors.append(None)
+        except ValidationError as e:
+            messages = []
+            for err in e.errors():
+                ctx_error = err.get("ctx", {}).get("error")
+                messages.append(str(ctx_error) if ctx_error else err["msg"])
+            errors.append("; ".join(messages))
+
+    return pd.Series(errors, index=trips.index, dtype="string")
+
+
+def check_parity():
+    trips = make_trips(PARITY_SIZE, seed=7)
+    expected = validate_row_by_row(trips)
+    actual = validate_trips(trips).errors_full()
+
+    mismatched = (expected.fillna("") != actual.fillna("")).sum()
+    invalid = expected.notna().sum()
+    print(f"parity: {PARITY_SIZE} rows, {invalid} invalid, {mismatched} mismatched")
+    assert mismatched == 0
+
+
+def measure(func, n_runs: int) -> float:
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    check_parity()
+
+    print(f"{'rows':>10} {'row-by-row, s':>15} {'columnar, s':>13} {'speedup':>9}")
+    for n in SIZES:
+        trips = make_trips(n)
+
+        columnar = measure(lambda: validate_trips(trips).errors_full(), n_runs=5)
+        if n <= ROW_BY_ROW_MAX_SIZE:
+            row_by_row = measure(lambda: validate_row_by_row(trips), n_runs=1)
+            print(
+                f"{n:>10} {row_by_row:>15.4f} {columnar:>13.4f} "
+                f"{row_by_row / columnar:>8.0f}x"
+            )
+        else:
+            print(f"{n:>10} {'-':>15} {columnar:>13.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+# Обязательные настройки без значений по умолчанию, сеть в тестах не нужна
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("TG_BOT_TOKEN", "123456:test")
+os.environ.setdefault("TG_WEBHOOK_URL", "https://example.com")
+os.environ.setdefault("GEOCODE_API_KEY", "test")
+
+
+@pytest.fixture(scope="session")
+def synthetic_model(tmp_path_factory):
+    """Маленький пайплайн со структурой продового в реестре моделей"""
+    from app.model import model_registry
+    from benchmarks.suite import train_synthetic_model
+
+    models_dir = tmp_path_factory.mktemp("models")
+    train_synthetic_model(models_dir)
+
+    previous_dir = model_registry.models_dir
+    model_registry.models_dir = models_dir
+    model_registry.load_latest(force=True)
+    yield model_registry.get_model()
+
+    model_registry.models_dir = previous_dir
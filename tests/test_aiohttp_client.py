@@ -0,0 +1,42 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from app.utils.aiohttpt_client import AiohttpClient
+
+
+async def request_slow_server(client: AiohttpClient, delay: float):
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response([])
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        return await client.make_request("GET", f"http://127.0.0.1:{port}/")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_total_timeout_is_client_error():
+    client = AiohttpClient(total_timeout=0.05)
+
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(request_slow_server(client, delay=1))
+
+    assert client.hosts["127.0.0.1"].errors == 1
+
+
+def test_request_within_timeout():
+    client = AiohttpClient(total_timeout=5)
+
+    assert asyncio.run(request_slow_server(client, delay=0)) == []
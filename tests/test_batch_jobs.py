@@ -0,0 +1,63 @@
+import asyncio
+
+from app.bot.batch_jobs import BatchJobs
+
+
+def test_jobs_run_in_background_with_concurrency_limit():
+    async def run():
+        jobs = BatchJobs(max_concurrent=2)
+        running, max_running = 0, 0
+        release = asyncio.Event()
+
+        async def job():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await release.wait()
+            running -= 1
+
+        tasks = [jobs.start(job()) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        # start не ждёт задачу, лишние задачи ждут очереди
+        assert jobs.stats()["running"] == 2
+        assert jobs.stats()["waiting"] == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return max_running, jobs.pending
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_failed_job_is_counted():
+    async def run():
+        jobs = BatchJobs()
+
+        async def job():
+            raise ValueError("Broken file")
+
+        await jobs.start(job())
+        return jobs.stats()["failed_total"]
+
+    assert asyncio.run(run()) == 1
+
+
+def test_close_cancels_jobs_after_timeout():
+    async def run():
+        jobs = BatchJobs(max_concurrent=1)
+        cancelled = []
+
+        async def job():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        jobs.start(job())
+        jobs.start(job())
+        await asyncio.sleep(0)
+        await jobs.close(timeout=0.01)
+        return cancelled, jobs.pending
+
+    assert asyncio.run(run()) == ([True], 0)
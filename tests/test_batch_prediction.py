@@ -0,0 +1,138 @@
+import asyncio
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+import pandas as pd
+import pytest
+from aiogram import types
+
+from app import batch_prediction
+from app.batch_prediction import (
+    ERROR_COLUMN,
+    PREDICTION_COLUMN,
+    TRIP_COLUMNS,
+    BatchFileError,
+    iter_chunks,
+    score_chunk,
+    validate_chunk,
+)
+from app.bot import batch_prediction_router
+from app.model import feature_transformer
+
+MIXED_OFFSETS_CHUNK = pd.DataFrame(
+    {
+        "pickup_datetime": [
+            "2015-01-01T10:00:00Z",
+            "2015-01-01 10:00:00",
+            "2015-07-04T23:30:00-05:00",
+            "not a date",
+        ],
+        "pickup_latitude": [40.75, 40.75, 40.75, 40.75],
+        "pickup_longitude": [-73.98, -73.98, -73.98, -73.98],
+        "dropoff_latitude": [40.64, 40.64, 40.64, 40.64],
+        "dropoff_longitude": [-73.78, -73.78, -73.78, -73.78],
+        "passenger_count": [1, 1, 1, 1],
+    }
+)
+
+
+def read_all(path: Path) -> list:
+    return list(iter_chunks(path, chunk_size=2))
+
+
+@pytest.mark.parametrize(
+    ("name", "content"),
+    [
+        ("empty.csv", b""),
+        ("malformed.csv", b"a,b\n1,2\n1,2,3,4\n"),
+        ("latin1.csv", ",".join(TRIP_COLUMNS).encode() + b"\n\xff\xfe,1,2,3,4,5\n"),
+        ("corrupt.parquet", b"PAR1 definitely not parquet"),
+        ("empty.parquet", b""),
+    ],
+)
+def test_unreadable_file_is_batch_file_error(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+
+    with pytest.raises(BatchFileError):
+        read_all(path)
+
+
+def test_missing_columns_is_batch_file_error(tmp_path):
+    path = tmp_path / "trips.csv"
+    path.write_text("pickup_datetime,passenger_count\n2015-01-01 10:00:00,1\n")
+
+    with pytest.raises(BatchFileError, match="pickup_latitude"):
+        read_all(path)
+
+
+def test_mixed_utc_offsets_keep_local_time():
+    trips, errors = validate_chunk(MIXED_OFFSETS_CHUNK)
+
+    assert trips["pickup_datetime"].dtype == "datetime64[ns]"
+    assert trips["pickup_datetime"].iloc[:3].tolist() == [
+        pd.Timestamp("2015-01-01 10:00:00"),
+        pd.Timestamp("2015-01-01 10:00:00"),
+        pd.Timestamp("2015-07-04 23:30:00"),
+    ]
+    assert errors.isna().tolist() == [True, True, True, False]
+
+
+def test_mixed_utc_offsets_fail_only_invalid_rows(monkeypatch):
+    def predict(X: pd.DataFrame) -> np.ndarray:
+        return np.zeros(len(feature_transformer.transform(X)))
+
+    monkeypatch.setattr(batch_prediction, "predict", predict)
+    result = score_chunk(MIXED_OFFSETS_CHUNK)
+
+    assert result[PREDICTION_COLUMN].notna().tolist() == [True, True, True, False]
+    assert result[ERROR_COLUMN].isna().tolist() == [True, True, True, False]
+
+
+class StubProgress:
+    def __init__(self):
+        self.texts: list[str] = []
+
+    async def edit_text(self, text: str):
+        self.texts.append(text)
+
+
+class StubBot:
+    def __init__(self, content: bytes | None):
+        self.content = content
+        self.documents: list = []
+
+    async def download(self, document, destination: Path):
+        if self.content is None:
+            raise aiohttp.ClientConnectionError("Connection reset")
+
+        destination.write_bytes(self.content)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self.documents.append(document)
+
+
+def score_document(bot: StubBot) -> StubProgress:
+    document = types.Document(
+        file_id="file", file_unique_id="file", file_name="trips.csv"
+    )
+    progress = StubProgress()
+    asyncio.run(batch_prediction_router.score_document(bot, 1, document, progress))
+    return progress
+
+
+def test_download_error_is_reported():
+    bot = StubBot(content=None)
+    progress = score_document(bot)
+
+    assert "скачать" in progress.texts[-1]
+    assert bot.documents == []
+
+
+def test_empty_file_is_reported():
+    bot = StubBot(content=b"")
+    progress = score_document(bot)
+
+    assert "Не удалось прочитать файл" in progress.texts[-1]
+    assert bot.documents == []
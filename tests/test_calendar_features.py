@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.model import FeatureEngineering
+from benchmarks.calendar_features import legacy_prepare_datetime
+
+# Прежний путь опирается на устаревшее приведение типов в fillna
+pytestmark = pytest.mark.filterwarnings("ignore:Downcasting:FutureWarning")
+
+EDGE_DATES = [
+    "2009-01-01 00:00:00",
+    "2012-02-29 23:59:59",
+    "2014-07-04 18:30:00",
+    "2014-11-27 09:00:00",
+    "2015-12-25 12:00:00",
+    "2015-12-31 23:59:59",
+]
+
+
+def assert_parity(dates: pd.Series):
+    X = pd.DataFrame({"pickup_datetime": dates, "passenger_count": 1.0})
+
+    expected = legacy_prepare_datetime(X.copy())
+    actual = FeatureEngineering()._prepare_datetime(X.copy())
+
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_random_dates_match_legacy():
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(0, 7 * 365 * 24 * 3600, 20_000)
+
+    assert_parity(pd.Timestamp("2009-01-01") + pd.to_timedelta(seconds, "s"))
+
+
+def test_edge_dates_match_legacy():
+    assert_parity(pd.Series(pd.to_datetime(EDGE_DATES)))
+
+
+@pytest.mark.parametrize("years", [(1995, 1996), (2008, 2009), (2040, 2041)])
+def test_dates_outside_calendar_range_match_legacy(years: tuple[int, int]):
+    # Такие даты строят отдельную таблицу на свой диапазон лет
+    dates = pd.date_range(f"{years[0]}-12-20", f"{years[1]}-01-05", freq="7h")
+
+    assert_parity(pd.Series(dates))
+
+
+def test_timezone_aware_dates_match_legacy():
+    dates = pd.Series(pd.to_datetime(EDGE_DATES)).dt.tz_localize("America/New_York")
+
+    assert_parity(dates)
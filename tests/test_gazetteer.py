@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+from app.settings import get_settings
+from app.utils.gazetteer import Gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer() -> Gazetteer:
+    return Gazetteer.from_file(get_settings().GAZETTEER_PATH)
+
+
+def distance_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    return math.hypot((a[0] - b[0]) * 111, (a[1] - b[1]) * 84.3)
+
+
+@pytest.mark.parametrize(
+    ("text", "expected", "kind"),
+    [
+        ("JFK", (40.6413, -73.7781), "place"),
+        ("LaGuardia Airport, Queens, NY", (40.7769, -73.874), "place"),
+        ("Barclays Center, Brooklyn, NY 11217", (40.6826, -73.9754), "place"),
+        ("Times Sq New York", (40.758, -73.9855), "place"),
+        ("Metropolitan Museum", (40.7794, -73.9632), "place"),
+        ("empire state buildng", (40.7484, -73.9857), "place"),
+        ("350 5th Ave, New York, NY 10118", (40.7484, -73.9857), "address"),
+        ("1 W 72nd St", (40.7764, -73.9762), "address"),
+        ("1500 Broadway, New York, NY 10036", (40.7566, -73.9863), "address"),
+        ("8th Ave & W 42nd St", (40.7575, -73.9899), "intersection"),
+    ],
+)
+def test_lookup_nyc(gazetteer, text, expected, kind):
+    match = gazetteer.lookup(text)
+
+    assert match is not None
+    assert match.kind == kind
+    assert distance_km((match.lat, match.lon), expected) < 0.4
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Места за пределами Нью-Йорка
+        "Hoboken",
+        "Newark, NJ",
+        "Soho, London",
+        "Manhattan, Kansas",
+        "350 5th Ave, Pittsburgh, PA",
+        # Районы и места, которых нет в справочнике
+        "Forest Hills",
+        "Red Hook",
+        "Ridgewood",
+        "park",
+        "grand",
+        "Broadway",
+        "127 Hudson St, New York, NY 10013, United States",
+        "28 Avenue B, New York, NY 10009",
+    ],
+)
+def test_lookup_falls_through_to_geocoder(gazetteer, text):
+    assert gazetteer.lookup(text) is None
+
+
+def test_grid_only_in_manhattan(gazetteer):
+    assert gazetteer.lookup("350 5th Ave, Manhattan, NY") is not None
+    assert gazetteer.lookup("350 5th Ave, Brooklyn, NY") is None
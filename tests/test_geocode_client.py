@@ -0,0 +1,187 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import test_utils, web
+
+from app.utils.aiohttpt_client import AiohttpClient
+from app.utils.geocode_cache import GeocodeCache
+from app.utils.geocode_client import GeocodeClient
+from app.utils.rate_limiter import TokenBucket
+
+PLACE = {"lat": "40.7580", "lon": "-73.9855", "importance": 0.8}
+
+
+class StubGeocoder:
+    """Заглушка geocode.maps.co: отвечает заданными статусами по очереди,
+    потом результатами, и запоминает время каждого запроса"""
+
+    def __init__(
+        self,
+        results: list | None = None,
+        statuses: list[int] | None = None,
+        retry_after: str | None = None,
+        delay: float = 0,
+    ):
+        self.results = [PLACE] if results is None else results
+        self.statuses = list(statuses or [])
+        self.retry_after = retry_after
+        self.delay = delay
+        self.requests: list[tuple[str, float]] = []
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests.append((request.query["q"], time.monotonic()))
+        await asyncio.sleep(self.delay)
+
+        if self.statuses:
+            headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+            return web.Response(status=self.statuses.pop(0), headers=headers)
+
+        return web.json_response(self.results)
+
+
+async def run_with_stub(stub: StubGeocoder, scenario, **client_kwargs):
+    app = web.Application()
+    app.router.add_get(GeocodeClient.PATH, stub.search)
+    server = test_utils.TestServer(app)
+    await server.start_server()
+
+    http_client = AiohttpClient()
+    client = GeocodeClient(
+        "token",
+        host=str(server.make_url("")).rstrip("/"),
+        client=http_client,
+        **client_kwargs,
+    )
+    try:
+        return await scenario(client)
+    finally:
+        await http_client.close()
+        await server.close()
+
+
+def test_concurrent_identical_queries_are_coalesced():
+    stub = StubGeocoder(delay=0.1)
+
+    async def scenario(client: GeocodeClient):
+        # Адреса совпадают после нормализации
+        addresses = ["Times Square", "times square", " Times  Square, "] * 3
+        results = await asyncio.gather(*map(client.get_coordinates, addresses))
+        return results, client.stats()
+
+    results, stats = asyncio.run(run_with_stub(stub, scenario))
+
+    assert len(stub.requests) == 1
+    assert all(i == results[0] for i in results)
+    assert stats["requests"] == 1
+    assert stats["coalesced"] == 8
+
+
+def test_rate_limit_spaces_requests():
+    stub = StubGeocoder()
+
+    async def scenario(client: GeocodeClient):
+        addresses = [f"{i} Broadway" for i in range(4)]
+        await asyncio.gather(*map(client.get_coordinates, addresses))
+
+    asyncio.run(
+        run_with_stub(stub, scenario, rate_limiter=TokenBucket(rate=10, capacity=1))
+    )
+
+    started = [t for _, t in sorted(stub.requests, key=lambda i: i[1])]
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert len(started) == 4
+    assert min(gaps) >= 0.09
+
+
+def test_rate_limit_timeout():
+    stub = StubGeocoder()
+
+    async def scenario(client: GeocodeClient):
+        await client.get_coordinates("1 Broadway")
+        await client.get_coordinates("2 Broadway")
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(
+            run_with_stub(
+                stub,
+                scenario,
+                rate_limiter=TokenBucket(rate=0.1, capacity=1),
+                rate_limit_timeout=0.5,
+            )
+        )
+
+    assert len(stub.requests) == 1
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retry_honours_retry_after(status: int):
+    stub = StubGeocoder(statuses=[status], retry_after="1")
+
+    async def scenario(client: GeocodeClient):
+        return await client.get_coordinates("Times Square"), client.retries
+
+    results, retries = asyncio.run(
+        run_with_stub(stub, scenario, max_retries=2, retry_backoff=0.01)
+    )
+
+    assert [i.lat for i in results] == [PLACE["lat"]]
+    assert retries == 1
+    (_, first), (_, second) = stub.requests
+    assert second - first >= 0.95
+
+
+def test_retry_gives_up_after_max_retries():
+    stub = StubGeocoder(statuses=[500, 502, 503])
+
+    async def scenario(client: GeocodeClient):
+        await client.get_coordinates("Times Square")
+
+    with pytest.raises(aiohttp.ClientResponseError) as err:
+        asyncio.run(run_with_stub(stub, scenario, max_retries=2, retry_backoff=0.01))
+
+    assert err.value.status == 503
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    stub = StubGeocoder(statuses=[401])
+
+    async def scenario(client: GeocodeClient):
+        await client.get_coordinates("Times Square")
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(run_with_stub(stub, scenario, max_retries=2, retry_backoff=0.01))
+
+    assert len(stub.requests) == 1
+
+
+def test_misses_are_cached():
+    stub = StubGeocoder(results=[])
+    cache = GeocodeCache(db_url=None, negative_ttl=60)
+
+    async def scenario(client: GeocodeClient):
+        first = await client.get_coordinates("Nowhere street")
+        second = await client.get_coordinates("nowhere street")
+        return first, second
+
+    first, second = asyncio.run(run_with_stub(stub, scenario, cache=cache))
+
+    assert first == second == []
+    assert len(stub.requests) == 1
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_misses_expire_after_negative_ttl():
+    stub = StubGeocoder(results=[])
+    cache = GeocodeCache(db_url=None, negative_ttl=0.05)
+
+    async def scenario(client: GeocodeClient):
+        await client.get_coordinates("Nowhere street")
+        await asyncio.sleep(0.1)
+        await client.get_coordinates("Nowhere street")
+
+    asyncio.run(run_with_stub(stub, scenario, cache=cache))
+
+    assert len(stub.requests) == 2
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import inference
+from app.inference import (
+    CompiledPipeline,
+    get_compiled_pipeline,
+    predict_one,
+    trip_features,
+)
+from app.model import FEATURES_ORDER, TaxiTravel, feature_transformer, predict
+from benchmarks.suite import make_trips
+
+
+def random_trips(n: int, seed: int = 7) -> list[TaxiTravel]:
+    return [TaxiTravel(**i) for i in make_trips(n, seed).to_dict("records")]
+
+
+def expected(trips: list[TaxiTravel]) -> np.ndarray:
+    return np.array([predict(trip.model_dump_df())[0] for trip in trips])
+
+
+def test_predict_one_matches_predict(synthetic_model):
+    trips = random_trips(200)
+
+    assert get_compiled_pipeline(synthetic_model) is not None
+    np.testing.assert_allclose(
+        [predict_one(trip) for trip in trips], expected(trips), rtol=1e-9
+    )
+
+
+def test_predict_one_accepts_tuples(synthetic_model):
+    trips = random_trips(20)
+    tuples = [tuple(trip.model_dump().values()) for trip in trips]
+
+    np.testing.assert_allclose(
+        [predict_one(i) for i in tuples], expected(trips), rtol=1e-9
+    )
+
+
+def test_predict_one_pandas_fallback(synthetic_model, monkeypatch):
+    monkeypatch.setattr(inference, "get_compiled_pipeline", lambda model: None)
+    trips = random_trips(50)
+
+    np.testing.assert_allclose(
+        [predict_one(trip) for trip in trips], expected(trips), rtol=1e-9
+    )
+    np.testing.assert_allclose(
+        [predict_one(tuple(trip.model_dump().values())) for trip in trips[:5]],
+        expected(trips[:5]),
+        rtol=1e-9,
+    )
+
+
+@pytest.mark.parametrize("year", [1999, 2008, 2030])
+def test_compiled_pipeline_unknown_categories(synthetic_model, year: int):
+    # Синтетическая модель обучена на 2009-2015, год вне обучения - неизвестная
+    # категория TargetEncoder, она кодируется средним таргетом
+    trips = [
+        trip.model_copy(update={"pickup_datetime": trip.pickup_datetime.replace(year)})
+        for trip in random_trips(30)
+    ]
+    features = np.stack([trip_features(trip) for trip in trips])
+    X = feature_transformer.transform(
+        pd.DataFrame([trip.model_dump() for trip in trips])
+    )[FEATURES_ORDER]
+
+    np.testing.assert_array_equal(features, X.to_numpy(np.float64))
+    np.testing.assert_allclose(
+        CompiledPipeline(synthetic_model, FEATURES_ORDER).predict(features),
+        synthetic_model.predict(X),
+        rtol=1e-9,
+    )
+
+
+def test_compiled_pipeline_unknown_hour(synthetic_model):
+    # Час в признаках всегда 0, любое другое значение модель не видела
+    features = trip_features(random_trips(1)[0])[None, :].repeat(3, axis=0)
+    features[:, FEATURES_ORDER.index("hour")] = [0, 7, 23]
+    X = pd.DataFrame(features, columns=FEATURES_ORDER)
+
+    np.testing.assert_allclose(
+        CompiledPipeline(synthetic_model, FEATURES_ORDER).predict(features),
+        synthetic_model.predict(X),
+        rtol=1e-9,
+    )
+
+
+def test_trip_features_for_leap_day():
+    trip = TaxiTravel(
+        pickup_datetime=datetime(2012, 2, 29, 23, 59),
+        pickup_latitude=40.75,
+        pickup_longitude=-73.98,
+        dropoff_latitude=40.64,
+        dropoff_longitude=-73.78,
+        passenger_count=1,
+    )
+
+    X = feature_transformer.transform(trip.model_dump_df())[FEATURES_ORDER]
+    np.testing.assert_array_equal(trip_features(trip), X.to_numpy(np.float64)[0])
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from app.model import FeatureEngineering
+
+
+def prepare_datetime(dates: list) -> pd.DataFrame:
+    X = pd.DataFrame({"pickup_datetime": pd.to_datetime(dates)})
+    return FeatureEngineering()._prepare_datetime(X)
+
+
+def test_nat_rows_get_nan_features():
+    X = prepare_datetime(["2014-07-04 18:30", None, "2015-01-03 10:00"])
+
+    np.testing.assert_array_equal(X["year"], [2014, np.nan, 2015])
+    np.testing.assert_array_equal(X["month"], [7, np.nan, 1])
+    np.testing.assert_array_equal(X["day"], [4, np.nan, 3])
+    np.testing.assert_array_equal(X["hour"], [0, np.nan, 0])
+    assert X["is_holiday"].tolist() == [True, False, False]
+    assert X["is_weekend"].tolist() == [False, False, True]
+
+
+def test_nat_rows_outside_calendar_range():
+    # Год вне таблицы бота строит новую таблицу без учёта NaT
+    X = prepare_datetime(["1995-12-25", None])
+
+    np.testing.assert_array_equal(X["year"], [1995, np.nan])
+    assert X["is_holiday"].tolist() == [True, False]
+
+
+def test_all_nat():
+    X = prepare_datetime([None, None])
+
+    assert X["year"].isna().all()
+    assert not X["is_holiday"].any()
+    assert not X["is_weekend"].any()
+
+
+def test_without_nat_features_stay_integer():
+    X = prepare_datetime(["2014-07-04 18:30"])
+
+    assert X["year"].dtype == np.int16
+    assert X["is_holiday"].dtype == bool
@@ -0,0 +1,69 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.model_registry import ModelNotReadyError, ModelRegistry
+
+
+class CountingLoader:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, path: Path) -> str:
+        self.calls += 1
+        if self.fail:
+            raise ValueError(f"Broken model {path.name}")
+
+        return path.read_text()
+
+
+@pytest.fixture
+def models_dir(tmp_path: Path) -> Path:
+    (tmp_path / "1_model.joblib").write_text("model")
+    return tmp_path
+
+
+def test_get_model_loads_synchronously_before_start(models_dir):
+    loader = CountingLoader()
+    registry = ModelRegistry(models_dir, loader)
+
+    assert registry.get_model() == "model"
+    assert registry.get_model() == "model"
+    assert loader.calls == 1
+
+
+def test_get_model_doesnt_block_after_start(models_dir):
+    loader = CountingLoader()
+    registry = ModelRegistry(models_dir, loader)
+
+    async def request_during_startup():
+        registry.start()
+        # Фоновая загрузка ещё не получила управление
+        with pytest.raises(ModelNotReadyError):
+            registry.get_model()
+
+        await registry._watcher
+        return registry.get_model()
+
+    assert asyncio.run(request_during_startup()) == "model"
+    assert loader.calls == 1
+
+
+def test_broken_model_isnt_reloaded_until_changed(models_dir):
+    loader = CountingLoader(fail=True)
+    registry = ModelRegistry(models_dir, loader)
+
+    with pytest.raises(ValueError):
+        registry.get_model()
+    for _ in range(3):
+        with pytest.raises(ModelNotReadyError, match="Broken model"):
+            registry.get_model()
+
+    assert loader.calls == 1
+    assert registry.errors_total == 1
+
+    loader.fail = False
+    (models_dir / "2_model.joblib").write_text("fixed")
+    assert registry.get_model() == "fixed"
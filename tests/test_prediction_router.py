@@ -0,0 +1,103 @@
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import prediction_router
+from app.prediction_service import PredictionService, get_prediction_service
+
+TRIP = {
+    "pickup_datetime": "2015-01-01 10:00:00",
+    "pickup_latitude": 40.75,
+    "pickup_longitude": -73.98,
+    "dropoff_latitude": 40.64,
+    "dropoff_longitude": -73.78,
+    "passenger_count": 1,
+}
+
+
+@pytest.fixture
+def client(synthetic_model):
+    service = PredictionService(max_wait_ms=1)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await service.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(prediction_router.router)
+    app.dependency_overrides[get_prediction_service] = lambda: service
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_predict_trip(client: TestClient):
+    response = client.post("/predict", json=TRIP)
+
+    assert response.status_code == 200
+    assert response.json()["prediction"] > 0
+
+
+def test_predict_invalid_trip(client: TestClient):
+    response = client.post("/predict", json={**TRIP, "passenger_count": 10})
+
+    assert response.status_code == 422
+
+
+def test_batch_keeps_valid_trips_next_to_invalid(client: TestClient):
+    trips = [
+        {**TRIP, "pickup_datetime": "2015-01-01T10:00:00Z"},
+        {**TRIP, "passenger_count": 10},
+        TRIP,
+        {**TRIP, "pickup_datetime": "not a date"},
+    ]
+    response = client.post("/predict/batch", json=trips)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [i is not None for i in body["predictions"]] == [True, False, True, False]
+    assert body["predictions"][0] == pytest.approx(body["predictions"][2])
+    assert [i["index"] for i in body["errors"]] == [1, 3]
+
+
+def test_batch_empty_array(client: TestClient):
+    response = client.post("/predict/batch", json=[])
+
+    assert response.json() == {"predictions": [], "errors": []}
+
+
+def test_batch_body_size_limit(client: TestClient, monkeypatch):
+    body = json.dumps([TRIP] * 3)
+    monkeypatch.setattr(
+        prediction_router.settings, "PREDICT_API_MAX_BODY_SIZE", len(body) - 1
+    )
+
+    response = client.post("/predict/batch", content=body)
+
+    assert response.status_code == 413
+
+
+def test_batch_trips_limit(client: TestClient, monkeypatch):
+    monkeypatch.setattr(prediction_router.settings, "PREDICT_API_MAX_TRIPS", 2)
+
+    assert client.post("/predict/batch", json=[TRIP] * 2).status_code == 200
+    assert client.post("/predict/batch", json=[TRIP] * 3).status_code == 413
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        json.dumps(TRIP),
+        json.dumps([TRIP, 1]),
+        "[{",
+        json.dumps([{"pickup_datetime": "2015-01-01 10:00:00"}]),
+    ],
+)
+def test_batch_rejects_malformed_body(client: TestClient, body: str):
+    response = client.post("/predict/batch", content=body)
+
+    assert response.status_code == 422
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.router import router
+from app.settings import get_settings
+
+OPS_ENDPOINTS = [
+    "/metrics",
+    "/webhook_queue_stats",
+    "/update_dedup_stats",
+    "/startup",
+    "/model_info",
+    "/shadow_stats",
+    "/traces",
+    "/prediction_service_stats",
+    "/batch_jobs_stats",
+    "/geocode_stats",
+]
+
+
+@pytest.fixture(scope="module")
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", OPS_ENDPOINTS)
+def test_ops_endpoint_requires_admin_token(client: TestClient, path: str):
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    token = get_settings().SECRET_KEY
+    assert client.get(path, headers={"X-Admin-Token": token}).status_code == 200
+
+
+def test_health_check_is_public(client: TestClient):
+    assert client.get("/").status_code == 200
@@ -0,0 +1,14 @@
+from benchmarks.startup import LAZY_MODULES, run_import
+
+# С запасом для медленных CI машин, локально импорт занимает около 6 секунд
+IMPORT_BUDGET_SECONDS = 15
+
+
+def test_import_skips_heavy_modules():
+    result = run_import()
+
+    assert result["loaded_lazy_modules"] == []
+    assert {"pandas", "sklearn", "catboost"} <= set(LAZY_MODULES)
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+    # -X importtime действительно отработал и видит импорт приложения
+    assert "app" in result["packages"]
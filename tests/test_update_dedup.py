@@ -0,0 +1,118 @@
+import asyncio
+import time
+from datetime import datetime
+
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from app.bot.update_dedup import UpdateDeduplicator
+
+USER = User(id=2, is_bot=False, first_name="Test")
+
+
+def db_url(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'fsm.sqlite3'}"
+
+
+def text_update(update_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(),
+            chat=Chat(id=1, type="private"),
+            from_user=USER,
+            text=text,
+        ),
+    )
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    return Update(
+        update_id=update_id,
+        callback_query=CallbackQuery(
+            id=str(update_id), from_user=USER, chat_instance="1", data=data
+        ),
+    )
+
+
+def test_redelivery_to_another_worker_is_duplicate(tmp_path):
+    async def run():
+        # Два воркера - два процесса со своей памятью и общей базой
+        first = UpdateDeduplicator(db_url(tmp_path))
+        second = UpdateDeduplicator(db_url(tmp_path))
+        update = Update(update_id=1)
+
+        return (
+            await first.is_duplicate(update),
+            await second.is_duplicate(update),
+            await first.is_duplicate(Update(update_id=2)),
+            second.stats()["shared_duplicates"],
+        )
+
+    assert asyncio.run(run()) == (False, True, False, 1)
+
+
+def test_forgotten_update_is_processed_by_another_worker(tmp_path):
+    async def run():
+        first = UpdateDeduplicator(db_url(tmp_path))
+        second = UpdateDeduplicator(db_url(tmp_path))
+        update = Update(update_id=1)
+
+        await first.is_duplicate(update)
+        await first.forget(update)
+        return await second.is_duplicate(update), await first.is_duplicate(update)
+
+    assert asyncio.run(run()) == (False, True)
+
+
+def test_update_older_than_window_is_processed_again(tmp_path):
+    async def run():
+        first = UpdateDeduplicator(db_url(tmp_path), window=0.05)
+        second = UpdateDeduplicator(db_url(tmp_path), window=0.05)
+        update = Update(update_id=1)
+
+        await first.is_duplicate(update)
+        time.sleep(0.1)
+        return await second.is_duplicate(update)
+
+    assert asyncio.run(run()) is False
+
+
+def test_without_db_updates_are_tracked_per_process():
+    async def run():
+        first = UpdateDeduplicator()
+        second = UpdateDeduplicator()
+        update = Update(update_id=1)
+
+        return (
+            await first.is_duplicate(update),
+            await first.is_duplicate(update),
+            await second.is_duplicate(update),
+        )
+
+    assert asyncio.run(run()) == (False, True, False)
+
+
+def test_repeated_text_messages_are_coalesced():
+    async def run():
+        deduplicator = UpdateDeduplicator()
+        return [
+            await deduplicator.is_duplicate(text_update(1, "Times Square")),
+            await deduplicator.is_duplicate(text_update(2, "Times Square")),
+            await deduplicator.is_duplicate(text_update(3, "JFK Airport")),
+        ]
+
+    assert asyncio.run(run()) == [False, True, False]
+
+
+def test_repeated_button_taps_are_not_coalesced():
+    async def run():
+        deduplicator = UpdateDeduplicator()
+        return [
+            await deduplicator.is_duplicate(callback_update(1, "predict")),
+            await deduplicator.is_duplicate(callback_update(2, "predict")),
+            # Повторная доставка того же нажатия всё равно отбрасывается
+            await deduplicator.is_duplicate(callback_update(2, "predict")),
+        ]
+
+    assert asyncio.run(run()) == [False, False, True]
@@ -0,0 +1,182 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from app.batch_prediction import validate_chunk
+from app.model import (
+    LATITUDE_ERROR,
+    LONGITUDE_ERROR,
+    PASSENGER_COUNT_ERROR,
+    SAME_COORDS_ERROR,
+    TaxiTravel,
+)
+from app.validation import DATETIME_ERROR, TRIP_COLUMNS, validate_trips
+from benchmarks.validation import make_trips
+
+VALID_TRIP = {
+    "pickup_datetime": pd.Timestamp("2015-06-01 12:30:00"),
+    "pickup_latitude": 40.75,
+    "pickup_longitude": -73.98,
+    "dropoff_latitude": 40.71,
+    "dropoff_longitude": -74.0,
+    "passenger_count": 2.0,
+}
+
+
+def taxi_travel_error(row: dict) -> str | None:
+    """Ошибка строки по TaxiTravel в формате errors_full"""
+    value = row["pickup_datetime"]
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return DATETIME_ERROR
+
+    try:
+        TaxiTravel(**row)
+        return None
+    except ValidationError as e:
+        # Нераспознанная дата заменяет остальные ошибки строки
+        if any(err["loc"] == ("pickup_datetime",) for err in e.errors()):
+            return DATETIME_ERROR
+
+        messages = []
+        for err in e.errors():
+            ctx_error = err.get("ctx", {}).get("error")
+            messages.append(str(ctx_error) if ctx_error else err["msg"])
+        return "; ".join(messages)
+
+
+def assert_parity(raw: pd.DataFrame, actual: pd.Series) -> pd.Series:
+    expected = pd.Series(
+        [taxi_travel_error(row) for row in raw[TRIP_COLUMNS].to_dict("records")],
+        index=raw.index,
+        dtype="string",
+    )
+    pd.testing.assert_series_equal(actual, expected, check_names=False)
+    return expected
+
+
+def trips(*changes: dict) -> pd.DataFrame:
+    return pd.DataFrame([{**VALID_TRIP, **i} for i in changes])
+
+
+@pytest.mark.parametrize(
+    ("change", "error"),
+    [
+        ({}, None),
+        ({"pickup_latitude": 90.0, "dropoff_latitude": -90.0}, None),
+        ({"pickup_longitude": 180.0, "dropoff_longitude": -180.0}, None),
+        ({"passenger_count": 1.0}, None),
+        ({"passenger_count": 8.0}, None),
+        ({"pickup_latitude": 90.0001}, LATITUDE_ERROR),
+        ({"dropoff_latitude": -90.0001}, LATITUDE_ERROR),
+        ({"pickup_longitude": 180.0001}, LONGITUDE_ERROR),
+        ({"dropoff_longitude": -180.0001}, LONGITUDE_ERROR),
+        ({"pickup_latitude": 1000.0}, LATITUDE_ERROR),
+        ({"passenger_count": 0.999}, PASSENGER_COUNT_ERROR),
+        ({"passenger_count": 8.001}, PASSENGER_COUNT_ERROR),
+        ({"passenger_count": 0.0}, PASSENGER_COUNT_ERROR),
+        ({"passenger_count": 100.0}, PASSENGER_COUNT_ERROR),
+    ],
+)
+def test_boundaries(change, error):
+    raw = trips(change)
+    expected = assert_parity(raw, validate_trips(raw).errors_full())
+
+    assert expected.iloc[0] is pd.NA if error is None else expected.iloc[0] == error
+
+
+@pytest.mark.parametrize("column", TRIP_COLUMNS[1:])
+@pytest.mark.parametrize("value", [np.nan, None, np.inf, -np.inf])
+def test_missing_and_infinite_values(column, value):
+    raw = trips({column: value})
+    raw[column] = raw[column].astype(float)
+
+    expected = assert_parity(raw, validate_trips(raw).errors_full())
+    assert expected.notna().all()
+
+
+def test_several_errors_in_one_row():
+    raw = trips(
+        {
+            "pickup_latitude": math.nan,
+            "dropoff_longitude": 200.0,
+            "passenger_count": 9.0,
+        }
+    )
+
+    expected = assert_parity(raw, validate_trips(raw).errors_full())
+    assert expected.iloc[0] == "; ".join(
+        [LATITUDE_ERROR, LONGITUDE_ERROR, PASSENGER_COUNT_ERROR]
+    )
+
+
+@pytest.mark.parametrize("shift", [0.0, 5e-6, 1e-5, 1.1e-5, 2e-5])
+def test_same_coordinates(shift):
+    raw = trips(
+        {
+            "dropoff_latitude": VALID_TRIP["pickup_latitude"] + shift,
+            "dropoff_longitude": VALID_TRIP["pickup_longitude"],
+        }
+    )
+
+    expected = assert_parity(raw, validate_trips(raw).errors_full())
+    if shift < 1e-5:
+        assert expected.iloc[0] == SAME_COORDS_ERROR
+
+
+def test_same_coordinates_not_reported_with_field_errors():
+    raw = trips(
+        {
+            "pickup_latitude": 95.0,
+            "dropoff_latitude": 95.0,
+            "dropoff_longitude": VALID_TRIP["pickup_longitude"],
+        }
+    )
+
+    assert_parity(raw, validate_trips(raw).errors_full())
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "not a date",
+        "2015-13-45 10:00:00",
+        "",
+        None,
+        pd.NaT,
+    ],
+)
+def test_bad_dates(value):
+    # Сырые строки файла приводятся к типам так же, как в пакетном предсказании
+    raw = trips({"pickup_datetime": value, "pickup_latitude": 95.0})
+    raw["pickup_datetime"] = raw["pickup_datetime"].astype(object)
+
+    _, actual = validate_chunk(raw)
+    expected = assert_parity(raw, actual)
+    assert expected.iloc[0] == DATETIME_ERROR
+
+
+def test_date_strings():
+    raw = trips({"pickup_datetime": "2015-06-01 12:30:00"}, {"passenger_count": 0})
+    raw["pickup_datetime"] = raw["pickup_datetime"].astype(str)
+
+    _, actual = validate_chunk(raw)
+    assert_parity(raw, actual)
+
+
+def test_random_trips_parity():
+    raw = make_trips(5_000, seed=3)
+
+    validation = validate_trips(raw)
+    expected = assert_parity(raw, validation.errors_full())
+    assert expected.notna().any()
+    assert validation.valid.tolist() == expected.isna().tolist()
+
+
+def test_mapping_of_arrays():
+    raw = trips({}, {"passenger_count": 0.0}, {"pickup_longitude": np.nan})
+    arrays = {i: raw[i].to_numpy() for i in TRIP_COLUMNS}
+
+    assert_parity(raw, validate_trips(arrays).errors_full())